@@ -1,5 +1,12 @@
-import logging
+"""Importing the package only defines it: the API is built (and logging configured) by "wsgi", from "config.Config".
 
-from j_notes_api.app import create_app
+    "create_app" is resolved on first use, so that tools importing a submodule do not pay for falcon, pymongo and every
+    resource.
+"""
 
-logging.basicConfig(level=logging.DEBUG)
+
+def __getattr__(name: str):
+    if name == 'create_app':
+        from j_notes_api.app import create_app
+        return create_app
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -1,40 +1,105 @@
-import os
-from typing import Dict
+import datetime
+from typing import Callable, Dict
 
 import falcon
 from pymongo.collection import Collection
 
-from j_notes_api import resources
-from j_notes_api.db import NOTES_DB
+from j_notes_api import db, resources
+from j_notes_api.config import Config
+from j_notes_api.db import add_event_listener, LazyCollection, raw_documents
+from j_notes_api.db.setup import VALIDATORS
+from j_notes_api.middleware.admission import AdmissionMiddleware
 from j_notes_api.middleware.auth import AuthMiddleware
-from j_notes_api.services import UserService
+from j_notes_api.middleware.compression import CompressionMiddleware
+from j_notes_api.middleware.metrics import MetricsMiddleware
+from j_notes_api.services import CertificateStore, CommandMetrics, LocalAdmissionState, Metrics, RevocationList, \
+    SharedAdmissionState, UserCache, UserService, WriteBehindBuffer
 
 RESOURCE_MAP: Dict[type, str] = {
     resources.SessionsResource: '/sessions',
     resources.UserNotesResource: '/users/{user_id}/notes/{note_id}',
+    resources.UserNoteBodyResource: '/users/{user_id}/notes/{note_id}/body',
+    resources.UserNotesBatchResource: '/users/{user_id}/notes/batch',
     resources.UserNotesListResource: '/users/{user_id}/notes',
+    resources.UserNotesSyncResource: '/users/{user_id}/notes/sync',
+    resources.UserNotesSearchResource: '/users/{user_id}/notes/search',
+    resources.MetricsResource: '/metrics',
 }
 
-__CLIENT_ID:                 str = os.getenv('CLIENT_ID')
-__AUTH_PROVIDERS_COLLECTION: Collection = NOTES_DB.authProviders
-__NOTES_COLLECTION:          Collection = NOTES_DB.notes
-__USERS_COLLECTION:          Collection = NOTES_DB.users
 
+def create_app(config: Config, collection_factory: Callable[[str], Collection] = LazyCollection) -> falcon.API:
+    """Builds the API from "config". "collection_factory" maps a collection name to the collection to use (e.g. for
+        benchmarks).
+    """
+    if not config.client_id:
+        raise ValueError('A client id ("CLIENT_ID" in the environment) must be configured to start this API.')
 
-def create_app() -> falcon.API:
-    if not __CLIENT_ID:
-        raise ValueError('The "CLIENT_ID" environment variable must be defined to start this API.')
+    if collection_factory is LazyCollection:
+        db.configure(config.mongo_host, config.mongo_port, config.mongo_database, config.mongo_options)
 
-    auth_middleware = AuthMiddleware(__CLIENT_ID, __USERS_COLLECTION, (resources.SessionsResource,))
-    user_service = UserService(__USERS_COLLECTION, __AUTH_PROVIDERS_COLLECTION)
-    sessions_resource = resources.SessionsResource(
-        __CLIENT_ID, __AUTH_PROVIDERS_COLLECTION, __USERS_COLLECTION, user_service)
-    user_notes_resource = resources.UserNotesResource(__NOTES_COLLECTION)
-    user_notes_list_resource = resources.UserNotesListResource(__NOTES_COLLECTION)
+    # Collections are resolved against a per-process client on use, so the app can be built before workers fork.
+    auth_providers_collection = collection_factory('authProviders')
+    notes_collection = collection_factory('notes')
+    note_chunks_collection = collection_factory('noteChunks')
+    users_collection = collection_factory('users')
 
-    api = falcon.API(middleware=auth_middleware)
+    # Stateless auth verifies session tokens in memory, checking only a periodically refreshed revocation filter.
+    revocation_list = None
+    if config.stateless_auth:
+        revocation_list = RevocationList(collection_factory('revokedTokens'), config.revocation_refresh_interval)
+    user_cache = UserCache(config.auth_cache_size, datetime.timedelta(seconds=config.auth_cache_ttl))
+    public_resources = (resources.SessionsResource, resources.MetricsResource)
+    auth_middleware = AuthMiddleware(
+        config.client_id, raw_documents(users_collection), public_resources, user_cache, revocation_list)
+    user_service = UserService(users_collection, auth_providers_collection, user_cache)
+    sessions_resource = resources.SessionsResource(config.client_id, user_service, CertificateStore(), revocation_list)
+    causal_reads = resources.CausalReads(resources.read_preference_from_name(config.notes_read_preference))
+    # Note updates can be acknowledged before they are written, trading up to WRITE_BEHIND_WINDOW seconds of
+    # durability for one write per note per window.
+    write_behind = None
+    if config.write_behind_window > 0:
+        write_behind = WriteBehindBuffer(notes_collection, config.write_behind_window, config.write_behind_max_batch,
+                                         VALIDATORS['notes']['$jsonSchema'], note_chunks_collection)
+    user_notes_resource = resources.UserNotesResource(notes_collection, causal_reads, write_behind,
+                                                      note_chunks_collection)
+    # Bodies up to the inline "text" limit stay in the note document; larger ones are stored in chunks.
+    user_note_body_resource = resources.UserNoteBodyResource(
+        notes_collection, note_chunks_collection, VALIDATORS['notes']['$jsonSchema']['properties']['text']['maxLength'],
+        max_size=config.note_body_max_size)
+    user_notes_list_resource = resources.UserNotesListResource(notes_collection, causal_reads)
+    user_notes_batch_resource = resources.UserNotesBatchResource(notes_collection, causal_reads,
+                                                                 note_chunks_collection)
+    user_notes_sync_resource = resources.UserNotesSyncResource(notes_collection)
+    user_notes_search_resource = resources.UserNotesSearchResource(notes_collection, causal_reads)
+
+    compression_middleware = CompressionMiddleware(config.compression_min_size, config.compression_level)
+    middleware = [auth_middleware, compression_middleware]
+
+    # Per-user token buckets and an in-flight limit, both off unless configured; with a shared path the limits hold
+    # across workers on a host.
+    if config.admission_user_rate > 0 or config.admission_max_in_flight > 0:
+        if config.admission_shared_path:
+            admission_state = SharedAdmissionState(
+                config.admission_user_rate, config.admission_user_burst, config.admission_shared_path)
+        else:
+            admission_state = LocalAdmissionState(config.admission_user_rate, config.admission_user_burst)
+        middleware.insert(1, AdmissionMiddleware(admission_state, config.admission_max_in_flight))
+
+    # Listed first, the metrics middleware's response hook runs last and so times the other middleware too.
+    metrics = Metrics()
+    if config.metrics_enabled:
+        add_event_listener(CommandMetrics(metrics))
+        middleware.insert(0, MetricsMiddleware(metrics, RESOURCE_MAP))
+
+    api = falcon.API(middleware=middleware)
     api.add_route(RESOURCE_MAP[resources.SessionsResource], sessions_resource)
     api.add_route(RESOURCE_MAP[resources.UserNotesResource], user_notes_resource)
+    api.add_route(RESOURCE_MAP[resources.UserNoteBodyResource], user_note_body_resource)
     api.add_route(RESOURCE_MAP[resources.UserNotesListResource], user_notes_list_resource)
+    api.add_route(RESOURCE_MAP[resources.UserNotesBatchResource], user_notes_batch_resource)
+    api.add_route(RESOURCE_MAP[resources.UserNotesSyncResource], user_notes_sync_resource)
+    api.add_route(RESOURCE_MAP[resources.UserNotesSearchResource], user_notes_search_resource)
+    if config.metrics_enabled:
+        api.add_route(RESOURCE_MAP[resources.MetricsResource], resources.MetricsResource(metrics))
 
     return api
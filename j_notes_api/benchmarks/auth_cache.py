@@ -0,0 +1,70 @@
+"""Counts the "users" round trips AuthMiddleware makes per 1k authenticated requests, with and without a UserCache.
+
+    Usage: python -m j_notes_api.benchmarks.auth_cache [--requests 1000] [--users 50]
+"""
+import argparse
+import datetime
+import random
+import time
+from typing import List, Optional
+from unittest.mock import MagicMock
+
+from bson import ObjectId
+from falcon import API, testing
+
+from j_notes_api.middleware.auth import AuthMiddleware
+from j_notes_api.models import User
+from j_notes_api.services import crypto, UserCache
+
+CLIENT_ID = 'benchmark-client-id'
+
+
+def _build_users(count: int) -> List[User]:
+    expiry = datetime.datetime.now() + datetime.timedelta(hours=1)
+    return [User({'_id': ObjectId(), 'authToken': crypto.generate_token(), 'authTokenExpiry': expiry,
+                  'dateCreated': datetime.datetime.now()}) for _ in range(count)]
+
+
+def _run(users: List[User], requests: int, user_cache: Optional[UserCache], seed: int):
+    documents = {(user.uuid, user.auth_token): {'_id': user.uuid, 'authToken': user.auth_token,
+                                                'authTokenExpiry': user.auth_token_expiry,
+                                                'dateCreated': user.date_created} for user in users}
+    users_collection = MagicMock()
+    users_collection.find_one.side_effect = lambda query: documents.get((query['_id'], query['authToken']))
+
+    api = API(middleware=AuthMiddleware(CLIENT_ID, users_collection, user_cache=user_cache))
+    api.add_route('/', testing.SimpleTestResource())
+    client = testing.TestClient(api)
+    tokens = [crypto.generate_jwt(user, CLIENT_ID).decode() for user in users]
+
+    rand = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.simulate_get('/', headers={'Authorization': rand.choice(tokens)})
+    elapsed = time.perf_counter() - start
+
+    return users_collection.find_one.call_count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    users = _build_users(args.users)
+    uncached_trips, uncached_elapsed = _run(users, args.requests, None, args.seed)
+    user_cache = UserCache()
+    cached_trips, cached_elapsed = _run(users, args.requests, user_cache, args.seed)
+
+    print('requests: {}, distinct users: {}'.format(args.requests, args.users))
+    print('without cache: {:>6} round trips, {:.3f}s'.format(uncached_trips, uncached_elapsed))
+    print('with cache:    {:>6} round trips, {:.3f}s (hits: {}, misses: {})'.format(
+        cached_trips, cached_elapsed, user_cache.hits, user_cache.misses))
+    print('round trips saved per 1k requests: {:.0f}'.format(
+        (uncached_trips - cached_trips) * 1000 / args.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Measures CPU cost against bytes saved when compressing realistic notes list payloads at each level.
+
+    Usage: python -m j_notes_api.benchmarks.compression [--notes 50] [--iterations 200]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from bson import ObjectId, json_util
+
+from j_notes_api.middleware.compression import _compress
+
+_WORDS = ('meeting notes groceries remember call tomorrow project deadline idea draft review todo milk eggs bread '
+          'budget invoice travel flight hotel book read chapter recipe garden plant water schedule dentist monday '
+          'friday weekend birthday gift password reset server deploy release fix bug test').split()
+
+
+def _notes_payload(count: int, rand: random.Random) -> bytes:
+    user = ObjectId()
+    now = datetime.datetime.now()
+    notes = []
+    for _ in range(count):
+        text = ' '.join(rand.choice(_WORDS) for _ in range(rand.randint(5, 400)))
+        notes.append({'_id': ObjectId(), 'user': user, 'text': text, 'dateCreated': now, 'dateModified': now})
+
+    return json_util.dumps(notes).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    payload = _notes_payload(args.notes, random.Random(args.seed))
+    print('payload: {} notes, {} bytes'.format(args.notes, len(payload)))
+    print('{:<8} {:>5} {:>10} {:>8} {:>12} {:>10}'.format('encoding', 'level', 'bytes', 'ratio', 'cpu/resp', 'MB/s'))
+    for encoding in ('gzip', 'deflate'):
+        for level in (1, 3, 6, 9):
+            start = time.process_time()
+            for _ in range(args.iterations):
+                compressed = _compress(payload, encoding, level)
+            cpu = (time.process_time() - start) / args.iterations
+            print('{:<8} {:>5} {:>10} {:>7.1%} {:>10.3f}ms {:>10.1f}'.format(
+                encoding, level, len(compressed), len(compressed) / len(payload), cpu * 1000,
+                len(payload) / cpu / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Compares requests/sec of a single gunicorn process using the "sync" and "gthread" worker classes.
+
+    Mongo is replaced with in-memory collections that sleep for "--latency" milliseconds per round trip, so the numbers
+    reflect how well each worker overlaps I/O waits rather than the speed of a local mongod.
+
+    Usage: python -m j_notes_api.benchmarks.concurrency [--latency 5] [--threads 8] [--clients 16] [--duration 5]
+"""
+import argparse
+import datetime
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import falcon
+from bson import ObjectId
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.middleware.auth import AuthMiddleware
+from j_notes_api.models import User
+from j_notes_api.resources import UserNotesListResource
+from j_notes_api.services import crypto
+
+CLIENT_ID = 'benchmark-client-id'
+USER = User({'_id': ObjectId('5b6d6b0f2f1b4d0001000001'), 'authToken': 'benchmark-auth-token',
+             'authTokenExpiry': datetime.datetime.max, 'dateCreated': datetime.datetime.now()})
+
+
+class _SlowCursor(list):
+
+    def sort(self, *_):
+        return self
+
+    def limit(self, limit: int):
+        return _SlowCursor(self[:limit])
+
+
+class _SlowCollection:
+
+    def __init__(self, documents: List[Dict], latency: float):
+        self._documents: List[Dict] = documents
+        self._latency:   float = latency
+
+    def find_one(self, *_, **__):
+        time.sleep(self._latency)
+        return self._documents[0] if self._documents else None
+
+    def find(self, *_, **__):
+        time.sleep(self._latency)
+        return _SlowCursor(self._documents)
+
+
+def build_app() -> falcon.API:
+    latency = float(os.getenv('BENCHMARK_LATENCY_MS', '5')) / 1000
+    now = datetime.datetime.now()
+    users = _SlowCollection([{'_id': USER.uuid, 'authToken': USER.auth_token,
+                              'authTokenExpiry': USER.auth_token_expiry, 'dateCreated': now}], latency)
+    notes = _SlowCollection([{'_id': ObjectId(), 'user': USER.uuid, 'text': 'note {}'.format(index),
+                              'dateCreated': now, 'dateModified': now} for index in range(20)], latency)
+
+    api = falcon.API(middleware=AuthMiddleware(CLIENT_ID, users))
+    api.add_route(RESOURCE_MAP[UserNotesListResource], UserNotesListResource(notes))
+    return api
+
+
+application = build_app()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('gunicorn did not start listening on port {}'.format(port))
+
+
+def _drive(port: int, clients: int, duration: float) -> int:
+    path = RESOURCE_MAP[UserNotesListResource].format(user_id=USER.uuid)
+    headers = {'Authorization': crypto.generate_jwt(USER, CLIENT_ID).decode()}
+    deadline = time.monotonic() + duration
+    completed = []
+    lock = threading.Lock()
+
+    def client():
+        count = 0
+        while time.monotonic() < deadline:
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', path, headers=headers)
+            if connection.getresponse().read() is not None:
+                count += 1
+            connection.close()
+        with lock:
+            completed.append(count)
+
+    with ThreadPoolExecutor(clients) as executor:
+        for _ in range(clients):
+            executor.submit(client)
+
+    return sum(completed)
+
+
+def _run(worker_class: str, threads: int, args: argparse.Namespace) -> float:
+    port = _free_port()
+    env = {**os.environ, 'BENCHMARK_LATENCY_MS': str(args.latency)}
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'python:j_notes_api.gunicorn_conf',
+                               '--bind', '127.0.0.1:{}'.format(port), '--workers', '1',
+                               '--worker-class', worker_class, '--threads', str(threads), '--log-level', 'warning',
+                               'j_notes_api.benchmarks.concurrency:application'], env=env)
+    try:
+        _wait_for(port)
+        return _drive(port, args.clients, args.duration) / args.duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=5, help='Simulated Mongo round trip time in milliseconds.')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    print('simulated mongo latency: {}ms, clients: {}'.format(args.latency, args.clients))
+    print('sync:                 {:8.1f} req/s'.format(_run('sync', 1, args)))
+    print('gthread ({:>2} threads): {:8.1f} req/s'.format(args.threads, _run('gthread', args.threads, args)))
+
+
+if __name__ == '__main__':
+    main()
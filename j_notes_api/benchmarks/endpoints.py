@@ -0,0 +1,269 @@
+"""Benchmarks every route in "RESOURCE_MAP" through "create_app" and falcon's TestClient, and guards against
+    regressions with a JSON baseline.
+
+    Collections are backed either by in-memory stand-ins ("--backend memory", see "benchmarks.memory") or by a
+    reachable mongod ("--backend mongod", MONGO_HOST/MONGO_PORT), in which case a scratch "jNotesBenchmark" database is
+    created with the registry's validators and indexes, and dropped afterwards. For each endpoint the latency
+    distribution, the peak memory traced while handling one request and the Mongo commands sent per request are
+    reported. The API is built from "CONFIG": requests are authenticated with session tokens for its client id
+    (Google's id token verification is stubbed out), and as they all come from one user, per-user admission control is
+    turned off.
+
+    "--save-baseline" writes the results to a JSON file. "--baseline" compares against one and exits with status 1 when
+    an endpoint's median latency or peak memory grew by more than "--threshold", or when it sends more commands.
+
+    Usage: python -m j_notes_api.benchmarks.endpoints [--backend memory] [--iterations 500] [--notes 200]
+               [--save-baseline FILE | --baseline FILE [--threshold 0.25]]
+"""
+import argparse
+import datetime
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+from unittest import mock
+
+from bson import ObjectId, json_util
+from falcon import testing
+from pymongo import monitoring, MongoClient
+
+from j_notes_api import app, resources
+from j_notes_api.benchmarks.memory import MemoryDatabase
+from j_notes_api.benchmarks.search import WORDS
+from j_notes_api.config import Config
+from j_notes_api.db import MONGO_HOST, MONGO_PORT, setup
+from j_notes_api.models import User
+from j_notes_api.services import crypto
+from j_notes_api.services.user import AUTH_TOKEN_LIFETIME
+
+SUBJECT: str = 'benchmark-subject'
+CONFIG:  Config = Config('benchmark-client-id', admission_user_rate=0)
+
+# The request for an endpoint, built outside the timed section from the benchmark's "_Context".
+Scenario = Callable[['_Context'], Dict]
+
+
+class _CommandCounter(monitoring.CommandListener):
+
+    def __init__(self):
+        self.commands: Counter = Counter()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        pass
+
+
+class _Context:
+
+    def __init__(self, database, commands: Counter, user: User, note_ids: List[ObjectId], seed: int):
+        self.database = database
+        self.commands: Counter = commands
+        self.user:     User = user
+        self.note_ids: List[ObjectId] = note_ids
+        self.rand:     random.Random = random.Random(seed)
+        self.headers:  Dict[str, str] = {'Authorization': crypto.generate_jwt(user, CONFIG.client_id).decode()}
+
+    def path(self, resource: type, **params: str) -> str:
+        return app.RESOURCE_MAP[resource].format(user_id=self.user.uuid, **params)
+
+    def text(self, words: int = 40) -> str:
+        return ' '.join(self.rand.choices(WORDS, k=words))
+
+    def new_note(self) -> ObjectId:
+        now = datetime.datetime.now()
+        return self.database['notes'].insert_one({'user': self.user.uuid, 'text': self.text(), 'dateCreated': now,
+                                                  'dateModified': now}).inserted_id
+
+
+def _note_path(context: _Context, note_id: ObjectId) -> str:
+    return context.path(resources.UserNotesResource, note_id=note_id)
+
+
+def _body_path(context: _Context, note_id: ObjectId) -> str:
+    return context.path(resources.UserNoteBodyResource, note_id=note_id)
+
+
+SCENARIOS: Dict[str, Tuple[type, Scenario]] = {
+    'POST /sessions': (resources.SessionsResource, lambda context: {
+        'method': 'POST', 'path': context.path(resources.SessionsResource),
+        'headers': {'Authorization': 'google-id-token'}}),
+    'GET /notes/{note_id}': (resources.UserNotesResource, lambda context: {
+        'method': 'GET', 'path': _note_path(context, context.rand.choice(context.note_ids)),
+        'headers': context.headers}),
+    'PUT /notes/{note_id}': (resources.UserNotesResource, lambda context: {
+        'method': 'PUT', 'path': _note_path(context, context.rand.choice(context.note_ids)),
+        'headers': context.headers, 'body': json.dumps({'text': context.text()})}),
+    'DELETE /notes/{note_id}': (resources.UserNotesResource, lambda context: {
+        'method': 'DELETE', 'path': _note_path(context, context.new_note()), 'headers': context.headers}),
+    'GET /notes/{note_id}/body': (resources.UserNoteBodyResource, lambda context: {
+        'method': 'GET', 'path': _body_path(context, context.rand.choice(context.note_ids)),
+        'headers': dict(context.headers, Range='bytes=0-99')}),
+    # Large enough to be stored in chunks.
+    'PUT /notes/{note_id}/body': (resources.UserNoteBodyResource, lambda context: {
+        'method': 'PUT', 'path': _body_path(context, context.rand.choice(context.note_ids)),
+        'headers': context.headers, 'body': context.text(50000)}),
+    'GET /notes': (resources.UserNotesListResource, lambda context: {
+        'method': 'GET', 'path': context.path(resources.UserNotesListResource), 'headers': context.headers}),
+    'POST /notes': (resources.UserNotesListResource, lambda context: {
+        'method': 'POST', 'path': context.path(resources.UserNotesListResource), 'headers': context.headers,
+        'body': json.dumps({'text': context.text()})}),
+    'POST /notes/batch': (resources.UserNotesBatchResource, lambda context: {
+        'method': 'POST', 'path': context.path(resources.UserNotesBatchResource), 'headers': context.headers,
+        'body': json_util.dumps([{'op': 'create', 'text': context.text()} for _ in range(5)] + [
+            {'op': 'update', 'id': str(note_id), 'text': context.text()}
+            for note_id in context.rand.sample(context.note_ids, 5)])}),
+    'GET /notes/sync': (resources.UserNotesSyncResource, lambda context: {
+        'method': 'GET', 'path': context.path(resources.UserNotesSyncResource), 'headers': context.headers}),
+    'GET /notes/search': (resources.UserNotesSearchResource, lambda context: {
+        'method': 'GET', 'path': context.path(resources.UserNotesSearchResource), 'headers': context.headers,
+        'query_string': 'q={}'.format(context.rand.choice(WORDS))}),
+}
+
+
+def _seed(database, notes: int, seed: int) -> Tuple[User, List[ObjectId]]:
+    rand = random.Random(seed)
+    now = datetime.datetime.now()
+    user_data = {'_id': ObjectId(), 'authToken': crypto.generate_token(), 'authTokenExpiry': now + AUTH_TOKEN_LIFETIME,
+                 'dateCreated': now}
+    database['users'].insert_one(dict(user_data))
+    database['authProviders'].insert_one({'type': 'google', 'userIdentifier': SUBJECT, 'user': user_data['_id'],
+                                          'dateCreated': now})
+
+    note_ids = []
+    for index in range(notes):
+        modified = now - datetime.timedelta(minutes=index)
+        note_ids.append(database['notes'].insert_one({
+            'user': user_data['_id'], 'text': ' '.join(rand.choices(WORDS, k=40)), 'dateCreated': modified,
+            'dateModified': modified}).inserted_id)
+
+    return User(user_data), note_ids
+
+
+def _measure(client: testing.TestClient, context: _Context, scenario: Scenario, iterations: int,
+             allocation_iterations: int) -> Dict:
+    for _ in range(min(10, iterations)):
+        resp = client.simulate_request(**scenario(context))
+        assert resp.status_code < 400, 'The benchmark request failed with {}: {}'.format(resp.status, resp.text)
+
+    timings = []
+    commands = 0
+    for _ in range(iterations):
+        request = scenario(context)
+        before = sum(context.commands.values())
+        start = time.perf_counter()
+        client.simulate_request(**request)
+        timings.append(time.perf_counter() - start)
+        commands += sum(context.commands.values()) - before
+
+    # Tracing slows requests down severalfold, so allocations are measured in a separate pass. Restarting tracemalloc
+    # for each request resets its peak.
+    peaks = []
+    for _ in range(allocation_iterations):
+        request = scenario(context)
+        tracemalloc.start()
+        client.simulate_request(**request)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    quantiles = sorted(timings)
+    return {
+        'p50_us': round(statistics.median(timings) * 1e6, 1),
+        'p90_us': round(quantiles[int(len(quantiles) * 0.9)] * 1e6, 1),
+        'p99_us': round(quantiles[min(len(quantiles) - 1, int(len(quantiles) * 0.99))] * 1e6, 1),
+        'mean_us': round(statistics.mean(timings) * 1e6, 1),
+        'peak_bytes': int(statistics.median(peaks)) if peaks else 0,
+        'commands': round(commands / iterations, 2),
+    }
+
+
+def _regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    regressions = []
+    for endpoint, result in results.items():
+        expected = baseline.get(endpoint)
+        if expected is None:
+            continue
+
+        for metric in ('p50_us', 'peak_bytes'):
+            if result[metric] > expected[metric] * (1 + threshold):
+                regressions.append('{}: {} {} > {} (+{:.0%})'.format(
+                    endpoint, metric, result[metric], expected[metric], result[metric] / expected[metric] - 1))
+        if result['commands'] > expected['commands']:
+            regressions.append('{}: commands {} > {}'.format(endpoint, result['commands'], expected['commands']))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=('memory', 'mongod'), default='memory')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--allocation-iterations', type=int, default=50)
+    parser.add_argument('--notes', type=int, default=200, help='Number of notes seeded for the benchmark user.')
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--threshold', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # "/metrics" is operational rather than part of the API, and is only routed when METRICS_ENABLED is set.
+    missing = set(app.RESOURCE_MAP) - {resource for resource, _ in SCENARIOS.values()} - {resources.MetricsResource}
+    assert not missing, 'Routes without a benchmark scenario: {}'.format(missing)
+
+    mongo_client = None
+    if args.backend == 'mongod':
+        counter = _CommandCounter()
+        mongo_client = MongoClient(MONGO_HOST, MONGO_PORT, event_listeners=[counter])
+        database = mongo_client.jNotesBenchmark
+        setup.create_database(database)
+        commands = counter.commands
+    else:
+        database = MemoryDatabase()
+        commands = database.commands
+
+    results = {}
+    try:
+        user, note_ids = _seed(database, args.notes, args.seed)
+        context = _Context(database, commands, user, note_ids, args.seed)
+        client = testing.TestClient(app.create_app(CONFIG, collection_factory=database.__getitem__))
+
+        print('{:<26} {:>10} {:>10} {:>10} {:>10} {:>12} {:>9}'.format(
+            'endpoint', 'p50', 'p90', 'p99', 'mean', 'peak bytes', 'commands'))
+        with mock.patch('google.oauth2.id_token.verify_oauth2_token', return_value={'sub': SUBJECT}):
+            for endpoint in args.endpoints:
+                result = results[endpoint] = _measure(client, context, SCENARIOS[endpoint][1], args.iterations,
+                                                      args.allocation_iterations)
+                print('{:<26} {p50_us:>8.1f}us {p90_us:>8.1f}us {p99_us:>8.1f}us {mean_us:>8.1f}us '
+                      '{peak_bytes:>12} {commands:>9}'.format(endpoint, **result))
+    finally:
+        if mongo_client is not None:
+            mongo_client.drop_database(database)
+            mongo_client.close()
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({'backend': args.backend, 'results': results}, baseline_file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['backend'] != args.backend:
+            sys.exit('The baseline was recorded against the "{}" backend'.format(baseline['backend']))
+
+        regressions = _regressions(results, baseline['results'], args.threshold)
+        for regression in regressions:
+            print('REGRESSION {}'.format(regression))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""An in-memory stand-in for the subset of the pymongo "Collection" API the resources use, for benchmarking the request
+    path without a mongod. Every call that would be a server command is counted in "commands".
+
+    Only the query and update operators the API issues are understood ("$ne", "$in", "$lt"/"$gt" and friends, "$or",
+    a word-matching "$text", "$set"/"$unset"/"$setOnInsert"), along with the "$match", "$addFields", "$sort", "$limit",
+    "$project" and "$lookup" aggregation stages.
+"""
+import copy
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    '$lt': lambda value, operand: value < operand,
+    '$lte': lambda value, operand: value <= operand,
+    '$gt': lambda value, operand: value > operand,
+    '$gte': lambda value, operand: value >= operand,
+}
+
+
+class MemoryDatabase:
+
+    def __init__(self):
+        self.commands:     Counter = Counter()
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> 'MemoryCollection':
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name, self)
+        return self._collections[name]
+
+
+class MemoryCursor:
+
+    def __init__(self, documents: List[Dict], projection: Optional[Dict]):
+        self._documents:  List[Dict] = documents
+        self._projection: Optional[Dict] = projection
+        self._limit:      int = 0
+
+    def sort(self, keys: List) -> 'MemoryCursor':
+        self._documents = _sort(self._documents, keys)
+        return self
+
+    def limit(self, limit: int) -> 'MemoryCursor':
+        self._limit = limit
+        return self
+
+    def batch_size(self, _size: int) -> 'MemoryCursor':
+        return self
+
+    def __iter__(self) -> Iterator[Dict]:
+        documents = self._documents[:self._limit] if self._limit else self._documents
+        return (_project(document, self._projection) for document in documents)
+
+
+class MemoryCollection:
+
+    # The unique indexes (besides "_id") that the API relies on to resolve races, as in "db.setup".
+    UNIQUE_KEYS: Dict[str, List[tuple]] = {'authProviders': [('type', 'userIdentifier')]}
+
+    def __init__(self, name: str, database: MemoryDatabase):
+        self.name:         str = name
+        self.database:     MemoryDatabase = database
+        self.documents:    List[Dict] = []
+        self._unique_keys: List[tuple] = self.UNIQUE_KEYS.get(name, [])
+
+    def with_options(self, **_) -> 'MemoryCollection':
+        return self
+
+    def find(self, query: Dict = None, projection: Dict = None, **_) -> MemoryCursor:
+        self.database.commands['find'] += 1
+        return MemoryCursor([document for document in self.documents if _matches(document, query or {})], projection)
+
+    def find_one(self, query: Dict = None, projection: Dict = None, **_) -> Optional[Dict]:
+        self.database.commands['find'] += 1
+        document = self._find(query or {})
+        return None if document is None else _project(document, projection)
+
+    def insert_one(self, document: Dict, **_):
+        self.database.commands['insert'] += 1
+        self._insert(document)
+        return _Result(inserted_id=document['_id'])
+
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False, **_):
+        self.database.commands['update'] += 1
+        return self._update(query, update, upsert)
+
+    def delete_many(self, query: Dict, **_):
+        self.database.commands['delete'] += 1
+        self.documents = [document for document in self.documents if not _matches(document, query)]
+
+    def find_one_and_update(self, query: Dict, update: Dict, upsert: bool = False,
+                            return_document: bool = ReturnDocument.BEFORE, **_) -> Optional[Dict]:
+        self.database.commands['findAndModify'] += 1
+        before = self._find(query)
+        before = copy.deepcopy(before) if before is not None else None
+        result = self._update(query, update, upsert)
+        if return_document == ReturnDocument.AFTER:
+            return self._find({'_id': result.upserted_id}) if result.upserted_id else self._find(query)
+        return before
+
+    def bulk_write(self, requests: List, **_):
+        self.database.commands['insert' if isinstance(requests[0], InsertOne) else 'update'] += 1
+        for request in requests:
+            # pylint: disable=protected-access
+            if isinstance(request, InsertOne):
+                self._insert(request._doc)
+            elif isinstance(request, UpdateOne):
+                self._update(request._filter, request._doc, request._upsert)
+
+    def aggregate(self, pipeline: List[Dict], **_) -> List[Dict]:
+        self.database.commands['aggregate'] += 1
+        documents = [dict(document) for document in self.documents]
+        for stage in pipeline:
+            (operator, argument), = stage.items()
+            if operator == '$match':
+                documents = [document for document in documents if _matches(document, argument)]
+            elif operator == '$addFields':
+                text = next((value for value in argument.values() if value == {'$meta': 'textScore'}), None)
+                for document in documents:
+                    for field in argument:
+                        document[field] = document.get('_score', 0.0) if text else argument[field]
+            elif operator == '$sort':
+                documents = _sort(documents, list(argument.items()))
+            elif operator == '$limit':
+                documents = documents[:argument]
+            elif operator == '$project':
+                documents = [_project(document, argument) for document in documents]
+            elif operator == '$lookup':
+                foreign = self.database[argument['from']].documents
+                for document in documents:
+                    document[argument['as']] = [dict(other) for other in foreign if
+                                                other.get(argument['foreignField']) ==
+                                                document.get(argument['localField'])]
+        return documents
+
+    def _find(self, query: Dict) -> Optional[Dict]:
+        return next((document for document in self.documents if _matches(document, query)), None)
+
+    def _insert(self, document: Dict):
+        document.setdefault('_id', ObjectId())
+        for key in [('_id',)] + self._unique_keys:
+            if self._find({field: document.get(field) for field in key}) is not None:
+                raise DuplicateKeyError('E11000 duplicate key error')
+        self.documents.append(dict(document))
+
+    def _update(self, query: Dict, update: Dict, upsert: bool) -> '_Result':
+        document = self._find(query)
+        if document is None:
+            if not upsert:
+                return _Result(matched_count=0)
+            document = {field: value for field, value in query.items() if not field.startswith('$')
+                        and not isinstance(value, dict)}
+            document.update(update.get('$setOnInsert', {}))
+            document.update(update.get('$set', {}))
+            self._insert(document)
+            return _Result(matched_count=0, upserted_id=document['_id'])
+
+        document.update(update.get('$set', {}))
+        for field in update.get('$unset', {}):
+            document.pop(field, None)
+        return _Result(matched_count=1)
+
+
+class _Result:
+
+    def __init__(self, matched_count: int = 0, inserted_id: ObjectId = None, upserted_id: ObjectId = None):
+        self.matched_count: int = matched_count
+        self.inserted_id:   ObjectId = inserted_id
+        self.upserted_id:   ObjectId = upserted_id
+
+
+def _matches(document: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(_matches(document, option) for option in condition):
+                return False
+        elif field == '$text':
+            words = set(re.findall(r'\w+', condition['$search'].lower()))
+            score = sum(word in words for word in re.findall(r'\w+', (document.get('text') or '').lower()))
+            if not score:
+                return False
+            document['_score'] = float(score)
+        elif not _matches_condition(document.get(field, _MISSING), condition):
+            return False
+
+    return True
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return value == condition
+
+    for operator, operand in condition.items():
+        if operator == '$ne':
+            if value is not _MISSING and value == operand:
+                return False
+        elif operator == '$in':
+            if value not in operand:
+                return False
+        elif value is _MISSING or value is None or not _COMPARISONS[operator](value, operand):
+            return False
+
+    return True
+
+
+def _sort(documents: List[Dict], keys: List) -> List[Dict]:
+    for field, direction in reversed(keys):
+        # pylint: disable=cell-var-from-loop
+        documents = sorted(documents, key=lambda document: document.get(field), reverse=direction == -1)
+    return documents
+
+
+def _project(document: Dict, projection: Optional[Dict]) -> Dict:
+    document = {field: value for field, value in document.items() if field != '_score'}
+    if not projection:
+        return document
+
+    included = {field for field, value in projection.items() if value and field != '_id'}
+    if not included:
+        return {field: value for field, value in document.items() if projection.get(field, True)}
+
+    projected = {field: document[field] for field in included if field in document}
+    if projection.get('_id', True) and '_id' in document:
+        projected['_id'] = document['_id']
+    return projected
@@ -0,0 +1,63 @@
+"""Measures the overhead of request instrumentation: the MetricsMiddleware's cost per request and the CommandMetrics
+    listener's cost per Mongo command.
+
+    Requests go through falcon's TestClient to a resource that reports "--commands" Mongo commands to the listener, so
+    the comparison isolates the instrumentation from Mongo itself.
+
+    Usage: python -m j_notes_api.benchmarks.metrics [--requests 5000] [--commands 2]
+"""
+import argparse
+import time
+from typing import Optional
+from unittest.mock import MagicMock
+
+import falcon
+from falcon import testing
+
+from j_notes_api.middleware.metrics import MetricsMiddleware
+from j_notes_api.services import CommandMetrics, Metrics
+
+
+class _Resource:
+
+    def __init__(self, listener: CommandMetrics, commands: int):
+        self._listener: CommandMetrics = listener
+        self._events:   list = [MagicMock(command_name='find', duration_micros=1000) for _ in range(commands)]
+
+    def on_get(self, _req: falcon.Request, resp: falcon.Response):
+        for event in self._events:
+            self._listener.succeeded(event)
+        resp.body = '[]'
+
+
+def _run(requests: int, commands: int, metrics: Optional[Metrics]) -> float:
+    listener = CommandMetrics(metrics or Metrics())
+    api = falcon.API(middleware=[MetricsMiddleware(metrics, {_Resource: '/'})] if metrics is not None else [])
+    # Without instrumentation no listener would be registered, so the resource reports to one only when measuring.
+    api.add_route('/', _Resource(listener, commands if metrics is not None else 0))
+    client = testing.TestClient(api)
+    for _ in range(100):
+        client.simulate_get('/')
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.simulate_get('/')
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--commands', type=int, default=2, help='Mongo commands reported per request.')
+    args = parser.parse_args()
+
+    plain = _run(args.requests, args.commands, None)
+    instrumented = _run(args.requests, args.commands, Metrics())
+    print('requests: {}, commands per request: {}'.format(args.requests, args.commands))
+    print('without instrumentation {:8.1f}us/request'.format(plain * 1e6))
+    print('with instrumentation    {:8.1f}us/request (+{:.1f}us, +{:.1%})'.format(
+        instrumented * 1e6, (instrumented - plain) * 1e6, instrumented / plain - 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Compares the memory footprint and construction time of the slotted models against dict backed ones.
+
+    Usage: python -m j_notes_api.benchmarks.models [--count 10000] [--text-length 500]
+"""
+import argparse
+import datetime
+import timeit
+import tracemalloc
+
+from bson import BSON, ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from j_notes_api.models import Note
+
+
+class DictNote:
+    """The previous model layout: every field decoded up front into the instance "__dict__"."""
+
+    def __init__(self, data, uuid=None):
+        self.uuid = uuid if uuid else data.get('_id')
+        self.user = data.get('user')
+        self.text = data.get('text')
+        self.date_created = data.get('dateCreated')
+        self.date_modified = data.get('dateModified')
+
+
+def _footprint(factory, documents) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    models = [factory(document) for document in documents]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del models
+    return (after - before) / len(documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--text-length', type=int, default=500)
+    args = parser.parse_args()
+
+    now = datetime.datetime.now()
+    documents = [{'_id': ObjectId(), 'user': ObjectId(), 'text': 'note text ' * (args.text_length // 10),
+                  'dateCreated': now, 'dateModified': now} for _ in range(args.count)]
+    raw_documents = [RawBSONDocument(BSON.encode(document)) for document in documents]
+
+    cases = (
+        ('dict model', DictNote, documents),
+        ('slots model', Note, documents),
+        ('slots model (raw)', Note, raw_documents),
+    )
+    print('{:<20} {:>14} {:>14} {:>14}'.format('', 'bytes/instance', 'construct', 'construct+read'))
+    for name, factory, inputs in cases:
+        footprint = _footprint(factory, inputs)
+        construct = min(timeit.repeat(lambda: [factory(document) for document in inputs],  # pylint: disable=W0640
+                                      number=1, repeat=5)) / len(inputs)
+        read = min(timeit.repeat(lambda: [factory(document).text for document in inputs],  # pylint: disable=W0640
+                                 number=1, repeat=5)) / len(inputs)
+        print('{:<20} {:>14.0f} {:>12.2f}us {:>12.2f}us'.format(name, footprint, construct * 1e6, read * 1e6))
+
+
+if __name__ == '__main__':
+    main()
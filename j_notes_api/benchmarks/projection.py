@@ -0,0 +1,75 @@
+"""Measures the response bytes and latency saved by "fields=" projections and "summary" mode on the notes list.
+
+    Requires a reachable mongod (MONGO_HOST/MONGO_PORT). Notes are seeded into a scratch "jNotesBenchmark" database,
+    which is dropped afterwards.
+
+    Usage: python -m j_notes_api.benchmarks.projection [--notes 200] [--text-length 5000] [--iterations 50]
+"""
+import argparse
+import datetime
+import statistics
+import time
+from typing import Dict
+
+import falcon
+from bson import ObjectId
+from falcon import testing
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.db import get_client
+from j_notes_api.models import User
+from j_notes_api.resources import UserNotesListResource
+
+QUERIES: Dict[str, str] = {
+    'full': '',
+    'fields=_id,dateModified': 'fields=_id,dateModified',
+    'summary=true': 'summary=true',
+}
+
+
+class _StaticAuthMiddleware:
+
+    def __init__(self, user: User):
+        self._user: User = user
+
+    def process_resource(self, req: falcon.Request, *_):
+        req.user = self._user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=200)
+    parser.add_argument('--text-length', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    database = get_client().jNotesBenchmark
+    user = User({'_id': ObjectId()})
+    now = datetime.datetime.now()
+    database.notes.insert_many([{'user': user.uuid, 'text': 'x' * args.text_length, 'dateCreated': now,
+                                 'dateModified': now - datetime.timedelta(seconds=index)}
+                                for index in range(args.notes)])
+    database.notes.create_index([('user', 1), ('dateModified', -1), ('_id', -1)])
+
+    api = falcon.API(middleware=_StaticAuthMiddleware(user))
+    api.add_route(RESOURCE_MAP[UserNotesListResource], UserNotesListResource(database.notes))
+    client = testing.TestClient(api)
+    path = RESOURCE_MAP[UserNotesListResource].format(user_id=user.uuid)
+
+    try:
+        print('notes: {}, text length: {}'.format(args.notes, args.text_length))
+        for name, query in QUERIES.items():
+            query = '&'.join(filter(None, [query, 'limit={}'.format(UserNotesListResource.MAX_LIMIT)]))
+            timings = []
+            size = 0
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                size = len(client.simulate_get(path, query_string=query).content)
+                timings.append(time.perf_counter() - start)
+            print('{:<26} {:>10}B  median: {:7.2f}ms'.format(name, size, statistics.median(timings) * 1000))
+    finally:
+        get_client().drop_database(database)
+
+
+if __name__ == '__main__':
+    main()
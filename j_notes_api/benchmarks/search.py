@@ -0,0 +1,89 @@
+"""Shows that note search latency follows the number of matching notes rather than the size of the corpus.
+
+    Requires a reachable mongod (MONGO_HOST/MONGO_PORT). A synthetic corpus of up to "--corpus" notes, spread over
+    "--users" users, is seeded into a scratch "jNotesBenchmark" database (dropped afterwards) with the registry's
+    indexes. One in ten notes contains a marker word. The searching user owns "matches" of them, and the search
+    endpoint's median latency is reported for each combination of corpus size and match count.
+
+    Usage: python -m j_notes_api.benchmarks.search [--corpus 100000] [--users 100] [--iterations 20]
+"""
+import argparse
+import datetime
+import random
+import statistics
+import time
+from typing import Dict, List
+
+import falcon
+from bson import ObjectId
+from falcon import testing
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.benchmarks.projection import _StaticAuthMiddleware
+from j_notes_api.db import get_client, setup
+from j_notes_api.models import User
+from j_notes_api.resources import UserNotesSearchResource
+
+WORDS: List[str] = ('shopping list meeting agenda travel plans recipe garden books ideas project budget call notes '
+                    'weekend groceries reminder birthday gift music movie workout doctor school invoice').split()
+MARKER: str = 'zephyr'
+
+
+def _note(user: ObjectId, rand: random.Random, now: datetime.datetime, marker: bool = False) -> Dict:
+    words = rand.choices(WORDS, k=40)
+    if marker:
+        words[rand.randrange(len(words))] = MARKER
+    return {'user': user, 'text': ' '.join(words), 'dateCreated': now, 'dateModified': now}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--matches', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    database = get_client().jNotesBenchmark
+    rand = random.Random(args.seed)
+    now = datetime.datetime.now()
+    user = User({'_id': ObjectId()})
+    others = [ObjectId() for _ in range(args.users - 1)]
+
+    api = falcon.API(middleware=_StaticAuthMiddleware(user))
+    api.add_route(RESOURCE_MAP[UserNotesSearchResource], UserNotesSearchResource(database.notes))
+    client = testing.TestClient(api)
+    path = RESOURCE_MAP[UserNotesSearchResource].format(user_id=user.uuid)
+
+    try:
+        setup.sync_indexes(database)
+        print('{:>10} {:>8} {:>12}'.format('corpus', 'matches', 'median'))
+        for corpus in (args.corpus // 10, args.corpus):
+            database.notes.delete_many({})
+            seeded = 0
+            while seeded < corpus:
+                batch = min(10000, corpus - seeded)
+                # Other users' notes contain the marker too, so only the per-user index partition keeps them out.
+                database.notes.insert_many([_note(rand.choice(others), rand, now, marker=rand.random() < 0.1)
+                                            for _ in range(batch)])
+                seeded += batch
+
+            inserted = 0
+            for matches in sorted(args.matches):
+                database.notes.insert_many([_note(user.uuid, rand, now, marker=True)
+                                            for _ in range(matches - inserted)])
+                inserted = matches
+
+                timings = []
+                for _ in range(args.iterations):
+                    start = time.perf_counter()
+                    client.simulate_get(path, query_string='q={}'.format(MARKER))
+                    timings.append(time.perf_counter() - start)
+                print('{:>10} {:>8} {:>10.2f}ms'.format(corpus, matches, statistics.median(timings) * 1000))
+    finally:
+        get_client().drop_database(database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Compares "dumps_note" against "json_util.dumps" for note documents.
+
+    Usage: python -m j_notes_api.benchmarks.serializers [--text-length 500] [--number 20000]
+"""
+import argparse
+import datetime
+import timeit
+
+from bson import ObjectId, json_util
+
+from j_notes_api.serializers import dumps_note
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--text-length', type=int, default=500)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    now = datetime.datetime.now()
+    note = {'_id': ObjectId(), 'user': ObjectId(), 'text': 'note text ' * (args.text_length // 10),
+            'dateCreated': now, 'dateModified': now}
+    assert dumps_note(note) == json_util.dumps(note)
+
+    results = {}
+    for name, dumps in (('json_util.dumps', json_util.dumps), ('dumps_note', dumps_note)):
+        results[name] = min(timeit.repeat(lambda: dumps(note), number=args.number, repeat=5)) / args.number
+        print('{:<16} {:8.2f}us/note'.format(name, results[name] * 1e6))
+    print('speedup: {:.1f}x'.format(results['json_util.dumps'] / results['dumps_note']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Measures how long a fresh worker takes to import the API and to answer its first requests, and guards both with
+    a budget.
+
+    Every measurement runs in a new interpreter, as a worker booting (or a scale-out) would. The import is timed with
+    "python -X importtime" for "--module" ("j_notes_api.wsgi", which builds the app from the environment, by default;
+    CLIENT_ID is set for it), and the packages that took the longest are listed. The first requests are timed by
+    building the app from the "benchmarks.endpoints" configuration over in-memory collections (see
+    "benchmarks.memory"), then sending a note GET twice (cold then warm) and a first sign-in, which is when google-auth
+    gets imported (Google's id token verification itself is stubbed out). Each figure is the median of "--runs"
+    interpreters.
+
+    Exits with status 1 when the import takes longer than "--import-budget-ms", the first request longer than
+    "--first-request-budget-ms", or when a module of "--lazy" (imported on first use only) was imported at startup.
+
+    Usage: python -m j_notes_api.benchmarks.startup [--runs 5] [--module j_notes_api.wsgi] [--top 8]
+               [--import-budget-ms 150] [--first-request-budget-ms 10] [--lazy google requests]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+_IMPORT_TIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def _import_times(module: str) -> Tuple[float, Counter]:
+    """Imports "module" in a new interpreter, returning its cumulative import time and the time spent in each top-level
+        package, in microseconds.
+    """
+    env = dict(os.environ, CLIENT_ID=os.getenv('CLIENT_ID', 'benchmark-client-id'))
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)], env=env,
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    total = 0
+    packages = Counter()
+    for line in process.stderr.splitlines():
+        match = _IMPORT_TIME_PATTERN.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name.split('.')[0]] += int(self_us)
+        if name == module and not indent:
+            total = int(cumulative_us)
+
+    return total, packages
+
+
+def _first_requests() -> Dict[str, float]:
+    """Runs in the child interpreter: builds the app and times its first requests, in milliseconds."""
+    start = time.perf_counter()
+    from unittest import mock
+
+    from falcon import testing
+
+    from j_notes_api import app, resources
+    from j_notes_api.benchmarks.endpoints import _seed, CONFIG, SUBJECT
+    from j_notes_api.benchmarks.memory import MemoryDatabase
+    from j_notes_api.services import crypto
+    imported = time.perf_counter()
+
+    database = MemoryDatabase()
+    user, note_ids = _seed(database, 10, 0)
+    seeded = time.perf_counter()
+    client = testing.TestClient(app.create_app(CONFIG, collection_factory=database.__getitem__))
+    built = time.perf_counter()
+
+    path = app.RESOURCE_MAP[resources.UserNotesResource].format(user_id=user.uuid, note_id=note_ids[0])
+    headers = {'Authorization': crypto.generate_jwt(user, CONFIG.client_id).decode()}
+    timings = {'import_ms': imported - start, 'create_app_ms': built - seeded}
+    for name in ('first_request_ms', 'warm_request_ms'):
+        request_start = time.perf_counter()
+        resp = client.simulate_get(path, headers=headers)
+        timings[name] = time.perf_counter() - request_start
+        assert resp.status_code < 400, 'The benchmark request failed with {}: {}'.format(resp.status, resp.text)
+
+    # Patching imports google-auth, which is part of what the first sign-in pays for.
+    request_start = time.perf_counter()
+    with mock.patch('google.oauth2.id_token.verify_oauth2_token', return_value={'sub': SUBJECT}):
+        resp = client.simulate_post(app.RESOURCE_MAP[resources.SessionsResource], headers={'Authorization': 'token'})
+    timings['first_sign_in_ms'] = time.perf_counter() - request_start
+    assert resp.status_code < 400, 'The benchmark sign-in failed with {}: {}'.format(resp.status, resp.text)
+
+    return {name: seconds * 1e3 for name, seconds in timings.items()}
+
+
+def _run_first_requests() -> Dict[str, float]:
+    process = subprocess.run([sys.executable, '-m', __spec__.name, '--child'], stdout=subprocess.PIPE,
+                             universal_newlines=True, check=True)
+    return json.loads(process.stdout)
+
+
+def _median(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Interpreters started per measurement.')
+    parser.add_argument('--module', default='j_notes_api.wsgi', help='The module whose import is timed.')
+    parser.add_argument('--top', type=int, default=8, help='Packages listed by import time.')
+    parser.add_argument('--import-budget-ms', type=float, default=150)
+    parser.add_argument('--first-request-budget-ms', type=float, default=10)
+    parser.add_argument('--lazy', nargs='*', default=['google', 'requests'],
+                        help='Top-level packages that must not be imported at startup.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_first_requests()))
+        return
+
+    import_runs = [_import_times(args.module) for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in import_runs) / 1e3
+    packages = Counter()
+    for _, run_packages in import_runs:
+        packages.update(run_packages)
+    requests = _median([_run_first_requests() for _ in range(args.runs)])
+
+    print('import {}: {:.1f}ms (median of {} interpreters)'.format(args.module, import_ms, args.runs))
+    for package, total_us in packages.most_common(args.top):
+        print('    {:<20} {:>8.1f}ms'.format(package, total_us / args.runs / 1e3))
+    print('first requests (memory backend):')
+    for name, value in requests.items():
+        print('    {:<20} {:>8.1f}ms'.format(name[:-3], value))
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append('importing {} took {:.1f}ms, over the {}ms budget'.format(
+            args.module, import_ms, args.import_budget_ms))
+    if requests['first_request_ms'] > args.first_request_budget_ms:
+        failures.append('the first request took {:.1f}ms, over the {}ms budget'.format(
+            requests['first_request_ms'], args.first_request_budget_ms))
+    for package in args.lazy:
+        if package in packages:
+            failures.append('{} was imported at startup'.format(package))
+
+    for failure in failures:
+        print('REGRESSION {}'.format(failure))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
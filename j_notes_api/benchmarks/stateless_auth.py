@@ -0,0 +1,84 @@
+"""Measures AuthMiddleware's per-request overhead when tokens are checked against "users" and when they are verified
+    statelessly against a revocation filter.
+
+    Mongo is replaced by in-memory collections that sleep for "--latency-ms" per query to stand in for a round trip.
+
+    Usage: python -m j_notes_api.benchmarks.stateless_auth [--requests 2000] [--users 50] [--latency-ms 0.5]
+"""
+import argparse
+import random
+import time
+from typing import List, Optional
+from unittest.mock import MagicMock
+
+from bson import ObjectId
+
+from j_notes_api.benchmarks.auth_cache import CLIENT_ID, _build_users
+from j_notes_api.middleware.auth import AuthMiddleware
+from j_notes_api.models import User
+from j_notes_api.services import crypto, RevocationList
+
+
+def _collection(latency: float, find_one, find=None) -> MagicMock:
+    def delayed(function):
+        def call(*args, **kwargs):
+            time.sleep(latency)
+            return function(*args, **kwargs)
+        return call
+
+    collection = MagicMock()
+    collection.find_one.side_effect = delayed(find_one)
+    collection.find.side_effect = delayed(find or (lambda *_: []))
+    return collection
+
+
+def _run(users: List[User], requests: int, latency: float, revoked: int, stateless: bool, seed: int):
+    documents = {(user.uuid, user.auth_token): {'_id': user.uuid, 'authToken': user.auth_token,
+                                                'authTokenExpiry': user.auth_token_expiry,
+                                                'dateCreated': user.date_created} for user in users}
+    users_collection = _collection(latency, lambda query: documents.get((query['_id'], query['authToken'])))
+    revoked_ids = [str(ObjectId()) for _ in range(revoked)]
+    revoked_tokens = _collection(latency, lambda query, _projection: None,
+                                 lambda *_: [{'_id': token_id} for token_id in revoked_ids])
+    revocation_list: Optional[RevocationList] = RevocationList(revoked_tokens) if stateless else None
+
+    middleware = AuthMiddleware(CLIENT_ID, users_collection, revocation_list=revocation_list)
+    tokens = [crypto.generate_jwt(user, CLIENT_ID) for user in users]
+    req = MagicMock()
+    headers = {}
+    req.get_header.side_effect = headers.get
+
+    # Warms up the revocation filter, whose initial load is a one-off cost per process.
+    headers['Authorization'] = tokens[0]
+    middleware.process_resource(req, None, None, {})
+    users_collection.find_one.reset_mock()
+
+    rand = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(requests):
+        headers['Authorization'] = rand.choice(tokens)
+        middleware.process_resource(req, None, None, {})
+    elapsed = time.perf_counter() - start
+
+    return elapsed / requests, users_collection.find_one.call_count + revoked_tokens.find_one.call_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--revoked', type=int, default=10000, help='Number of revoked token ids in the filter.')
+    parser.add_argument('--latency-ms', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    users = _build_users(args.users)
+    print('requests: {}, distinct users: {}, simulated round trip: {}ms, revoked ids: {}'.format(
+        args.requests, args.users, args.latency_ms, args.revoked))
+    for name, stateless in (('stateful', False), ('stateless', True)):
+        per_request, queries = _run(users, args.requests, args.latency_ms / 1000, args.revoked, stateless, args.seed)
+        print('{:<10} {:8.1f}us/request, {:>6} per-request queries'.format(name, per_request * 1e6, queries))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Compares peak RSS and time-to-first-byte of "json_util.dumps" bodies against "stream_json_array" streams.
+
+    Each mode runs in its own process so peak RSS readings don't leak between them.
+
+    Usage: python -m j_notes_api.benchmarks.streaming [--notes 10000] [--text-length 1000]
+"""
+import argparse
+import datetime
+import multiprocessing
+import resource
+import time
+from typing import Dict, Iterator
+
+import falcon
+from bson import ObjectId, json_util
+from falcon import testing
+
+from j_notes_api.serializers import stream_json_array
+
+
+def _cursor(count: int, text_length: int) -> Iterator[Dict]:
+    """Stands in for a pymongo cursor, which decodes documents lazily as they are iterated."""
+    user = ObjectId()
+    now = datetime.datetime.now()
+    for _ in range(count):
+        yield {'_id': ObjectId(), 'user': user, 'text': 'x' * text_length, 'dateCreated': now, 'dateModified': now}
+
+
+class _NotesResource:
+
+    def __init__(self, mode: str, count: int, text_length: int):
+        self._mode:        str = mode
+        self._count:       int = count
+        self._text_length: int = text_length
+
+    def on_get(self, _req: falcon.Request, resp: falcon.Response):
+        cursor = _cursor(self._count, self._text_length)
+        if self._mode == 'dumps':
+            resp.body = json_util.dumps(cursor)
+        else:
+            resp.stream = stream_json_array(cursor)
+
+
+def _measure(mode: str, count: int, text_length: int, results: multiprocessing.Queue):
+    api = falcon.API()
+    api.add_route('/notes', _NotesResource(mode, count, text_length))
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    body = iter(api(testing.create_environ('/notes'), lambda *_: None))
+    first_chunk = next(body)
+    first_byte = time.perf_counter() - start
+    size = len(first_chunk) + sum(len(chunk) for chunk in body)
+    total = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss
+    results.put((mode, first_byte, total, peak_rss, size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=10000)
+    parser.add_argument('--text-length', type=int, default=1000)
+    args = parser.parse_args()
+
+    results = multiprocessing.Queue()
+    print('notes: {}, text length: {}'.format(args.notes, args.text_length))
+    for mode in ('dumps', 'stream'):
+        process = multiprocessing.Process(target=_measure, args=(mode, args.notes, args.text_length, results))
+        process.start()
+        process.join()
+        mode, first_byte, total, peak_rss, size = results.get()
+        print('{:<6}  ttfb: {:8.2f}ms  total: {:8.2f}ms  peak rss growth: {:8d}KiB  body: {}B'.format(
+            mode, first_byte * 1000, total * 1000, peak_rss, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Counts the Mongo writes made for bursts of note autosaves, with and without a WriteBehindBuffer.
+
+    "--editors" users each save their note "--saves" times, "--interval" seconds apart, through UserNotesResource
+    against in-memory collections (see "benchmarks.memory"). Without a buffer every save is its own write command;
+    with one, saves of a note within "--window" seconds are written once, in "bulk_write" batches shared by all notes.
+
+    Usage: python -m j_notes_api.benchmarks.write_behind [--editors 50] [--saves 20] [--interval 0.05] [--window 0.5]
+"""
+import argparse
+import datetime
+import json
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+import falcon
+from bson import ObjectId
+from falcon import testing
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.benchmarks.memory import MemoryDatabase
+from j_notes_api.db.setup import VALIDATORS
+from j_notes_api.models import User
+from j_notes_api.resources import UserNotesResource
+from j_notes_api.services import WriteBehindBuffer
+
+
+class _UserMiddleware:
+
+    def __init__(self, users: Dict[str, User]):
+        self._users: Dict[str, User] = users
+
+    def process_resource(self, req: falcon.Request, _resp: falcon.Response, _resource: object, params: Dict):
+        req.user = self._users[params['user_id']]
+
+
+def _seed(database: MemoryDatabase, editors: int) -> List[Tuple[User, ObjectId]]:
+    now = datetime.datetime.now() - datetime.timedelta(days=1)
+    notes = []
+    for _ in range(editors):
+        user = User({'_id': ObjectId(), 'authToken': 'benchmark-auth-token', 'authTokenExpiry': datetime.datetime.max,
+                     'dateCreated': now})
+        note_id = database['notes'].insert_one({'user': user.uuid, 'text': '', 'dateCreated': now,
+                                                'dateModified': now}).inserted_id
+        notes.append((user, note_id))
+    return notes
+
+
+def _run(editors: int, saves: int, interval: float, window: Optional[float]) -> Dict:
+    database = MemoryDatabase()
+    notes = _seed(database, editors)
+    database.commands.clear()
+
+    buffer = None
+    if window:
+        buffer = WriteBehindBuffer(database['notes'], window, schema=VALIDATORS['notes']['$jsonSchema'])
+    api = falcon.API(middleware=_UserMiddleware({str(user.uuid): user for user, _ in notes}))
+    api.add_route(RESOURCE_MAP[UserNotesResource], UserNotesResource(database['notes'], None, buffer))
+    client = testing.TestClient(api)
+
+    timings = []
+    start = time.perf_counter()
+    for save in range(saves):
+        for user, note_id in notes:
+            path = RESOURCE_MAP[UserNotesResource].format(user_id=user.uuid, note_id=note_id)
+            request_start = time.perf_counter()
+            resp = client.simulate_put(path, body=json.dumps({'text': 'draft {}'.format(save)}))
+            timings.append(time.perf_counter() - request_start)
+            assert resp.status_code < 400, resp.text
+        time.sleep(max(0.0, start + (save + 1) * interval - time.perf_counter()))
+    if buffer is not None:
+        buffer.close()
+
+    latest = {document['text'] for document in database['notes'].documents}
+    assert latest == {'draft {}'.format(saves - 1)}, 'The last save of every note should have been written'
+
+    # A save is written with "findAndModify", which returns the body it replaces; a flush with "update".
+    commands = database.commands['update'] + database.commands['findAndModify']
+    return {
+        'commands': commands,
+        'writes': buffer.writes if buffer is not None else commands,
+        'put_p50_us': statistics.median(timings) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--editors', type=int, default=50)
+    parser.add_argument('--saves', type=int, default=20, help='Saves per editor.')
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between an editor\'s saves.')
+    parser.add_argument('--window', type=float, default=0.5, help='The write-behind window in seconds.')
+    args = parser.parse_args()
+
+    direct = _run(args.editors, args.saves, args.interval, None)
+    buffered = _run(args.editors, args.saves, args.interval, args.window)
+
+    print('saves: {} ({} editors x {}, every {}s), window: {}s'.format(
+        args.editors * args.saves, args.editors, args.saves, args.interval, args.window))
+    print('direct:       {commands:>6} write commands, {writes:>6} note writes, PUT p50 {put_p50_us:.1f}us'.format(
+        **direct))
+    print('write-behind: {commands:>6} write commands, {writes:>6} note writes, PUT p50 {put_p50_us:.1f}us'.format(
+        **buffered))
+    print('write ops saved: {} ({:.0%}), round trips saved: {}'.format(
+        direct['writes'] - buffered['writes'], 1 - buffered['writes'] / direct['writes'],
+        direct['commands'] - buffered['commands']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+from typing import Dict, Mapping
+
+from j_notes_api import db
+
+
+class Config:
+    """Everything "create_app" needs to build the API. "from_env" reads it from the environment variables listed
+        alongside each setting, so that importing the package never depends on them.
+    """
+
+    def __init__(self, client_id: str = None, *,
+                 auth_cache_size: int = 1024,
+                 auth_cache_ttl: int = 300,
+                 compression_min_size: int = 1024,
+                 compression_level: int = 6,
+                 notes_read_preference: str = None,
+                 stateless_auth: bool = False,
+                 revocation_refresh_interval: int = 30,
+                 metrics_enabled: bool = False,
+                 admission_user_rate: float = 0,
+                 admission_user_burst: float = 20,
+                 admission_max_in_flight: int = 0,
+                 admission_shared_path: str = None,
+                 write_behind_window: float = 0,
+                 write_behind_max_batch: int = 500,
+                 note_body_max_size: int = 64 * 1024 * 1024,
+                 mongo_host: str = 'localhost',
+                 mongo_port: int = 27017,
+                 mongo_database: str = 'jNotesDB',
+                 mongo_options: Dict[str, int] = None,
+                 log_level: str = 'DEBUG'):
+        self.client_id:                   str = client_id
+        self.auth_cache_size:             int = auth_cache_size
+        self.auth_cache_ttl:              int = auth_cache_ttl
+        self.compression_min_size:        int = compression_min_size
+        self.compression_level:           int = compression_level
+        self.notes_read_preference:       str = notes_read_preference
+        self.stateless_auth:              bool = stateless_auth
+        self.revocation_refresh_interval: int = revocation_refresh_interval
+        self.metrics_enabled:             bool = metrics_enabled
+        self.admission_user_rate:         float = admission_user_rate
+        self.admission_user_burst:        float = admission_user_burst
+        self.admission_max_in_flight:     int = admission_max_in_flight
+        self.admission_shared_path:       str = admission_shared_path
+        self.write_behind_window:         float = write_behind_window
+        self.write_behind_max_batch:      int = write_behind_max_batch
+        self.note_body_max_size:          int = note_body_max_size
+        self.mongo_host:                  str = mongo_host
+        self.mongo_port:                  int = mongo_port
+        self.mongo_database:              str = mongo_database
+        # "MongoClient" pool and timeout settings (see "db.CLIENT_OPTIONS").
+        self.mongo_options:               Dict[str, int] = mongo_options or {}
+        self.log_level:                   str = log_level
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = None) -> 'Config':
+        environ = os.environ if environ is None else environ
+        return cls(
+            environ.get('CLIENT_ID'),
+            auth_cache_size=int(environ.get('AUTH_CACHE_SIZE', '1024')),
+            auth_cache_ttl=int(environ.get('AUTH_CACHE_TTL', '300')),
+            compression_min_size=int(environ.get('COMPRESSION_MIN_SIZE', '1024')),
+            compression_level=int(environ.get('COMPRESSION_LEVEL', '6')),
+            notes_read_preference=environ.get('NOTES_READ_PREFERENCE'),
+            stateless_auth=environ.get('STATELESS_AUTH', 'false').lower() == 'true',
+            revocation_refresh_interval=int(environ.get('REVOCATION_REFRESH_INTERVAL', '30')),
+            metrics_enabled=environ.get('METRICS_ENABLED', 'false').lower() == 'true',
+            admission_user_rate=float(environ.get('ADMISSION_USER_RATE', '0')),
+            admission_user_burst=float(environ.get('ADMISSION_USER_BURST', '20')),
+            admission_max_in_flight=int(environ.get('ADMISSION_MAX_IN_FLIGHT', '0')),
+            admission_shared_path=environ.get('ADMISSION_SHARED_PATH'),
+            write_behind_window=float(environ.get('WRITE_BEHIND_WINDOW', '0')),
+            write_behind_max_batch=int(environ.get('WRITE_BEHIND_MAX_BATCH', '500')),
+            note_body_max_size=int(environ.get('NOTE_BODY_MAX_SIZE', str(64 * 1024 * 1024))),
+            mongo_host=environ.get('MONGO_HOST', 'localhost'),
+            mongo_port=int(environ.get('MONGO_PORT', '27017')),
+            mongo_database=environ.get('MONGO_DATABASE', 'jNotesDB'),
+            mongo_options=db.client_options(environ),
+            log_level=environ.get('LOG_LEVEL', 'DEBUG'),
+        )
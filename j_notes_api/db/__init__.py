@@ -1,9 +1,152 @@
+import datetime
 import os
+import threading
+from typing import Any, Dict, List, Mapping, Tuple
 
-from pymongo import MongoClient
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import monitoring, MongoClient
+from pymongo.collection import Collection
 from pymongo.database import Database
 
-MONGO_HOST:   str = os.getenv('MONGO_HOST', 'localhost')
-MONGO_PORT:   int = int(os.getenv('MONGO_PORT', '27017'))
-MONGO_CLIENT: MongoClient = MongoClient(MONGO_HOST, MONGO_PORT)
-NOTES_DB:     Database = MONGO_CLIENT.jNotesDB
+# Defaults for tools that talk to Mongo directly; the API itself is pointed at Mongo with "configure".
+MONGO_HOST:     str = os.getenv('MONGO_HOST', 'localhost')
+MONGO_PORT:     int = int(os.getenv('MONGO_PORT', '27017'))
+MONGO_DATABASE: str = os.getenv('MONGO_DATABASE', 'jNotesDB')
+
+# Environment variables that are passed through to "MongoClient" as pool and timeout settings, when set.
+CLIENT_OPTIONS: Dict[str, str] = {
+    'maxPoolSize': 'MONGO_MAX_POOL_SIZE',
+    'minPoolSize': 'MONGO_MIN_POOL_SIZE',
+    'maxIdleTimeMS': 'MONGO_MAX_IDLE_TIME_MS',
+    'waitQueueTimeoutMS': 'MONGO_WAIT_QUEUE_TIMEOUT_MS',
+    'connectTimeoutMS': 'MONGO_CONNECT_TIMEOUT_MS',
+    'socketTimeoutMS': 'MONGO_SOCKET_TIMEOUT_MS',
+    'serverSelectionTimeoutMS': 'MONGO_SERVER_SELECTION_TIMEOUT_MS',
+}
+
+# Deleted notes are kept as tombstones (see "resources.tombstones") until the TTL index on "dateDeleted" removes them,
+# so delta syncs can propagate deletions. Every regular read and write must exclude them.
+NOT_DELETED:         Dict = {'deleted': {'$ne': True}}
+TOMBSTONE_RETENTION: datetime.timedelta = datetime.timedelta(days=30)
+
+# The orders notes are listed (newest first) and synced (oldest first) in, which the "notes" indexes are built for.
+KEYSET_SORT: List[Tuple[str, int]] = [('dateModified', -1), ('_id', -1)]
+SYNC_SORT:   List[Tuple[str, int]] = [('dateModified', 1), ('_id', 1)]
+
+_LOCK:            threading.Lock = threading.Lock()
+_CLIENT:          MongoClient = None
+_PID:             int = None
+_GENERATION:      int = 0
+_EVENT_LISTENERS: List[monitoring.CommandListener] = []
+_OPTIONS:         Dict[str, int] = None
+
+
+def client_options(environ: Mapping[str, str] = None) -> Dict[str, int]:
+    """Reads the "MongoClient" pool and timeout settings configured in the environment (see "CLIENT_OPTIONS")."""
+    environ = os.environ if environ is None else environ
+    return {option: int(environ[variable]) for option, variable in CLIENT_OPTIONS.items() if environ.get(variable)}
+
+
+def configure(host: str, port: int, database: str, options: Dict[str, int] = None):
+    """Sets the server, database and client options used by the clients created from now on (by default, those of
+        the environment).
+    """
+    global MONGO_HOST, MONGO_PORT, MONGO_DATABASE, _OPTIONS  # pylint: disable=global-statement
+    MONGO_HOST, MONGO_PORT, MONGO_DATABASE, _OPTIONS = host, port, database, dict(options or {})
+    reset_client()
+
+
+def get_client() -> MongoClient:
+    """Returns this process's "MongoClient", creating it on first use.
+
+        The client is created with "connect=False", so nothing is opened until the first operation, and is replaced
+        whenever the process id changes. A client (and its pool and monitor threads) is never shared across a fork.
+    """
+    global _CLIENT, _PID  # pylint: disable=global-statement
+    pid = os.getpid()
+    if _CLIENT is None or _PID != pid:
+        with _LOCK:
+            if _CLIENT is None or _PID != pid:
+                options = client_options() if _OPTIONS is None else _OPTIONS
+                _CLIENT = MongoClient(MONGO_HOST, MONGO_PORT, connect=False, event_listeners=list(_EVENT_LISTENERS),
+                                      **options)
+                _PID = pid
+    return _CLIENT
+
+
+def get_database() -> Database:
+    return get_client()[MONGO_DATABASE]
+
+
+def add_event_listener(listener: monitoring.CommandListener):
+    """Registers a pymongo command listener with the clients created from now on. A client that already exists is
+        forgotten (not closed, as collections may still be using it), so the next "get_client" call picks it up.
+    """
+    if listener not in _EVENT_LISTENERS:
+        _EVENT_LISTENERS.append(listener)
+        reset_client()
+
+
+def reset_client():
+    """Forgets the current client so the next "get_client" call creates a new one. Runs automatically in forked
+        children; the inherited client is not closed, since its sockets still belong to the parent.
+    """
+    global _CLIENT, _PID, _GENERATION, _LOCK  # pylint: disable=global-statement
+    _LOCK = threading.Lock()
+    _CLIENT = None
+    _PID = None
+    _GENERATION += 1
+
+
+def close_client():
+    """Closes this process's client, if it has one (e.g. when a worker exits)."""
+    client = _CLIENT
+    if client is not None and _PID == os.getpid():
+        reset_client()
+        client.close()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_client)
+
+
+class LazyCollection:
+    """A stand-in for a "Collection" that resolves it against the current process's client when it is used.
+
+        Resources can be built (e.g. by a preloaded gunicorn master) before workers fork, and each worker still talks
+        to Mongo through its own client and connection pool.
+    """
+    __slots__ = ('_name', '_options', '_generation', '_collection')
+
+    def __init__(self, name: str, **options: Any):
+        self._name:       str = name
+        self._options:    Dict[str, Any] = options
+        self._generation: int = None
+        self._collection: Collection = None
+
+    @property
+    def collection(self) -> Collection:
+        if self._generation != _GENERATION or self._collection is None:
+            self._collection = get_database().get_collection(self._name, **self._options)
+            self._generation = _GENERATION
+        return self._collection
+
+    def with_options(self, **options: Any) -> 'LazyCollection':
+        return LazyCollection(self._name, **{**self._options, **options})
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.collection, name)
+
+    def __repr__(self) -> str:
+        return 'LazyCollection({!r})'.format(self._name)
+
+
+def raw_documents(collection: Collection) -> Collection:
+    """Returns a view of "collection" that yields undecoded "RawBSONDocument"s (see "models.MongoModel")."""
+    return collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+
+
+def truncate_to_millis(date: datetime.datetime) -> datetime.datetime:
+    """Drops the sub-millisecond precision Mongo does not store, so validators built before and after a write agree."""
+    return date.replace(microsecond=date.microsecond // 1000 * 1000)
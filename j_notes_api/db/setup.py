@@ -1,8 +1,18 @@
-from j_notes_api.db import NOTES_DB
+import argparse
+import datetime
+import logging
+import sys
+from typing import Dict, Iterator, List, Tuple
 
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.collection import Collection
+from pymongo.database import Database
 
-def create_database():
-    NOTES_DB.create_collection('notes', validator={
+from j_notes_api.db import get_database, KEYSET_SORT, NOT_DELETED, SYNC_SORT, TOMBSTONE_RETENTION
+
+VALIDATORS: Dict[str, Dict] = {
+    'notes': {
         '$jsonSchema': {
             'bsonType': 'object',
             'required': ['user', 'dateCreated', 'dateModified'],
@@ -16,6 +26,17 @@ def create_database():
                     'maxLength': 5000,
                     'description': 'The contents of the note.',
                 },
+                'body': {
+                    'bsonType': 'object',
+                    'required': ['version', 'length', 'chunkSize'],
+                    'description': 'Replaces "text" for contents too large to store inline, which are held in '
+                                   '"noteChunks" under this version.',
+                    'properties': {
+                        'version': {'bsonType': 'objectId'},
+                        'length': {'bsonType': ['int', 'long']},
+                        'chunkSize': {'bsonType': 'int'},
+                    }
+                },
                 'dateCreated': {
                     'bsonType': 'date',
                     'description': 'The date the note was created.',
@@ -23,12 +44,19 @@ def create_database():
                 'dateModified': {
                     'bsonType': 'date',
                     'description': 'The date the note was last modified.',
+                },
+                'deleted': {
+                    'bsonType': 'bool',
+                    'description': 'Marks the note as a tombstone kept so deletions reach syncing clients.',
+                },
+                'dateDeleted': {
+                    'bsonType': 'date',
+                    'description': 'The date the note was deleted. Tombstones expire a while after this date.',
                 }
             }
         }
-    })
-
-    NOTES_DB.create_collection('users', validator={
+    },
+    'users': {
         '$jsonSchema': {
             'bsonType': 'object',
             'required': ['dateCreated'],
@@ -49,9 +77,8 @@ def create_database():
                 }
             }
         }
-    })
-
-    NOTES_DB.create_collection('authProvider', validator={
+    },
+    'authProviders': {
         '$jsonSchema': {
             'bsonType': 'object',
             'required': ['userIdentifier', 'user', 'dateCreated'],
@@ -61,11 +88,11 @@ def create_database():
                     'description': 'A key denoting the type of the auth provider (i.e. "google" for "Google Sign-In").',
                 },
                 'userIdentifier': {
-                    'bsonType': 'objectId',
+                    'bsonType': 'string',
                     'description': 'A unique user identifier provided by the authentication provider.',
                 },
                 'user': {
-                    'bsonType': 'string',
+                    'bsonType': 'objectId',
                     'description': 'The _id value of the user associated to this client.',
                 },
                 'dateCreated': {
@@ -74,8 +101,219 @@ def create_database():
                 }
             }
         }
-    })
+    },
+    'noteChunks': {
+        '$jsonSchema': {
+            'bsonType': 'object',
+            'required': ['note', 'version', 'n', 'data'],
+            'properties': {
+                'note': {
+                    'bsonType': 'objectId',
+                    'description': 'The _id value of the note whose body this chunk is part of.',
+                },
+                'version': {
+                    'bsonType': 'objectId',
+                    'description': 'The version of the note body, which changes each time the body is replaced.',
+                },
+                'n': {
+                    'bsonType': 'int',
+                    'minimum': 0,
+                    'description': 'The position of the chunk in the body.',
+                },
+                'data': {
+                    'bsonType': 'binData',
+                    'description': 'The bytes of the chunk. Every chunk but the last holds "chunkSize" of them.',
+                }
+            }
+        }
+    },
+    'revokedTokens': {
+        '$jsonSchema': {
+            'bsonType': 'object',
+            'required': ['expiresAt'],
+            'properties': {
+                '_id': {
+                    'bsonType': 'string',
+                    'description': 'The "jti" claim of a revoked session token.',
+                },
+                'expiresAt': {
+                    'bsonType': 'date',
+                    'description': 'The expiry of the revoked token. The entry is not needed (and expires) after it.',
+                }
+            }
+        }
+    },
+}
+
+# Lookups on "users" only ever filter on "_id" (optionally alongside "authToken"), which the default _id index covers.
+INDEXES: Dict[str, List[IndexModel]] = {
+    'notes': [
+        IndexModel([('user', ASCENDING), ('dateModified', DESCENDING), ('_id', DESCENDING)],
+                   name='user_dateModified__id'),
+        IndexModel([('dateDeleted', ASCENDING)], name='dateDeleted_ttl',
+                   expireAfterSeconds=int(TOMBSTONE_RETENTION.total_seconds()),
+                   partialFilterExpression={'deleted': True}),
+        # The "user" prefix partitions the text index per user, so a search only reads the user's own matches.
+        IndexModel([('user', ASCENDING), ('text', TEXT)], name='user_text', default_language='english'),
+    ],
+    'users': [],
+    'authProviders': [
+        IndexModel([('type', ASCENDING), ('userIdentifier', ASCENDING)], name='type_userIdentifier', unique=True),
+    ],
+    'noteChunks': [
+        IndexModel([('note', ASCENDING), ('version', ASCENDING), ('n', ASCENDING)], name='note_version_n', unique=True),
+    ],
+    'revokedTokens': [
+        IndexModel([('expiresAt', ASCENDING)], name='expiresAt_ttl', expireAfterSeconds=0),
+    ],
+}
+
+
+def query_shapes() -> Iterator[Tuple[str, Dict, List]]:
+    """Yields a (collection, filter, sort) sample of every query shape the resources and middleware issue."""
+    object_id = ObjectId()
+    now = datetime.datetime.now()
+
+    yield 'notes', {'_id': object_id, 'user': object_id, **NOT_DELETED}, None
+    yield 'notes', {'_id': {'$in': [object_id]}, 'user': object_id, **NOT_DELETED}, None
+    yield 'notes', {'user': object_id, **NOT_DELETED}, KEYSET_SORT
+    yield 'notes', {'user': object_id}, [('dateModified', DESCENDING)]
+    yield 'notes', {'user': object_id, **NOT_DELETED, '$or': [{'dateModified': {'$lt': now}},
+                                                              {'dateModified': now, '_id': {'$lt': object_id}}]}, \
+        KEYSET_SORT
+    yield 'notes', {'user': object_id, '$text': {'$search': 'word'}, **NOT_DELETED}, None
+    yield 'notes', {'user': object_id, '$or': [{'dateModified': {'$gt': now}},
+                                               {'dateModified': now, '_id': {'$gt': object_id}}]}, SYNC_SORT
+    yield 'users', {'_id': object_id}, None
+    yield 'users', {'_id': object_id, 'authToken': 'token'}, None
+    yield 'authProviders', {'type': 'google', 'userIdentifier': 'subject'}, None
+    yield 'noteChunks', {'note': object_id, 'version': object_id, 'n': {'$gte': 0, '$lte': 3}}, [('n', ASCENDING)]
+    yield 'noteChunks', {'note': object_id, 'version': object_id}, None
+    yield 'noteChunks', {'note': {'$in': [object_id]}}, None
+    yield 'revokedTokens', {'expiresAt': {'$gt': now}}, None
+
+
+def create_database(database: Database):
+    existing = database.list_collection_names()
+    for name, validator in VALIDATORS.items():
+        if name in existing:
+            database.command('collMod', name, validator=validator)
+        else:
+            database.create_collection(name, validator=validator)
+
+    sync_indexes(database)
+
+
+def sync_indexes(database: Database, drop: bool = True) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Creates and (optionally) drops indexes until each collection matches "INDEXES". Safe to run repeatedly.
+
+        Returns the names of the created and dropped indexes by collection.
+    """
+    changes = {}
+    for name, indexes in INDEXES.items():
+        collection: Collection = database[name]
+        existing = collection.index_information()
+        created, dropped = [], []
+
+        for index in indexes:
+            document = index.document
+            current = existing.pop(document['name'], None)
+            if current is not None and _index_matches(document, current):
+                continue
+            if current is not None:
+                collection.drop_index(document['name'])
+                dropped.append(document['name'])
+            created.append(document['name'])
+
+        if created:
+            collection.create_indexes([index for index in indexes if index.document['name'] in created])
+
+        if drop:
+            for index_name in existing:
+                if index_name != '_id_':
+                    collection.drop_index(index_name)
+                    dropped.append(index_name)
+
+        changes[name] = created, dropped
+
+    return changes
+
+
+def verify_indexes(database: Database) -> List[str]:
+    """Runs "explain" on every query shape and returns a description of each one that falls back to a COLLSCAN."""
+    failures = []
+    for name, query, sort in query_shapes():
+        cursor = database[name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        stages = set(_plan_stages(cursor.explain()['queryPlanner']['winningPlan']))
+        if 'COLLSCAN' in stages:
+            failures.append('{}: {} (sort: {})'.format(name, query, sort))
+
+    return failures
+
+
+def _index_matches(document: Dict, current: Dict) -> bool:
+    if _server_key(document['key']) != [(field, direction) for field, direction in current['key']]:
+        return False
+    text_fields = [field for field, direction in document['key'].items() if direction == TEXT]
+    if text_fields and set(current.get('weights', {})) != set(text_fields):
+        return False
+
+    options = {option: value for option, value in document.items() if option not in ('key', 'name')}
+    return all(current.get(option) == value for option, value in options.items()) and \
+        bool(current.get('unique')) == bool(document.get('unique'))
+
+
+def _server_key(key: Dict) -> List[Tuple[str, object]]:
+    """Returns an index key as the server reports it, where text fields are replaced by "_fts"/"_ftsx" entries (and
+        listed under "weights" instead).
+    """
+    server_key = []
+    for field, direction in key.items():
+        if direction != TEXT:
+            server_key.append((field, direction))
+        elif ('_fts', TEXT) not in server_key:
+            server_key.extend([('_fts', TEXT), ('_ftsx', 1)])
+
+    return server_key
+
+
+def _plan_stages(plan) -> Iterator[str]:
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+    parser = argparse.ArgumentParser(description='Manages the jNotesDB collections and indexes.')
+    parser.add_argument('command', nargs='?', default='create', choices=('create', 'migrate', 'verify'),
+                        help='"create" sets up collections, validators and indexes, "migrate" only syncs indexes and '
+                             '"verify" fails if any query shape is served by a collection scan.')
+    parser.add_argument('--keep-unknown', action='store_true', help='Do not drop indexes missing from the registry.')
+    args = parser.parse_args()
+
+    database = get_database()
+    if args.command == 'create':
+        create_database(database)
+    elif args.command == 'migrate':
+        for name, (created, dropped) in sync_indexes(database, drop=not args.keep_unknown).items():
+            logger.info('%s: created %s, dropped %s', name, created or 'nothing', dropped or 'nothing')
+    else:
+        failures = verify_indexes(database)
+        for failure in failures:
+            logger.error('COLLSCAN: %s', failure)
+        if failures:
+            sys.exit(1)
 
 
 if __name__ == '__main__':
-    create_database()
+    main()
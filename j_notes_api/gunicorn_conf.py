@@ -0,0 +1,54 @@
+"""Gunicorn settings for serving "j_notes_api.wsgi:application".
+
+    Usage: gunicorn -c python:j_notes_api.gunicorn_conf j_notes_api.wsgi:application
+
+    Workers default to gunicorn's threaded ("gthread") worker. Request handling is dominated by blocking waits on Mongo
+    and Google, so each thread overlaps those waits while pymongo's connection pool is shared by every thread of the
+    worker. Set GUNICORN_WORKER_CLASS=sync (or GUNICORN_THREADS=1) to fall back to one request per process.
+
+    The API's own settings are read once, by "j_notes_api.wsgi" (see "j_notes_api.config.Config.from_env"), which also
+    sets the logging level from LOG_LEVEL.
+
+    With GUNICORN_PRELOAD=true the app is built once in the master before forking. The Mongo client is created lazily
+    per process (see "j_notes_api.db"), and the hooks below make sure a worker never inherits the master's client.
+    Pool sizes and timeouts are read from the MONGO_* variables listed in "j_notes_api.db.CLIENT_OPTIONS"; size
+    MONGO_MAX_POOL_SIZE to at least GUNICORN_THREADS so threads do not queue for connections.
+
+    Admission control (see "j_notes_api.middleware.admission") is off unless turned on: ADMISSION_USER_RATE limits each
+    user to that many requests per second (in bursts of up to ADMISSION_USER_BURST, 20 by default), and
+    ADMISSION_MAX_IN_FLIGHT caps the requests a worker handles at once. The limits are kept per worker unless
+    ADMISSION_SHARED_PATH names a file (e.g. under /dev/shm) that every worker on the host maps, so
+    ADMISSION_MAX_IN_FLIGHT caps the whole host.
+
+    With WRITE_BEHIND_WINDOW set, note updates buffered by a worker are written before it exits. Give
+    GUNICORN_GRACEFUL_TIMEOUT enough room for that: a worker killed instead loses up to a window of updates.
+"""
+import multiprocessing
+import os
+
+from j_notes_api import db
+from j_notes_api.services import write_behind
+
+bind:             str = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers:          int = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class:     str = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads:          int = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout:          int = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout: int = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive:        int = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+preload_app:      bool = os.getenv('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+
+def pre_fork(_server, _worker):
+    # The master should not hold a client at all, but if preloading opened one, close it before it is copied.
+    db.close_client()
+
+
+def post_fork(_server, _worker):
+    db.reset_client()
+
+
+def worker_exit(_server, _worker):
+    # Buffered note updates still need the client.
+    write_behind.close_all()
+    db.close_client()
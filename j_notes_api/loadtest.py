@@ -0,0 +1,381 @@
+"""Load tests the API end to end: seeds a local mongod, serves "create_app()" with gunicorn and drives it with an
+    open-loop asyncio client.
+
+    Usage: python -m j_notes_api.loadtest [--rate 200] [--duration 30] [--mix list=40,get=40,create=10,update=10]
+                                          [--save-baseline FILE | --baseline FILE [--threshold 0.2]]
+
+    Synthetic users and their auth providers are created through "UserService" in a scratch database (MONGO_HOST and
+    MONGO_PORT, "--database", dropped afterwards unless "--keep") set up with the validators and indexes of
+    "db.setup", then each user gets "--notes" notes. Session tokens are minted with "crypto.generate_jwt".
+
+    Requests arrive at "--rate" per second following a Poisson process, whether or not earlier requests have finished
+    (an open loop), and each latency is measured from the request's scheduled arrival, so a slow server is not hidden
+    by the client backing off. Throughput, p50/p95/p99 latency and error rates (HTTP 4xx/5xx, connection errors and
+    timeouts) are reported by endpoint. "--save-baseline" writes them to a JSON file; "--baseline" compares against
+    one and exits with status 1 when an endpoint's p50 or p99 latency grew, or its throughput fell, by more than
+    "--threshold", or its error rate rose by more than a percentage point.
+
+    The server is started with "gunicorn_conf" (so the GUNICORN_* variables apply) unless "--url" points the client
+    at one that is already running against the same database.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from bson import ObjectId
+
+from j_notes_api.benchmarks.search import WORDS
+from j_notes_api.db import get_client, setup
+from j_notes_api.models import IdInfo, User
+from j_notes_api.services import crypto, UserService
+
+ENDPOINTS: Tuple[str, ...] = ('list', 'get', 'create', 'update')
+DEFAULT_MIX: str = 'list=40,get=40,create=10,update=10'
+
+
+class Account(NamedTuple):
+    user: User
+    headers: Dict[str, str]
+    note_ids: List[ObjectId]
+
+
+class Response(NamedTuple):
+    status: int
+    body: bytes
+    keep_alive: bool
+
+
+class Sample(NamedTuple):
+    endpoint: str
+    scheduled: float
+    completed: float
+    error: bool
+
+
+def seed(database, client_id: str, users: int, notes: int, rand: random.Random) -> List[Account]:
+    """Creates "users" users through "UserService", each with "notes" notes, and returns their session headers."""
+    setup.create_database(database)
+    user_service = UserService(database.users, database.authProviders)
+
+    accounts = []
+    for index in range(users):
+        user, _ = user_service.create_new_user(IdInfo({'sub': 'load-test-{}'.format(index)}))
+        now = datetime.datetime.now()
+        result = database.notes.insert_many([{
+            'user': user.uuid,
+            'text': ' '.join(rand.choices(WORDS, k=rand.randint(5, 200))),
+            'dateCreated': now - datetime.timedelta(minutes=note),
+            'dateModified': now - datetime.timedelta(minutes=note),
+        } for note in range(notes)]) if notes else None
+        headers = {'Authorization': crypto.generate_jwt(user, client_id).decode()}
+        accounts.append(Account(user, headers, list(result.inserted_ids) if result else []))
+
+    return accounts
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parses "endpoint=weight" pairs (e.g. "list=40,get=40,create=10,update=10") into normalized weights."""
+    weights = {}
+    for item in mix.split(','):
+        endpoint, _, weight = item.partition('=')
+        if endpoint.strip() not in ENDPOINTS:
+            raise ValueError('Unknown endpoint "{}", expected one of {}'.format(endpoint.strip(), ', '.join(ENDPOINTS)))
+        weights[endpoint.strip()] = float(weight or 1)
+
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError('The mix needs a positive weight')
+    return {endpoint: weight / total for endpoint, weight in weights.items()}
+
+
+def build_request(endpoint: str, account: Account, rand: random.Random) -> Tuple[str, str, Optional[bytes]]:
+    notes_path = '/users/{}/notes'.format(account.user.uuid)
+    body = json.dumps({'text': ' '.join(rand.choices(WORDS, k=rand.randint(5, 200)))}).encode()
+    if endpoint == 'list':
+        return 'GET', notes_path, None
+    if endpoint == 'create':
+        return 'POST', notes_path, body
+
+    note_path = '{}/{}'.format(notes_path, rand.choice(account.note_ids))
+    return ('GET', note_path, None) if endpoint == 'get' else ('PUT', note_path, body)
+
+
+async def read_response(reader: asyncio.StreamReader) -> Response:
+    """Reads an HTTP/1.1 response with a "Content-Length" or chunked body."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('The server closed the connection')
+    version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        keep_alive = False
+
+    return Response(int(status), body, keep_alive)
+
+
+class ConnectionPool:
+    """Keep-alive connections to one server, opened on demand up to "size" at a time."""
+
+    def __init__(self, host: str, port: int, size: int):
+        self._host:      str = host
+        self._port:      int = port
+        self._idle:      List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(size)
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        head = ['{} {} HTTP/1.1'.format(method, path), 'Host: {}:{}'.format(self._host, self._port),
+                'Content-Length: {}'.format(len(body or b''))]
+        head.extend('{}: {}'.format(name, value) for name, value in headers.items())
+        data = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+        async with self._semaphore:
+            while True:
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await asyncio.open_connection(self._host, self._port)
+                try:
+                    writer.write(data)
+                    response = await read_response(reader)
+                except ConnectionError:
+                    writer.close()
+                    # The server may close idle keep-alive connections at any time, so one of those is simply retried.
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                break
+
+            if response.keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return response
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+async def drive(url: str, accounts: List[Account], mix: Dict[str, float], rate: float, duration: float,
+                warmup: float, connections: int, timeout: float, seed_value: int) -> List[Sample]:
+    """Sends requests at "rate" per second for "warmup" + "duration" seconds and returns the samples of those that
+        arrived after the warm-up.
+    """
+    target = urlsplit(url)
+    pool = ConnectionPool(target.hostname, target.port or 80, connections)
+    rand = random.Random(seed_value)
+    endpoints, weights = zip(*mix.items())
+    samples: List[Sample] = []
+    tasks = []
+
+    async def send(endpoint: str, request: Tuple[str, str, Optional[bytes]], headers: Dict[str, str],
+                   scheduled: float, record: bool):
+        try:
+            response = await asyncio.wait_for(pool.request(*request[:2], headers, request[2]), timeout)
+            error = response.status >= 400
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            error = True
+        if record:
+            samples.append(Sample(endpoint, scheduled, time.perf_counter(), error))
+
+    start = time.perf_counter()
+    arrival = start
+    while arrival - start < warmup + duration:
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = rand.choices(endpoints, weights)[0]
+        account = rand.choice(accounts)
+        tasks.append(asyncio.ensure_future(send(endpoint, build_request(endpoint, account, rand), account.headers,
+                                                arrival, arrival - start >= warmup)))
+        arrival += rand.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+    pool.close()
+    return samples
+
+
+def summarize(samples: List[Sample]) -> Dict[str, Dict]:
+    """Computes throughput, latency percentiles and error rate by endpoint, and over all requests as "all".
+
+        Throughput counts the successful responses over the time from the first arrival to the last response, so it
+        falls below the offered rate once the server cannot keep up.
+    """
+    if not samples:
+        return {}
+    duration = max(sample.completed for sample in samples) - min(sample.scheduled for sample in samples)
+    by_endpoint: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample.endpoint, []).append(sample)
+        by_endpoint.setdefault('all', []).append(sample)
+
+    results = {}
+    for endpoint, endpoint_samples in sorted(by_endpoint.items()):
+        latencies = sorted(sample.completed - sample.scheduled for sample in endpoint_samples)
+        errors = sum(sample.error for sample in endpoint_samples)
+        results[endpoint] = {
+            'requests': len(endpoint_samples),
+            'throughput': round((len(endpoint_samples) - errors) / duration, 2),
+            'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2),
+            'error_rate': round(errors / len(endpoint_samples), 4),
+        }
+    return results
+
+
+def regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    found = []
+    for endpoint, result in results.items():
+        expected = baseline.get(endpoint)
+        if expected is None:
+            continue
+
+        for metric in ('p50_ms', 'p99_ms'):
+            if result[metric] > expected[metric] * (1 + threshold):
+                found.append('{}: {} {} > {}'.format(endpoint, metric, result[metric], expected[metric]))
+        if result['throughput'] < expected['throughput'] * (1 - threshold):
+            found.append('{}: throughput {} < {}'.format(endpoint, result['throughput'], expected['throughput']))
+        if result['error_rate'] > expected['error_rate'] + 0.01:
+            found.append('{}: error rate {} > {}'.format(endpoint, result['error_rate'], expected['error_rate']))
+
+    return found
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * quantile))] if values else 0.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('gunicorn did not start listening on port {}'.format(port))
+
+
+def _serve(database: str, client_id: str, port: int) -> subprocess.Popen:
+    env = {**os.environ, 'MONGO_DATABASE': database, 'CLIENT_ID': client_id}
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'python:j_notes_api.gunicorn_conf',
+                             '--bind', '127.0.0.1:{}'.format(port), '--log-level', 'warning',
+                             'j_notes_api.wsgi:application'], env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=200, help='Request arrivals per second.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of measured load.')
+    parser.add_argument('--warmup', type=float, default=5, help='Seconds of unmeasured load sent first.')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Relative weights of the endpoints.')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--notes', type=int, default=50, help='Notes seeded per user.')
+    parser.add_argument('--connections', type=int, default=64, help='Maximum concurrent client connections.')
+    parser.add_argument('--timeout', type=float, default=10, help='Seconds before a request counts as an error.')
+    parser.add_argument('--database', default='jNotesLoadTest')
+    parser.add_argument('--client-id', default=os.getenv('CLIENT_ID', 'load-test-client-id'))
+    parser.add_argument('--url', help='Load an already running server instead of starting gunicorn.')
+    parser.add_argument('--keep', action='store_true', help='Keep the seeded database.')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.notes <= 0 and ('get' in mix or 'update' in mix):
+        parser.error('"--notes" must be positive for a mix with "get" or "update" calls')
+
+    rand = random.Random(args.seed)
+    database = get_client()[args.database]
+    server = None
+    try:
+        accounts = seed(database, args.client_id, args.users, args.notes, rand)
+
+        url = args.url
+        if url is None:
+            port = _free_port()
+            server = _serve(args.database, args.client_id, port)
+            _wait_for(port)
+            url = 'http://127.0.0.1:{}'.format(port)
+
+        samples = asyncio.run(drive(
+            url, accounts, mix, args.rate, args.duration, args.warmup, args.connections, args.timeout, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if not args.keep:
+            get_client().drop_database(database)
+
+    results = summarize(samples)
+    print('offered load: {} req/s for {}s'.format(args.rate, args.duration))
+    print('{:<8} {:>9} {:>11} {:>10} {:>10} {:>10} {:>8}'.format(
+        'endpoint', 'requests', 'throughput', 'p50', 'p95', 'p99', 'errors'))
+    for endpoint, result in results.items():
+        print('{:<8} {requests:>9} {throughput:>7.1f}/s {p50_ms:>8.2f}ms {p95_ms:>8.2f}ms {p99_ms:>8.2f}ms '
+              '{error_rate:>8.2%}'.format(endpoint, **result))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({'rate': args.rate, 'mix': mix, 'results': results}, baseline_file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['rate'] != args.rate or baseline['mix'] != mix:
+            print('WARNING the baseline was recorded with a different rate or mix')
+
+        found = regressions(results, baseline['results'], args.threshold)
+        for regression in found:
+            print('REGRESSION {}'.format(regression))
+        sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
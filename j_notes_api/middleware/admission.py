@@ -0,0 +1,54 @@
+import math
+from typing import Dict
+
+import falcon
+
+from j_notes_api.services.admission import AdmissionState
+
+_IN_FLIGHT: str = 'admission.in_flight'
+
+
+class AdmissionMiddleware:
+    """Sheds load before it reaches Mongo.
+
+        Every request needs one of "max_in_flight" slots (unless 0, for no limit), or is answered with a 503 straight
+        away, before it is routed or authenticated. Then each authenticated user ("req.user", so this middleware must
+        come after "AuthMiddleware") takes a token from their bucket in "state", or is answered with a 429. Both carry
+        a "Retry-After" header: "retry_after" seconds for a 503, and the time until the user's next token for a 429.
+        A "state" with a rate of 0 leaves users unlimited.
+    """
+
+    def __init__(self, state: AdmissionState, max_in_flight: int = 0, retry_after: int = 1):
+        self._state:         AdmissionState = state
+        self._max_in_flight: int = max_in_flight
+        self._retry_after:   int = retry_after
+
+    def process_request(self, req: falcon.Request, _resp: falcon.Response):
+        if self._max_in_flight <= 0:
+            return
+
+        if not self._state.acquire(self._max_in_flight):
+            raise falcon.HTTPServiceUnavailable(
+                title='Overloaded', description='The API is handling too many requests, please retry later.',
+                retry_after=self._retry_after)
+        req.context[_IN_FLIGHT] = True
+
+    def process_resource(self, req: falcon.Request, _resp: falcon.Response, _resource: object, _params: Dict):
+        user = getattr(req, 'user', None)
+        if user is None or self._state.rate <= 0:
+            return
+
+        wait = self._state.take(str(user.uuid))
+        if wait:
+            raise falcon.HTTPTooManyRequests(
+                title='Too many requests', description='Please slow down and retry later.',
+                retry_after=_retry_after_seconds(wait))
+
+    def process_response(self, req: falcon.Request, _resp: falcon.Response, _resource: object,
+                         _req_succeeded: bool):
+        if req.context.pop(_IN_FLIGHT, False):
+            self._state.release()
+
+
+def _retry_after_seconds(wait: float) -> int:
+    return max(1, int(math.ceil(wait)))
@@ -1,21 +1,33 @@
 import datetime
-from typing import Dict, Tuple, Union
+from typing import Dict, Optional, Tuple, Union
 
 import falcon
+import jwt
 from bson import ObjectId
+from bson.errors import InvalidId
 from pymongo.collection import Collection
 
 from j_notes_api.models import User
 from j_notes_api.models.mongo_model import EmptyMongoModelException
-from j_notes_api.services import crypto
+from j_notes_api.services import crypto, RevocationList, UserCache
+from j_notes_api.services.metrics import timed
 
 
 class AuthMiddleware:
+    """Authenticates requests using the session token issued by "SessionsResource".
 
-    def __init__(self, client_id: str, users: Collection, disabled_resources: Tuple[type] = None):
+        By default the token's auth token is checked against the user's document (optionally through a "UserCache").
+        Given a "revocation_list" the middleware is stateless instead: the token's signature, "exp" and "jti" are
+        verified in memory and "req.user" is built from its claims, so no per-request query is made.
+    """
+
+    def __init__(self, client_id: str, users: Collection, disabled_resources: Tuple[type] = None,
+                 user_cache: Optional[UserCache] = None, revocation_list: Optional[RevocationList] = None):
         self._client_id:          str = client_id
         self._users:              Collection = users
         self._disabled_resources: Union[Tuple[type], Tuple] = () if disabled_resources is None else disabled_resources
+        self._user_cache:         Optional[UserCache] = user_cache
+        self._revocation_list:    Optional[RevocationList] = revocation_list
 
     def process_resource(self, req: falcon.Request, _resp: falcon.Response, resource: object, _params: Dict):
         if isinstance(resource, self._disabled_resources):
@@ -27,7 +39,8 @@ class AuthMiddleware:
             raise falcon.HTTPUnauthorized(title='Auth token required',
                                           description='Please provide an auth token as part of the request.')
 
-        valid, user = self._validate_token_and_find_user(token)
+        with timed('auth'):
+            valid, user = self._validate_token_and_find_user(token)
         if not valid:
             raise falcon.HTTPUnauthorized(title='Authentication required',
                                           description='The provided auth token is not valid. Please request a new '
@@ -36,17 +49,45 @@ class AuthMiddleware:
         req.user = user
 
     def _validate_token_and_find_user(self, token: str) -> Tuple[bool, Union[User, None]]:
-        payload = crypto.decode_jwt(token, self._client_id)
+        try:
+            payload = crypto.decode_jwt(token, self._client_id)
+        except jwt.InvalidTokenError:
+            return False, None
+
+        if self._revocation_list is not None:
+            return self._validate_token_claims(payload)
+
         user_id = payload.get('sub')
         user_token = payload.get('token')
         user = None
         valid = False
 
+        if self._user_cache is not None:
+            user = self._user_cache.get(str(user_id), user_token)
+            if user is not None:
+                return True, user
+
         try:
             user = User(self._users.find_one({'_id': ObjectId(user_id), 'authToken': user_token}))
             if user.auth_token_expiry > datetime.datetime.now():
                 valid = True
+                if self._user_cache is not None:
+                    self._user_cache.put(user)
         except EmptyMongoModelException:
             pass
 
         return valid, user
+
+    def _validate_token_claims(self, payload: Dict) -> Tuple[bool, Union[User, None]]:
+        token_id = payload.get('jti')
+        expiry = payload.get('exp')
+        if token_id is None or expiry is None or self._revocation_list.is_revoked(token_id):
+            return False, None
+
+        try:
+            user = User({'_id': ObjectId(payload.get('sub')), 'authToken': payload.get('token'),
+                         'authTokenExpiry': datetime.datetime.fromtimestamp(expiry)})
+        except (InvalidId, TypeError):
+            return False, None
+
+        return True, user
@@ -0,0 +1,137 @@
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+import falcon
+
+from j_notes_api.resources.conditional import coded_etag
+
+# zlib "wbits" values selecting each HTTP content-coding's container format ("deflate" is zlib wrapped per RFC 7230).
+_ENCODINGS: Dict[str, int] = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+_COMPRESSIBLE_TYPES = ('application/json', 'text/')
+_STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class CompressionMiddleware:
+    """Compresses response bodies using the best content-coding the client accepts (gzip, then deflate).
+
+        Bodies smaller than "min_size" bytes are sent as is, since compressing them costs more CPU than the bytes it
+        saves. Streamed bodies are read ahead just far enough to decide this, then compressed chunk by chunk. Responses
+        that accept byte ranges are sent as is too: a client resuming one appends identity bytes to what it has.
+    """
+
+    def __init__(self, min_size: int = 1024, level: int = 6):
+        self._min_size: int = min_size
+        self._level:    int = level
+
+    def process_response(self, req: falcon.Request, resp: falcon.Response, _resource: object, _req_succeeded: bool):
+        # A partial response's Content-Range counts bytes of the identity encoding, so it is sent as is, as is any
+        # response a range could later be requested of.
+        if resp.status in (falcon.HTTP_NO_CONTENT, falcon.HTTP_NOT_MODIFIED, falcon.HTTP_PARTIAL_CONTENT) or \
+                req.method == 'HEAD' or resp.get_header('Accept-Ranges') not in (None, 'none'):
+            return
+        # A missing content type is filled in with the API's default (JSON) after the middleware runs.
+        if not (resp.content_type or falcon.DEFAULT_MEDIA_TYPE).startswith(_COMPRESSIBLE_TYPES) or \
+                resp.get_header('Content-Encoding'):
+            return
+
+        resp.append_header('Vary', 'Accept-Encoding')
+        encoding = negotiate_encoding(req.get_header('Accept-Encoding'))
+        if encoding is None:
+            return
+
+        if resp.body is not None or resp.data is not None:
+            body = resp.body if resp.body is not None else resp.data
+            body = body.encode() if isinstance(body, str) else body
+            if len(body) < self._min_size:
+                return
+            resp.body = None
+            resp.data = _compress(body, encoding, self._level)
+        elif resp.stream is not None:
+            head, stream = _read_ahead(resp.stream, self._min_size)
+            if stream is None:
+                resp.stream = None
+                resp.data = head
+                return
+            resp.stream = _compress_stream(head, stream, encoding, self._level)
+        else:
+            return
+
+        resp.delete_header('Content-Length')
+        resp.set_header('Content-Encoding', encoding)
+        etag = resp.get_header('ETag')
+        if etag is not None:
+            resp.set_header('ETag', coded_etag(etag, encoding))
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Picks the supported content-coding with the highest q-value (gzip winning ties), or None if none is
+        acceptable.
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding.strip().lower()] = quality
+
+    quality, _, coding = max((weights.get(coding, weights.get('*', 0.0)), -index, coding)
+                             for index, coding in enumerate(_ENCODINGS))
+    return coding if quality > 0 else None
+
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _ENCODINGS[encoding])
+    return compressor.compress(body) + compressor.flush()
+
+
+def _compress_stream(head: bytes, stream: Iterator[bytes], encoding: str, level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _ENCODINGS[encoding])
+    chunk = compressor.compress(head)
+    if chunk:
+        yield chunk
+
+    for data in stream:
+        chunk = compressor.compress(data)
+        if chunk:
+            yield chunk
+
+    yield compressor.flush()
+
+
+def _read_ahead(stream, min_size: int):
+    """Buffers the start of a stream. Returns (buffer, rest), with "rest" set to None if the stream ended first."""
+    iterator = _iterate(stream)
+    buffered: List[bytes] = []
+    size = 0
+    for chunk in iterator:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= min_size:
+            return b''.join(buffered), iterator
+
+    return b''.join(buffered), None
+
+
+def _iterate(stream) -> Iterator[bytes]:
+    if hasattr(stream, 'read'):
+        try:
+            yield from iter(lambda: stream.read(_STREAM_BLOCK_SIZE), b'')
+        finally:
+            if hasattr(stream, 'close'):
+                stream.close()
+    else:
+        for chunk in stream:
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+
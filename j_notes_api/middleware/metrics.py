@@ -0,0 +1,43 @@
+import time
+from typing import Dict
+
+import falcon
+
+from j_notes_api.services.metrics import begin_request, end_request, Metrics, RequestTimings
+
+
+class MetricsMiddleware:
+    """Records each request's latency by route in "metrics" and reports its breakdown in a "Server-Timing" header.
+
+        "routes" maps resource classes to their route templates, which label the metrics (unrouted requests are
+        labelled "unmatched"). The header lists the time spent in named phases such as "auth", the time spent waiting
+        on Mongo and the total; it is set after the other middleware has run when this middleware is listed first.
+        Streamed bodies are produced after the middleware has run, so their serialization is not included.
+    """
+
+    def __init__(self, metrics: Metrics, routes: Dict[type, str]):
+        self._metrics: Metrics = metrics
+        self._routes:  Dict[type, str] = routes
+
+    def process_request(self, _req: falcon.Request, _resp: falcon.Response):
+        begin_request()
+
+    def process_response(self, req: falcon.Request, resp: falcon.Response, resource: object, _req_succeeded: bool):
+        timings = end_request()
+        if timings is None:
+            return
+
+        duration = time.perf_counter() - timings.start
+        route = self._routes.get(type(resource), 'unmatched')
+        self._metrics.observe_request(req.method, route, resp.status, timings, duration)
+        resp.set_header('Server-Timing', server_timing(timings, duration))
+
+
+def server_timing(timings: RequestTimings, duration: float) -> str:
+    entries = ['{};dur={:.2f}'.format(phase, seconds * 1000) for phase, seconds in timings.phases.items()]
+    if timings.mongo_commands:
+        entries.append('db;dur={:.2f};desc="{} commands"'.format(timings.mongo_seconds * 1000,
+                                                                 timings.mongo_commands))
+    entries.append('total;dur={:.2f}'.format(duration * 1000))
+
+    return ', '.join(entries)
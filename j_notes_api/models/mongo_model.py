@@ -1,15 +1,56 @@
-from typing import Dict, Union
+from typing import Any, Mapping, Union
 
 from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+_EMPTY_BSON_SIZE = 5
+
+
+class MongoField:
+    """Exposes a document field as a model attribute, read from the wrapped document on access (a "RawBSONDocument"
+        is only decoded once a field is actually used, and then keeps the decoded document itself).
+
+        Assigning a field replaces the model's document with an updated copy, so the caller's document is left as is.
+        Fields are rarely assigned, while caching reads in per-field slots cost more than a dict lookup.
+    """
+    __slots__ = ('key',)
+
+    def __init__(self, key: str):
+        self.key: str = key
+
+    def __get__(self, instance: 'MongoModel', owner: type) -> Any:
+        if instance is None:
+            return self
+
+        return instance._data.get(self.key)  # pylint: disable=protected-access
+
+    def __set__(self, instance: 'MongoModel', value: Any):
+        instance._data = {**instance._data, self.key: value}  # pylint: disable=protected-access
 
 
 class MongoModel:
-    def __init__(self, data: Union[Dict, None], uuid: ObjectId = None):
-        if not data:
+    __slots__ = ('_data',)
+
+    uuid: ObjectId = MongoField('_id')
+
+    def __init__(self, data: Union[Mapping, None], uuid: ObjectId = None):
+        if _is_empty(data):
             raise EmptyMongoModelException(
                 '"None" was provided to the "{}" Mongo model'.format(self.__class__.__name__))
-        self.uuid: ObjectId = uuid if uuid else data.get('_id')
+        self._data: Mapping = data
+        if uuid:
+            self.uuid = uuid
 
 
 class EmptyMongoModelException(Exception):
     pass
+
+
+def _is_empty(data: Union[Mapping, None]) -> bool:
+    # Checking for a dict first skips the (much slower) abstract base class check of most models.
+    if type(data) is dict:  # pylint: disable=unidiomatic-typecheck
+        return not data
+    if isinstance(data, RawBSONDocument):
+        return len(data.raw) <= _EMPTY_BSON_SIZE
+
+    return not data
@@ -1,15 +1,17 @@
 from datetime import datetime
-from typing import Dict, Union
+from typing import Mapping, Union
 
 from bson import ObjectId
 
-from j_notes_api.models.mongo_model import MongoModel
+from j_notes_api.models.mongo_model import MongoField, MongoModel
 
 
 class User(MongoModel):
+    __slots__ = ()
 
-    def __init__(self, user_data: Union[Dict, None], uuid: ObjectId = None):
+    auth_token:        str = MongoField('authToken')
+    auth_token_expiry: datetime = MongoField('authTokenExpiry')
+    date_created:      datetime = MongoField('dateCreated')
+
+    def __init__(self, user_data: Union[Mapping, None], uuid: ObjectId = None):
         super().__init__(user_data, uuid)
-        self.auth_token:        str = user_data.get('authToken')
-        self.auth_token_expiry: datetime = user_data.get('authTokenExpiry')
-        self.date_created:      datetime = user_data.get('dateCreated')
@@ -1,3 +1,9 @@
+from .consistency import CausalReads, read_preference_from_name
+from .metrics import MetricsResource
 from .sessions import SessionsResource
+from .user_note_body import UserNoteBodyResource
 from .user_notes import UserNotesResource
+from .user_notes_batch import UserNotesBatchResource
 from .user_notes_list import UserNotesListResource
+from .user_notes_search import UserNotesSearchResource
+from .user_notes_sync import UserNotesSyncResource
@@ -0,0 +1,76 @@
+import datetime
+import hashlib
+from typing import Optional
+
+import falcon
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+# The content-codings an ETag can be suffixed with (see "coded_etag").
+_CODINGS = ('gzip', 'deflate')
+
+
+def make_etag(date_modified: Optional[datetime.datetime], *variant: object) -> str:
+    """Builds a strong ETag from a "dateModified" value and anything else that changes the representation."""
+    millis = (date_modified.replace(tzinfo=None) - _EPOCH) // datetime.timedelta(milliseconds=1) if date_modified else 0
+    if not any(variant):
+        return '"{}"'.format(millis)
+
+    return '"{}-{}"'.format(millis, hashlib.sha1(repr(variant).encode()).hexdigest()[:12])
+
+
+def coded_etag(etag: str, coding: str) -> str:
+    """Builds the ETag of a representation compressed with "coding": strong ETags must differ between content-codings
+        (RFC 7232), so "etag" gets a "-<coding>" suffix.
+    """
+    return '{}-{}"'.format(etag[:-1], coding) if etag.endswith('"') else etag
+
+
+def parse_etag(etag: str) -> Optional[datetime.datetime]:
+    """Returns the "dateModified" value encoded by "make_etag" (or "coded_etag"), or None if the ETag was not issued
+        by this API.
+    """
+    value = _identity_etag(etag.strip())
+    if value.startswith('W/'):
+        return None
+
+    try:
+        return _EPOCH + datetime.timedelta(milliseconds=int(value.strip('"').split('-')[0]))
+    except ValueError:
+        return None
+
+
+def apply_validators(req: falcon.Request, resp: falcon.Response, etag: str,
+                     last_modified: Optional[datetime.datetime]) -> bool:
+    """Sets the "ETag"/"Last-Modified" headers and returns True (after setting a 304 status) if the client's cached
+        copy, as described by "If-None-Match" or "If-Modified-Since", is still current.
+    """
+    resp.etag = etag
+    if last_modified is not None:
+        resp.last_modified = last_modified.replace(tzinfo=None)
+
+    if_none_match = req.get_header('If-None-Match')
+    if if_none_match is not None:
+        tags = {_identity_etag(tag.strip()[2:] if tag.strip().startswith('W/') else tag.strip())
+                for tag in if_none_match.split(',')}
+        not_modified = '*' in tags or etag in tags
+    else:
+        try:
+            if_modified_since = req.get_header_as_datetime('If-Modified-Since')
+        except falcon.HTTPBadRequest:
+            if_modified_since = None
+        not_modified = None not in (if_modified_since, last_modified) and \
+            last_modified.replace(tzinfo=None, microsecond=0) <= if_modified_since
+
+    if not_modified:
+        resp.status = falcon.HTTP_NOT_MODIFIED
+
+    return not_modified
+
+
+def _identity_etag(etag: str) -> str:
+    """Strips the content-coding suffix "coded_etag" adds, if any."""
+    for coding in _CODINGS:
+        suffix = '-{}"'.format(coding)
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
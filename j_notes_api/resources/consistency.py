@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import falcon
+from bson import Timestamp
+from pymongo.client_session import ClientSession
+from pymongo.collection import Collection
+from pymongo.read_preferences import ReadPreference, _ServerMode
+
+READ_PREFERENCES: Dict[str, _ServerMode] = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+OPERATION_TIME_HEADER: str = 'X-Operation-Time'
+OPERATION_TIME_COOKIE: str = 'operationTime'
+
+
+class CausalReads:
+    """Routes note reads to "read_preference" while keeping each user's reads causally consistent with their writes.
+
+        Writes and reads run in causally consistent sessions. The operation time of a write is handed to the client (in
+        the "X-Operation-Time" header and an "operationTime" cookie) and, when sent back, a later read waits until the
+        member it is routed to has caught up to it. With the default primary read preference no sessions are used.
+    """
+
+    def __init__(self, read_preference: Optional[_ServerMode] = None):
+        self._read_preference: Optional[_ServerMode] = read_preference
+
+    @property
+    def enabled(self) -> bool:
+        return self._read_preference is not None and self._read_preference != ReadPreference.PRIMARY
+
+    def reads(self, collection: Collection) -> Collection:
+        """Returns the view of "collection" that reads should be sent to."""
+        return collection.with_options(read_preference=self._read_preference) if self.enabled else collection
+
+    @contextmanager
+    def session(self, req: falcon.Request, resp: falcon.Response,
+                collection: Collection) -> Iterator[Optional[ClientSession]]:
+        """Starts a session continuing from the operation time the client last saw, and reports the session's operation
+            time back once it ends. Yields None, so operations run without a session, if routing is disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        with collection.database.client.start_session(causal_consistency=True) as session:
+            operation_time = decode_operation_time(
+                req.get_header(OPERATION_TIME_HEADER) or req.cookies.get(OPERATION_TIME_COOKIE))
+            if operation_time is not None:
+                session.advance_operation_time(operation_time)
+
+            try:
+                yield session
+            finally:
+                # Reported even if an operation failed, since e.g. an unordered bulk write may have partially applied.
+                if session.operation_time is not None:
+                    value = encode_operation_time(session.operation_time)
+                    resp.set_header(OPERATION_TIME_HEADER, value)
+                    resp.set_cookie(OPERATION_TIME_COOKIE, value, path='/', http_only=True)
+
+
+def read_preference_from_name(name: Optional[str]) -> Optional[_ServerMode]:
+    """Looks up a read preference by its connection string name (e.g. "secondaryPreferred"). Raises a ValueError if the
+        name is unknown.
+    """
+    if not name:
+        return None
+
+    try:
+        return READ_PREFERENCES[name]
+    except KeyError:
+        raise ValueError('Unknown read preference: {}'.format(name)) from None
+
+
+def encode_operation_time(operation_time: Timestamp) -> str:
+    return '{}.{}'.format(operation_time.time, operation_time.inc)
+
+
+def decode_operation_time(value: Optional[str]) -> Optional[Timestamp]:
+    """Returns the operation time encoded by "encode_operation_time", or None if "value" is missing or malformed."""
+    if not value:
+        return None
+
+    try:
+        seconds, increment = value.split('.')
+        return Timestamp(int(seconds), int(increment))
+    except (ValueError, TypeError, OverflowError):
+        return None
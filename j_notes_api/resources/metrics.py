@@ -0,0 +1,17 @@
+import falcon
+
+from j_notes_api.services.metrics import Metrics
+
+
+class MetricsResource:
+    """Exposes the API's metrics in the Prometheus text format. It is excluded from authentication, so it should only
+        be reachable by the scraper (e.g. on an internal network).
+    """
+    CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, metrics: Metrics):
+        self._metrics: Metrics = metrics
+
+    def on_get(self, _req: falcon.Request, resp: falcon.Response):
+        resp.content_type = self.CONTENT_TYPE
+        resp.body = self._metrics.render()
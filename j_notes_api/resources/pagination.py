@@ -0,0 +1,71 @@
+import base64
+import binascii
+import datetime
+from typing import Dict, Tuple
+
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+
+SEARCH_SORT = [('score', -1), ('_id', -1)]
+
+
+def encode_cursor(note: Dict) -> str:
+    """Encodes the (dateModified, _id) position of a note as an opaque, url safe pagination token."""
+    return _encode({'m': note['dateModified'], 'i': note['_id']})
+
+
+def decode_cursor(token: str) -> Tuple[datetime.datetime, ObjectId]:
+    """Decodes a token created by "encode_cursor". Raises a ValueError if the token is malformed."""
+    date_modified, note_id = _decode(token, 'm')
+    if not isinstance(date_modified, datetime.datetime):
+        raise ValueError('Invalid pagination token')
+
+    return date_modified, note_id
+
+
+def keyset_filter(query: Dict, token: str, descending: bool = True) -> Dict:
+    """Restricts "query" to the documents that sort after the position encoded in "token" (see "db.KEYSET_SORT", or its
+        ascending counterpart when "descending" is False).
+    """
+    date_modified, note_id = decode_cursor(token)
+    operator = '$lt' if descending else '$gt'
+    return {
+        **query,
+        '$or': [
+            {'dateModified': {operator: date_modified}},
+            {'dateModified': date_modified, '_id': {operator: note_id}},
+        ]
+    }
+
+
+def encode_search_cursor(note: Dict) -> str:
+    """Encodes the (score, _id) position of a search result as an opaque, url safe pagination token."""
+    return _encode({'s': note['score'], 'i': note['_id']})
+
+
+def search_keyset_filter(token: str) -> Dict:
+    """Matches the search results that sort after the position encoded in "token" (see "SEARCH_SORT"). Raises a
+        ValueError if the token is malformed.
+    """
+    score, note_id = _decode(token, 's')
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError('Invalid pagination token')
+
+    return {
+        '$or': [
+            {'score': {'$lt': score}},
+            {'score': score, '_id': {'$lt': note_id}},
+        ]
+    }
+
+
+def _encode(payload: Dict) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip('=')
+
+
+def _decode(token: str, key: str) -> Tuple[object, ObjectId]:
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode())
+        return payload[key], ObjectId(payload['i'])
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, InvalidId, ValueError) as error:
+        raise ValueError('Invalid pagination token') from error
@@ -0,0 +1,44 @@
+from typing import Dict, List, Optional, Tuple
+
+import falcon
+
+NOTE_FIELDS:    Tuple[str, ...] = ('_id', 'user', 'text', 'body', 'dateCreated', 'dateModified')
+SUMMARY_LENGTH: int = 100
+
+
+def parse_fields(req: falcon.Request) -> Optional[List[str]]:
+    """Reads the comma separated "fields" parameter. Raises a ValueError if an unknown note field is requested."""
+    fields = [field for value in req.get_param_as_list('fields') or [] for field in value.split(',') if field]
+    if not fields:
+        return None
+
+    unknown = set(fields) - set(NOTE_FIELDS)
+    if unknown:
+        raise ValueError('Unknown note fields requested: {}'.format(', '.join(sorted(unknown))))
+
+    return fields
+
+
+def note_projection(fields: Optional[List[str]], summary: bool, required: Tuple[str, ...] = ()) -> Optional[Dict]:
+    """Builds a Mongo projection for the requested note fields, plus any "required" for internal use.
+
+        In summary mode "text" is replaced by its first "SUMMARY_LENGTH" code points (using "$substrCP"), so the
+        projection is only valid as an aggregation "$project" stage.
+    """
+    if not fields and not summary:
+        return None
+
+    projection = {field: True for field in tuple(fields or NOTE_FIELDS) + required}
+    projection.setdefault('_id', False)
+    if summary and 'text' in projection:
+        projection['text'] = {'$substrCP': [{'$ifNull': ['$text', '']}, 0, SUMMARY_LENGTH]}
+
+    return projection
+
+
+def strip_fields(notes: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Removes the fields that were only projected for internal use."""
+    if not fields:
+        return notes
+
+    return [{field: value for field, value in note.items() if field in fields} for note in notes]
@@ -3,68 +3,64 @@ import logging
 from typing import Tuple
 
 import falcon
-from google.oauth2 import id_token
-from google.auth.transport import requests
-from pymongo.collection import Collection
+import jwt
 
 from j_notes_api.models import AuthProvider, IdInfo, User
-from j_notes_api.models.mongo_model import EmptyMongoModelException
-from j_notes_api.services import crypto, UserService
+from j_notes_api.services import crypto, CertificateStore, RevocationList, UserService
 
 
 class SessionsResource:
 
-    def __init__(self, client_id: str, auth_providers: Collection, users: Collection, user_service: UserService):
-        self._client_id:     str = client_id
-        self._auth_providers: Collection = auth_providers
-        self._users:          Collection = users
-        self._user_service:   UserService = user_service
-        self._logger:         logging.Logger = logging.getLogger(__name__)
+    def __init__(self, client_id: str, user_service: UserService, cert_store: CertificateStore = None,
+                 revocation_list: RevocationList = None):
+        self._client_id:       str = client_id
+        self._user_service:    UserService = user_service
+        self._cert_store:      CertificateStore = CertificateStore() if cert_store is None else cert_store
+        self._revocation_list: RevocationList = revocation_list
+        self._logger:          logging.Logger = logging.getLogger(__name__)
 
     def on_post(self, req: falcon.Request, resp: falcon.Response):
+        # google-auth (and "requests" beneath it) is the slowest import of the API, so it waits for the first sign-in.
+        from google.oauth2 import id_token
+
         auth_data = req.get_header('Authorization')
         try:
-            id_info = IdInfo(id_token.verify_oauth2_token(auth_data, requests.Request(), self._client_id))
+            id_info = IdInfo(id_token.verify_oauth2_token(auth_data, self._cert_store, self._client_id))
             user, _ = self.process_id_info(id_info)
             resp.append_header('Authorization', crypto.generate_jwt(user, self._client_id))
         except ValueError as error:
             self._logger.debug('Failed to validate an id token: %s', error)
             resp.status = falcon.HTTP_UNAUTHORIZED
-        except AuthProviderMissingUserException as error:
-            self._logger.debug(error.message)
-            resp.status = falcon.HTTP_INTERNAL_SERVER_ERROR
         except Exception as error:
             self._logger.debug('Something went wrong while processing the session post request: %s', error)
             resp.status = falcon.HTTP_INTERNAL_SERVER_ERROR
             raise error
 
-    def process_id_info(self, id_info: IdInfo, info_source: str = 'google') -> Tuple[User, AuthProvider]:
-        """Processes the id info extracted from a valid id token.
+    def on_delete(self, req: falcon.Request, resp: falcon.Response):
+        """Signs out by revoking the session token's "jti" (only supported when tokens are verified statelessly)."""
+        if self._revocation_list is None:
+            resp.status = falcon.HTTP_METHOD_NOT_ALLOWED
+            resp.set_header('Allow', 'POST')
+            return
 
-            Note: This API oly supports "Google Sign-In" for the time being.
-        """
-        user = None
         try:
-            auth_provider = AuthProvider(
-                self._auth_providers.find_one({'type': info_source, 'userIdentifier': id_info.sub}))
-        except EmptyMongoModelException:
-            user, auth_provider = self._user_service.create_new_user(id_info, info_source)
-
-        if not user:
-            try:
-                user = User(self._users.find_one({'_id': auth_provider.user}))
-            except EmptyMongoModelException:
-                raise AuthProviderMissingUserException(str(auth_provider.uuid))
-
-        if user.auth_token_expiry <= datetime.datetime.now():
-            self._user_service.update_auth_token(user)
+            payload = crypto.decode_jwt(req.get_header('Authorization') or '', self._client_id)
+        except jwt.InvalidTokenError as error:
+            self._logger.debug('Failed to validate a session token: %s', error)
+            resp.status = falcon.HTTP_UNAUTHORIZED
+            return
 
-        return user, auth_provider
+        if payload.get('jti') is None or payload.get('exp') is None:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'The session token can not be revoked'
+            return
 
+        self._revocation_list.revoke(payload['jti'], datetime.datetime.fromtimestamp(payload['exp']))
+        resp.status = falcon.HTTP_NO_CONTENT
 
-class AuthProviderMissingUserException(Exception):
+    def process_id_info(self, id_info: IdInfo, info_source: str = 'google') -> Tuple[User, AuthProvider]:
+        """Processes the id info extracted from a valid id token (see "UserService.sign_in").
 
-    def __init__(self, auth_provider_uuid: str):
-        super().__init__()
-        self.message = ('Failed to find a user for the provided auth provider '
-                        '(Auth provider id: "{}").'.format(auth_provider_uuid))
+            Note: This API oly supports "Google Sign-In" for the time being.
+        """
+        return self._user_service.sign_in(id_info, info_source)
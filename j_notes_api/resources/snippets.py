@@ -0,0 +1,52 @@
+import re
+from typing import List, Pattern, Tuple
+
+_TERM_PATTERN: Pattern = re.compile(r'"([^"]+)"|(\S+)')
+_ELLIPSIS: str = '…'
+
+
+def search_terms(query: str) -> List[str]:
+    """Splits a Mongo "$text" search string into its phrases and words, leaving out negated ("-word") terms."""
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(query):
+        if phrase:
+            terms.append(phrase.strip())
+        elif not word.startswith('-'):
+            terms.append(word.strip('"'))
+
+    return [term for term in terms if term]
+
+
+def make_snippet(text: str, terms: List[str], length: int) -> Tuple[str, List[List[int]]]:
+    """Cuts a window of about "length" characters out of "text" around the first matched term.
+
+        Returns the snippet and the [start, end) offsets of the matches within it. Words are matched by prefix (so
+        "note" highlights "notes"), approximating the stemming done by the text index.
+    """
+    pattern = _highlight_pattern(terms)
+    first = pattern.search(text) if pattern else None
+
+    start = 0
+    if first is not None and len(text) > length:
+        start = max(0, min(first.start() - length // 3, len(text) - length))
+        if start:
+            boundary = text.find(' ', start, first.start())
+            start = boundary + 1 if boundary != -1 else start
+    end = min(len(text), start + length)
+
+    prefix = _ELLIPSIS if start > 0 else ''
+    snippet = prefix + text[start:end] + (_ELLIPSIS if end < len(text) else '')
+    highlights = [] if pattern is None else [
+        [match.start() - start + len(prefix), match.end() - start + len(prefix)]
+        for match in pattern.finditer(text, start, end)
+    ]
+
+    return snippet, highlights
+
+
+def _highlight_pattern(terms: List[str]) -> Pattern:
+    if not terms:
+        return None
+
+    alternatives = sorted((re.escape(term) for term in terms), key=len, reverse=True)
+    return re.compile(r'\b(?:{})\w*'.format('|'.join(alternatives)), re.IGNORECASE)
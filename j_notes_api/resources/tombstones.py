@@ -0,0 +1,12 @@
+import datetime
+from typing import Dict
+
+
+def tombstone_update(now: datetime.datetime) -> Dict:
+    """Builds the update that turns a note into a tombstone, dropping its text (or chunked body, whose chunks the caller
+        deletes) but moving its "dateModified".
+    """
+    return {
+        '$set': {'deleted': True, 'dateModified': now, 'dateDeleted': now},
+        '$unset': {'text': '', 'body': ''},
+    }
@@ -0,0 +1,219 @@
+import codecs
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+import falcon
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.errors import WriteError
+
+from j_notes_api.db import NOT_DELETED, truncate_to_millis
+from j_notes_api.models import User
+from j_notes_api.resources.conditional import apply_validators, make_etag
+
+# The GridFS default, which keeps chunk documents just under the 256KB a MongoDB page favours.
+CHUNK_SIZE:        int = 255 * 1024
+MAX_BODY_SIZE:     int = 64 * 1024 * 1024
+TEXT_CONTENT_TYPE: str = 'text/plain; charset=utf-8'
+
+
+class UserNoteBodyResource:
+    """A note's text as a plain UTF-8 body, for notes too large to move as one JSON document.
+
+        A PUT of up to "inline_limit" bytes is stored in the note's "text" field, as any other note. Larger bodies (up
+        to "max_size" bytes, which needs a Content-Length) are read from the request "chunk_size" bytes at a time and
+        written to "chunks" as they arrive, as a new version of the body that the note then points to: its "body" field
+        holds the version, the length in bytes and the chunk size, and its "text" is dropped. The previous version's
+        chunks are deleted once the note points to the new one, and those of an upload that failed straight away.
+
+        A GET streams the body back (reading "READ_BATCH" chunks per round trip), or just the byte range asked for with
+        a "Range" header, as a 206.
+    """
+    READ_BATCH: int = 4
+
+    def __init__(self, notes: Collection, chunks: Collection, inline_limit: int = 5000, chunk_size: int = CHUNK_SIZE,
+                 max_size: int = MAX_BODY_SIZE):
+        self._notes:        Collection = notes
+        self._chunks:       Collection = chunks
+        self._inline_limit: int = inline_limit
+        self._chunk_size:   int = chunk_size
+        self._max_size:     int = max_size
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response, user_id: str, note_id: str):
+        user: User = req.user
+        if user_id != str(user.uuid):
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'Attempting to access another user\'s data'
+            return
+
+        note = self._notes.find_one({'_id': ObjectId(note_id), 'user': user.uuid, **NOT_DELETED},
+                                    {'text': True, 'body': True, 'dateModified': True})
+        if note is None:
+            resp.status = falcon.HTTP_NOT_FOUND
+            return
+
+        etag = make_etag(note['dateModified'])
+        if apply_validators(req, resp, etag, note['dateModified']):
+            return
+
+        body = note.get('body')
+        text = None if body else (note.get('text') or '').encode()
+        length = body['length'] if body else len(text)
+
+        resp.content_type = TEXT_CONTENT_TYPE
+        resp.accept_ranges = 'bytes'
+        byte_range = self._byte_range(req, etag, length)
+        if byte_range is None:
+            resp.status = falcon.HTTP_REQUESTED_RANGE_NOT_SATISFIABLE
+            resp.set_header('Content-Range', 'bytes */{}'.format(length))
+            return
+
+        start, end = byte_range
+        if (start, end) != (0, length - 1):
+            resp.status = falcon.HTTP_PARTIAL_CONTENT
+            resp.content_range = (start, end, length)
+
+        resp.content_length = end - start + 1
+        if text is not None:
+            resp.data = text[start:end + 1]
+        elif end >= start:
+            resp.stream = self._read_chunks(note['_id'], body, start, end)
+        else:
+            resp.data = b''
+
+    def on_put(self, req: falcon.Request, resp: falcon.Response, user_id: str, note_id: str):
+        user: User = req.user
+        if user_id != str(user.uuid):
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'Attempting to update another user\'s data'
+            return
+
+        length = req.content_length
+        if length is None:
+            resp.status = falcon.HTTP_LENGTH_REQUIRED
+            resp.body = 'The note body must be sent with a Content-Length'
+            return
+        if length > self._max_size:
+            resp.status = falcon.HTTP_REQUEST_ENTITY_TOO_LARGE
+            resp.body = 'The note body must not exceed {} bytes'.format(self._max_size)
+            return
+
+        note_id = ObjectId(note_id)
+        now = truncate_to_millis(datetime.now())
+        version = None
+        try:
+            if length <= self._inline_limit:
+                data = req.bounded_stream.read()
+                if len(data) < length:
+                    raise ValueError('The note body ended before its Content-Length')
+                update = {'$set': {'text': data.decode('utf-8'), 'dateModified': now}, '$unset': {'body': ''}}
+            else:
+                version = ObjectId()
+                body = self._write_chunks(note_id, version, req.bounded_stream, length)
+                update = {'$set': {'body': body, 'dateModified': now}, '$unset': {'text': ''}}
+
+            previous = self._notes.find_one_and_update({'_id': note_id, 'user': user.uuid, **NOT_DELETED}, update,
+                                                       projection={'body': True})
+        except UnicodeDecodeError:
+            self._discard(note_id, version)
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'The note body must be UTF-8 text'
+            return
+        except ValueError as error:
+            self._discard(note_id, version)
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = str(error)
+            return
+        except WriteError:
+            self._discard(note_id, version)
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'The provided payload failed to pass validation'
+            return
+        except Exception:
+            self._discard(note_id, version)
+            raise
+
+        if previous is None:
+            self._discard(note_id, version)
+            resp.status = falcon.HTTP_NOT_FOUND
+            return
+
+        if previous.get('body'):
+            self._discard(note_id, previous['body']['version'])
+        resp.etag = make_etag(now)
+
+    def _write_chunks(self, note_id: ObjectId, version: ObjectId, stream, length: int) -> Dict:
+        # Decoding incrementally checks the body is valid UTF-8 without holding more than a chunk of it.
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        written = 0
+        index = 0
+        while written < length:
+            data = _read_exactly(stream, min(self._chunk_size, length - written))
+            if not data:
+                raise ValueError('The note body ended before its Content-Length')
+            decoder.decode(data)
+            self._chunks.insert_one({'note': note_id, 'version': version, 'n': index, 'data': data})
+            written += len(data)
+            index += 1
+        decoder.decode(b'', final=True)
+
+        return {'version': version, 'length': length, 'chunkSize': self._chunk_size}
+
+    def _read_chunks(self, note_id: ObjectId, body: Dict, start: int, end: int) -> Iterator[bytes]:
+        chunk_size = body['chunkSize']
+        first, last = start // chunk_size, end // chunk_size
+        cursor = self._chunks.find({'note': note_id, 'version': body['version'], 'n': {'$gte': first, '$lte': last}},
+                                   {'_id': False, 'n': True, 'data': True})
+        expected = first
+        for chunk in cursor.sort([('n', ASCENDING)]).batch_size(self.READ_BATCH):
+            if chunk['n'] != expected:
+                break
+            offset = chunk['n'] * chunk_size
+            yield chunk['data'][max(0, start - offset):end - offset + 1]
+            expected += 1
+
+        if expected != last + 1:
+            # The body was replaced (and this version deleted) while it was being read. Failing the response makes the
+            # server drop the connection, so the client sees a truncated body rather than a corrupted one.
+            raise RuntimeError('Chunk {} of note {} is missing'.format(expected, note_id))
+
+    def _discard(self, note_id: ObjectId, version: Optional[ObjectId]):
+        if version is not None:
+            self._chunks.delete_many({'note': note_id, 'version': version})
+
+    @staticmethod
+    def _byte_range(req: falcon.Request, etag: str, length: int) -> Optional[Tuple[int, int]]:
+        """Returns the first and last byte to send, or None if the requested range is not satisfiable.
+
+            The whole body is sent for a request without a "Range", or with an "If-Range" that is not the current
+            ETag.
+        """
+        byte_range = req.range
+        if_range = req.get_header('If-Range')
+        if byte_range is None or req.range_unit != 'bytes' or (if_range is not None and if_range.strip() != etag):
+            return 0, length - 1
+
+        first, last = byte_range
+        if first < 0:
+            return max(0, length + first), length - 1
+        if first >= length:
+            return None
+        return first, length - 1 if last < 0 else min(last, length - 1)
+
+
+def _read_exactly(stream, size: int) -> bytes:
+    """Reads "size" bytes, or fewer only if the stream ends."""
+    data = stream.read(size)
+    if len(data) == size or not data:
+        return data
+
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        data = stream.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b''.join(parts)
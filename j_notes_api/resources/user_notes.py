@@ -1,18 +1,34 @@
 import json
 from datetime import datetime
+from typing import Dict
 
 import falcon
 from bson import ObjectId, json_util
 from pymongo.collection import Collection
 from pymongo.errors import WriteError
 
+from j_notes_api.db import NOT_DELETED, truncate_to_millis
 from j_notes_api.models import User
+from j_notes_api.resources.conditional import apply_validators, make_etag, parse_etag
+from j_notes_api.resources.consistency import CausalReads
+from j_notes_api.resources.projection import note_projection, parse_fields, strip_fields, SUMMARY_LENGTH
+from j_notes_api.resources.tombstones import tombstone_update
+from j_notes_api.serializers import stream_json_array
+from j_notes_api.services.write_behind import PendingWrite, WriteBehindBuffer
 
 
 class UserNotesResource:
+    """A single note. With a "write_behind" buffer, updates without an "If-Match" header are answered with a 202 once
+        buffered, and reads of the note by this process include its pending update.
+    """
 
-    def __init__(self, notes: Collection):
-        self._notes: Collection = notes
+    def __init__(self, notes: Collection, causal_reads: CausalReads = None, write_behind: WriteBehindBuffer = None,
+                 chunks: Collection = None):
+        self._notes:        Collection = notes
+        self._causal_reads: CausalReads = causal_reads or CausalReads()
+        self._reads:        Collection = self._causal_reads.reads(notes)
+        self._write_behind: WriteBehindBuffer = write_behind
+        self._chunks:       Collection = chunks
 
     def on_get(self, req: falcon.Request, resp: falcon.Response, user_id: str, note_id: str):
         user: User = req.user
@@ -21,8 +37,35 @@ class UserNotesResource:
             resp.body = 'Attempting to access another user\'s data'
             return
 
-        user_notes = self._notes.find({'_id': ObjectId(note_id)})
-        resp.body = json_util.dumps(user_notes)
+        try:
+            fields = parse_fields(req)
+        except ValueError as error:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = str(error)
+            return
+
+        summary = req.get_param_as_bool('summary') or False
+        projection = note_projection(fields, summary, required=('dateModified',))
+        note_filter = {'_id': ObjectId(note_id), 'user': user.uuid, **NOT_DELETED}
+        with self._causal_reads.session(req, resp, self._reads) as session:
+            if summary:
+                user_notes = list(self._reads.aggregate([{'$match': note_filter}, {'$project': projection}],
+                                                        session=session))
+            else:
+                user_notes = list(self._reads.find(note_filter, projection, session=session))
+
+        if user_notes and self._write_behind is not None:
+            pending = self._write_behind.pending(user.uuid, note_filter['_id'], user_notes[0]['dateModified'])
+            if pending is not None:
+                _apply_pending_write(user_notes[0], pending, summary)
+
+        if user_notes:
+            date_modified = user_notes[0].get('dateModified')
+            etag = make_etag(date_modified, sorted(fields or ()), summary)
+            if apply_validators(req, resp, etag, date_modified):
+                return
+
+        resp.stream = stream_json_array(strip_fields(user_notes, fields))
 
     def on_put(self, req: falcon.Request, resp: falcon.Response, user_id: str, note_id: str):
         user: User = req.user
@@ -31,26 +74,101 @@ class UserNotesResource:
             resp.body = 'Attempting to update another user\'s data'
             return
 
+        now = truncate_to_millis(datetime.now())
         try:
             payload = json_util.loads(req.bounded_stream.read())
             note_filter = {
                 '_id': ObjectId(note_id),
-                'user': ObjectId(user_id)
+                'user': ObjectId(user_id),
+                **NOT_DELETED
             }
+            # Text sent inline replaces a chunked body (see "UserNoteBodyResource").
             data = {
                 '$set': {
                     'text': payload.get('text', ''),
-                    'dateModified': datetime.now()
-                }
+                    'dateModified': now
+                },
+                '$unset': {'body': ''}
             }
         except json.JSONDecodeError:
             resp.status = falcon.HTTP_BAD_REQUEST
             resp.body = 'Invalid payload provided'
             return
 
+        # "If-Match" turns the update into a compare-and-set on the "dateModified" value the client last saw.
+        if_match = req.get_header('If-Match')
+        if if_match is not None and if_match.strip() != '*':
+            expected = parse_etag(if_match.split(',')[0])
+            if expected is None:
+                resp.status = falcon.HTTP_PRECONDITION_FAILED
+                resp.body = 'The provided "If-Match" ETag is not valid'
+                return
+            note_filter['dateModified'] = expected
+
+        if self._write_behind is not None:
+            if if_match is None:
+                try:
+                    self._write_behind.put(user.uuid, note_filter['_id'], data['$set']['text'], now)
+                except WriteError:
+                    resp.status = falcon.HTTP_BAD_REQUEST
+                    resp.body = 'The provided payload failed to pass validation'
+                    return
+
+                resp.status = falcon.HTTP_ACCEPTED
+                resp.etag = make_etag(now)
+                return
+
+            # The compare-and-set has to see the note's latest update, which is stored with the date it was written
+            # at rather than the one its ETag was made from. Only the worker that buffered it can map one to the other:
+            # an If-Match sent to another worker fails with 412 and the client fetches the note again.
+            self._write_behind.flush([(user.uuid, note_filter['_id'])])
+            if 'dateModified' in note_filter:
+                note_filter['dateModified'] = self._write_behind.stored_date_modified(
+                    user.uuid, note_filter['_id'], note_filter['dateModified'])
+
         try:
-            self._notes.update_one(note_filter, data)
+            with self._causal_reads.session(req, resp, self._notes) as session:
+                previous = self._notes.find_one_and_update(note_filter, data, projection={'body': True},
+                                                           session=session)
         except WriteError:
             resp.status = falcon.HTTP_BAD_REQUEST
             resp.body = 'The provided payload failed to pass validation'
             return
+
+        if if_match is not None and previous is None:
+            resp.status = falcon.HTTP_PRECONDITION_FAILED
+            resp.body = 'The note has been modified since it was last retrieved'
+            return
+
+        # The note no longer points to the chunked body it may have had.
+        if previous is not None and previous.get('body') and self._chunks is not None:
+            self._chunks.delete_many({'note': previous['_id'], 'version': previous['body']['version']})
+
+        resp.etag = make_etag(now)
+
+    def on_delete(self, req: falcon.Request, resp: falcon.Response, user_id: str, note_id: str):
+        user: User = req.user
+        if user_id != str(user.uuid):
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'Attempting to delete another user\'s data'
+            return
+
+        if self._write_behind is not None:
+            self._write_behind.discard(user.uuid, ObjectId(note_id))
+        with self._causal_reads.session(req, resp, self._notes) as session:
+            result = self._notes.update_one({'_id': ObjectId(note_id), 'user': user.uuid, **NOT_DELETED},
+                                            tombstone_update(truncate_to_millis(datetime.now())), session=session)
+        if not result.matched_count:
+            resp.status = falcon.HTTP_NOT_FOUND
+            return
+
+        if self._chunks is not None:
+            self._chunks.delete_many({'note': ObjectId(note_id)})
+        resp.status = falcon.HTTP_NO_CONTENT
+
+
+def _apply_pending_write(note: Dict, pending: PendingWrite, summary: bool):
+    if 'text' in note:
+        note['text'] = pending.text[:SUMMARY_LENGTH] if summary else pending.text
+    note['dateModified'] = pending.date_modified
+    note.pop('body', None)
@@ -0,0 +1,139 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import falcon
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from pymongo import InsertOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from j_notes_api.db import NOT_DELETED
+from j_notes_api.models import User
+from j_notes_api.resources.consistency import CausalReads
+from j_notes_api.resources.tombstones import tombstone_update
+
+Operation = Union[InsertOne, UpdateOne]
+
+
+class UserNotesBatchResource:
+    """Applies a list of note create/update/delete operations with a single unordered "bulk_write".
+
+        The payload is a JSON list of operations such as {"op": "create", "text": "..."},
+        {"op": "update", "id": "<note id>", "text": "..."} or {"op": "delete", "id": "<note id>"}. The response holds
+        one result per operation, in order, holding the affected note id and, if the operation failed, an "error".
+        Updating or deleting a note whose body is chunked (see "UserNoteBodyResource") deletes its chunks.
+    """
+    MAX_OPERATIONS: int = 500
+
+    def __init__(self, notes: Collection, causal_reads: CausalReads = None, chunks: Collection = None):
+        self._notes:        Collection = notes
+        self._causal_reads: CausalReads = causal_reads or CausalReads()
+        self._chunks:       Collection = chunks
+
+    def on_post(self, req: falcon.Request, resp: falcon.Response, user_id: str):
+        user: User = req.user
+        if user_id != str(user.uuid):
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'Attempting to modify another user\'s data'
+            return
+
+        try:
+            payload = json_util.loads(req.bounded_stream.read())
+        except json.JSONDecodeError:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'Invalid payload provided'
+            return
+
+        if not isinstance(payload, list) or not 0 < len(payload) <= self.MAX_OPERATIONS:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'The payload must be a list of 1 to {} operations'.format(self.MAX_OPERATIONS)
+            return
+
+        results = [self._validate(operation) for operation in payload]
+        owned = self._find_owned(user.uuid, [result['id'] for result in results
+                                             if result['op'] in ('update', 'delete') and 'error' not in result])
+
+        now = datetime.now()
+        requests: List[Operation] = []
+        request_indexes: List[int] = []
+        for index, (operation, result) in enumerate(zip(payload, results)):
+            if 'error' in result:
+                continue
+            if result['op'] != 'create' and result['id'] not in owned:
+                result['error'] = 'Note not found'
+                continue
+
+            requests.append(self._to_request(result['op'], result['id'], user.uuid, operation, now))
+            request_indexes.append(index)
+
+        if requests:
+            try:
+                with self._causal_reads.session(req, resp, self._notes) as session:
+                    self._notes.bulk_write(requests, ordered=False, session=session)
+            except BulkWriteError as error:
+                for write_error in error.details.get('writeErrors', []):
+                    results[request_indexes[write_error['index']]]['error'] = \
+                        'The provided payload failed to pass validation'
+
+            if self._chunks is not None:
+                self._delete_chunks([results[index] for index in request_indexes if 'error' not in results[index]],
+                                    owned)
+
+        resp.body = json_util.dumps(results)
+
+    def _find_owned(self, user_uuid: ObjectId, note_ids: List[ObjectId]) -> Dict[ObjectId, Optional[ObjectId]]:
+        """Maps the ids of the user's notes among "note_ids" to the version of their chunked body, if any."""
+        if not note_ids:
+            return {}
+
+        owned = self._notes.find({'_id': {'$in': note_ids}, 'user': user_uuid, **NOT_DELETED},
+                                 projection={'body': True})
+        return {note['_id']: (note.get('body') or {}).get('version') for note in owned}
+
+    def _delete_chunks(self, results: List[Dict], owned: Dict[ObjectId, Optional[ObjectId]]):
+        """Deletes the chunks of the notes deleted, and of the body that updated notes no longer point to."""
+        deleted_ids = [result['id'] for result in results if result['op'] == 'delete']
+        replaced = [{'note': result['id'], 'version': owned[result['id']]} for result in results
+                    if result['op'] == 'update' and owned[result['id']] is not None]
+        if deleted_ids:
+            replaced.append({'note': {'$in': deleted_ids}})
+        if replaced:
+            self._chunks.delete_many({'$or': replaced} if len(replaced) > 1 else replaced[0])
+
+    @staticmethod
+    def _validate(operation: Dict) -> Dict:
+        if not isinstance(operation, dict) or operation.get('op') not in ('create', 'update', 'delete'):
+            return {'op': None, 'error': 'Unknown operation'}
+
+        result = {'op': operation['op']}
+        if operation['op'] == 'create':
+            result['id'] = ObjectId()
+        else:
+            try:
+                result['id'] = ObjectId(operation['id'])
+            except (InvalidId, KeyError, TypeError):
+                result['error'] = 'Invalid note id'
+                return result
+
+        if operation['op'] != 'delete' and not isinstance(operation.get('text', ''), str):
+            result['error'] = 'The note text must be a string'
+
+        return result
+
+    @staticmethod
+    def _to_request(op: str, note_id: ObjectId, user_uuid: ObjectId, operation: Dict, now: datetime) -> Operation:
+        if op == 'create':
+            return InsertOne({
+                '_id': note_id,
+                'user': user_uuid,
+                'text': operation.get('text', ''),
+                'dateCreated': now,
+                'dateModified': now,
+            })
+        if op == 'update':
+            return UpdateOne({'_id': note_id, 'user': user_uuid, **NOT_DELETED},
+                             {'$set': {'text': operation.get('text', ''), 'dateModified': now}, '$unset': {'body': ''}})
+
+        return UpdateOne({'_id': note_id, 'user': user_uuid, **NOT_DELETED}, tombstone_update(now))
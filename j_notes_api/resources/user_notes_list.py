@@ -1,19 +1,32 @@
 from datetime import datetime
 import json
+from typing import Optional
+from urllib.parse import urlencode
 
 import falcon
-from bson import json_util
+from bson import SON, json_util
 from bson.objectid import ObjectId
+from pymongo.client_session import ClientSession
 from pymongo.collection import Collection
 from pymongo.errors import WriteError
 
+from j_notes_api.db import KEYSET_SORT, NOT_DELETED
 from j_notes_api.models import User
+from j_notes_api.resources.conditional import apply_validators, make_etag
+from j_notes_api.resources.consistency import CausalReads
+from j_notes_api.resources.pagination import encode_cursor, keyset_filter
+from j_notes_api.resources.projection import note_projection, parse_fields, strip_fields
+from j_notes_api.serializers import stream_json_array
 
 
 class UserNotesListResource:
+    DEFAULT_LIMIT: int = 50
+    MAX_LIMIT:     int = 200
 
-    def __init__(self, notes: Collection):
-        self._notes: Collection = notes
+    def __init__(self, notes: Collection, causal_reads: CausalReads = None):
+        self._notes:        Collection = notes
+        self._causal_reads: CausalReads = causal_reads or CausalReads()
+        self._reads:        Collection = self._causal_reads.reads(notes)
 
     def on_get(self, req: falcon.Request, resp: falcon.Response, user_id: str):
         user: User = req.user
@@ -22,9 +35,65 @@ class UserNotesListResource:
             resp.body = 'Attempting to access another user\'s data'
             return
 
-        user_notes = self._notes.find({'user': ObjectId(user_id)})
-        if user_notes.count():
-            resp.body = json_util.dumps(user_notes)
+        limit = req.get_param_as_int('limit', False, 1, self.MAX_LIMIT) or self.DEFAULT_LIMIT
+        after = req.get_param('after')
+        summary = req.get_param_as_bool('summary') or False
+        query = {'user': ObjectId(user_id), **NOT_DELETED}
+        try:
+            fields = parse_fields(req)
+            if after:
+                query = keyset_filter(query, after)
+        except ValueError as error:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = str(error)
+            return
+
+        conditional = req.get_header('If-None-Match') is not None or req.get_header('If-Modified-Since') is not None
+        with self._causal_reads.session(req, resp, self._reads) as session:
+            # The list validator is the newest "dateModified" of the user's notes, tombstones included so deletions
+            # change it too. Only revalidations pay for the index-covered query it takes, and a 304 then never runs
+            # the page query.
+            if conditional:
+                latest = self._latest_modification(query['user'], session)
+                if apply_validators(req, resp, make_etag(latest, req.query_string), latest):
+                    return
+
+            # The keyset position of the last note is always needed to build the next page token.
+            projection = note_projection(fields, summary, required=('_id', 'dateModified'))
+
+            # One extra note is requested so the presence of a next page is known without a separate count.
+            if summary:
+                user_notes = list(self._reads.aggregate([
+                    {'$match': query},
+                    {'$sort': SON(KEYSET_SORT)},
+                    {'$limit': limit + 1},
+                    {'$project': projection},
+                ], session=session))
+            else:
+                user_notes = list(self._reads.find(query, projection, session=session)
+                                  .sort(KEYSET_SORT).limit(limit + 1))
+
+        if not conditional and not after:
+            # The first page starts with the newest live note. A tombstone can only be newer, in which case the ETag
+            # is older than the list's and the next revalidation gets a 200 (with the right one) rather than a 304.
+            latest = user_notes[0]['dateModified'] if user_notes else None
+            apply_validators(req, resp, make_etag(latest, req.query_string), latest)
+
+        if len(user_notes) > limit:
+            user_notes = user_notes[:limit]
+            params = {**req.params, 'limit': limit, 'after': encode_cursor(user_notes[-1])}
+            resp.add_link('{}?{}'.format(req.path, urlencode(params, doseq=True)), 'next')
+
+        if user_notes:
+            resp.stream = stream_json_array(strip_fields(user_notes, fields))
+
+    def _latest_modification(self, user_uuid: ObjectId, session: Optional[ClientSession] = None) -> Optional[datetime]:
+        latest = self._reads.find({'user': user_uuid}, {'_id': False, 'dateModified': True}, session=session) \
+            .sort([('dateModified', -1)]).limit(1)
+        for note in latest:
+            return note['dateModified']
+
+        return None
 
     def on_post(self, req: falcon.Request, resp: falcon.Response, user_id: str):
         user: User = req.user
@@ -48,7 +117,8 @@ class UserNotesListResource:
             return
 
         try:
-            result = self._notes.insert_one(data)
+            with self._causal_reads.session(req, resp, self._notes) as session:
+                result = self._notes.insert_one(data, session=session)
         except WriteError:
             resp.status = falcon.HTTP_BAD_REQUEST
             resp.body = 'The provided payload failed to pass validation'
@@ -0,0 +1,87 @@
+from typing import Dict, List
+from urllib.parse import urlencode
+
+import falcon
+from bson import SON
+from bson.objectid import ObjectId
+from pymongo.collection import Collection
+
+from j_notes_api.db import NOT_DELETED
+from j_notes_api.models import User
+from j_notes_api.resources.consistency import CausalReads
+from j_notes_api.resources.pagination import encode_search_cursor, search_keyset_filter, SEARCH_SORT
+from j_notes_api.resources.projection import note_projection, parse_fields
+from j_notes_api.resources.snippets import make_snippet, search_terms
+from j_notes_api.serializers import stream_json_array
+
+
+class UserNotesSearchResource:
+    """Searches a user's notes with the "user_text" text index, most relevant first.
+
+        "q" follows Mongo's text search syntax ("quoted phrases", -excluded words). Each result holds the note fields
+        selected with "fields" (by default all but "text"), its relevance "score", a "snippet" of its text around the
+        first match and the [start, end) offsets of the matched words within the snippet as "highlights". Further pages
+        are linked with rel=next, as on the notes list.
+    """
+    DEFAULT_LIMIT:    int = 20
+    MAX_LIMIT:        int = 100
+    MAX_QUERY_LENGTH: int = 256
+    SNIPPET_LENGTH:   int = 160
+    DEFAULT_FIELDS:   List[str] = ['_id', 'dateCreated', 'dateModified']
+
+    def __init__(self, notes: Collection, causal_reads: CausalReads = None):
+        self._causal_reads: CausalReads = causal_reads or CausalReads()
+        self._reads:        Collection = self._causal_reads.reads(notes)
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response, user_id: str):
+        user: User = req.user
+        if user_id != str(user.uuid):
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'Attempting to access another user\'s data'
+            return
+
+        query = (req.get_param('q') or '').strip()
+        if not query or len(query) > self.MAX_QUERY_LENGTH:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'A search query "q" of 1 to {} characters is required'.format(self.MAX_QUERY_LENGTH)
+            return
+
+        limit = req.get_param_as_int('limit', False, 1, self.MAX_LIMIT) or self.DEFAULT_LIMIT
+        after = req.get_param('after')
+        try:
+            fields = parse_fields(req) or self.DEFAULT_FIELDS
+            pipeline = [
+                # "$text" must lead the first "$match"; the equality on "user" selects the user's index partition.
+                {'$match': {'user': ObjectId(user_id), '$text': {'$search': query}, **NOT_DELETED}},
+                {'$addFields': {'score': {'$meta': 'textScore'}}},
+            ]
+            if after:
+                pipeline.append({'$match': search_keyset_filter(after)})
+        except ValueError as error:
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = str(error)
+            return
+
+        # One extra result is requested so the presence of a next page is known without a separate count.
+        pipeline.extend([
+            {'$sort': SON(SEARCH_SORT)},
+            {'$limit': limit + 1},
+            {'$project': note_projection(fields, False, required=('_id', 'text', 'score'))},
+        ])
+        with self._causal_reads.session(req, resp, self._reads) as session:
+            results = list(self._reads.aggregate(pipeline, session=session))
+
+        if len(results) > limit:
+            results = results[:limit]
+            params = {**req.params, 'limit': limit, 'after': encode_search_cursor(results[-1])}
+            resp.add_link('{}?{}'.format(req.path, urlencode(params, doseq=True)), 'next')
+
+        terms = search_terms(query)
+        resp.stream = stream_json_array(self._to_result(note, fields, terms) for note in results)
+
+    def _to_result(self, note: Dict, fields: List[str], terms: List[str]) -> Dict:
+        snippet, highlights = make_snippet(note.get('text') or '', terms, self.SNIPPET_LENGTH)
+        result = {field: note[field] for field in fields if field in note}
+        result.update(score=note['score'], snippet=snippet, highlights=highlights)
+
+        return result
@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+
+import falcon
+from bson.objectid import ObjectId
+from pymongo.collection import Collection
+
+from j_notes_api.db import NOT_DELETED, SYNC_SORT, TOMBSTONE_RETENTION
+from j_notes_api.models import User
+from j_notes_api.resources.pagination import decode_cursor, encode_cursor, keyset_filter
+from j_notes_api.serializers import dumps_notes
+
+
+class UserNotesSyncResource:
+    """Returns the notes modified since a client's watermark, oldest change first, so clients can sync incrementally.
+
+        The response is {"notes": [...], "watermark": "...", "more": bool}. Deleted notes are returned as tombstones
+        ({"_id": ..., "deleted": true, ...}). Passing the returned watermark as "since" fetches the next set of changes;
+        without "since" the user's live notes are returned as a full sync. Watermarks older than the tombstone retention
+        period are rejected with a 410, since deletions made before then may already have been purged.
+    """
+    DEFAULT_LIMIT: int = 200
+    MAX_LIMIT:     int = 1000
+
+    def __init__(self, notes: Collection):
+        self._notes: Collection = notes
+
+    def on_get(self, req: falcon.Request, resp: falcon.Response, user_id: str):
+        user: User = req.user
+        if user_id != str(user.uuid):
+            resp.status = falcon.HTTP_BAD_REQUEST
+            resp.body = 'Attempting to access another user\'s data'
+            return
+
+        limit = req.get_param_as_int('limit', False, 1, self.MAX_LIMIT) or self.DEFAULT_LIMIT
+        since = req.get_param('since')
+        query = {'user': ObjectId(user_id)}
+        if since:
+            try:
+                watermark, _ = decode_cursor(since)
+                query = keyset_filter(query, since, descending=False)
+            except ValueError:
+                resp.status = falcon.HTTP_BAD_REQUEST
+                resp.body = 'Invalid "since" watermark provided'
+                return
+
+            if watermark.replace(tzinfo=None) < datetime.now() - TOMBSTONE_RETENTION:
+                resp.status = falcon.HTTP_GONE
+                resp.body = 'The provided watermark has expired, please run a full sync'
+                return
+        else:
+            query.update(NOT_DELETED)
+
+        changes = list(self._notes.find(query).sort(SYNC_SORT).limit(limit + 1))
+        more = len(changes) > limit
+        changes = changes[:limit]
+
+        resp.body = '{{"notes": {}, "watermark": {}, "more": {}}}'.format(
+            dumps_notes(changes), json.dumps(encode_cursor(changes[-1]) if changes else since), json.dumps(more))
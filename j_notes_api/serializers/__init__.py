@@ -0,0 +1,2 @@
+from .note import dumps_note, dumps_notes
+from .streaming import stream_json_array
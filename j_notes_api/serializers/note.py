@@ -0,0 +1,52 @@
+import datetime
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Dict, Iterable
+
+import bson
+from bson import ObjectId, json_util
+
+# Fields of the "notes" schema (see "db/setup.py"), with their JSON encoded keys precomputed.
+NOTE_FIELDS = ('_id', 'user', 'text', 'dateCreated', 'dateModified', 'deleted', 'dateDeleted')
+_KEYS: Dict[str, str] = {field: encode_basestring_ascii(field) + ': ' for field in NOTE_FIELDS}
+
+
+def _encode_bool(value: bool) -> str:
+    return 'true' if value else 'false'
+
+
+def _encode_datetime(value: datetime.datetime) -> str:
+    return '{"$date": %d}' % bson._datetime_to_millis(value)  # pylint: disable=protected-access
+
+
+def _encode_object_id(value: ObjectId) -> str:
+    return '{"$oid": "%s"}' % value
+
+
+# Keyed on exact types, so subclasses (e.g. "Int64" or "SON") take the generic path.
+_ENCODERS: Dict[type, Callable[[object], str]] = {
+    str: encode_basestring_ascii,
+    ObjectId: _encode_object_id,
+    datetime.datetime: _encode_datetime,
+    bool: _encode_bool,
+    type(None): lambda _: 'null',
+}
+
+
+def dumps_note(note: Dict) -> str:
+    """Encodes a note document exactly as "json_util.dumps" would, without its generic recursive conversion.
+
+        Documents holding fields or value types outside of the notes schema are handed to "json_util.dumps".
+    """
+    parts = []
+    try:
+        for field, value in note.items():
+            parts.append(_KEYS[field] + _ENCODERS[type(value)](value))
+    except KeyError:
+        return json_util.dumps(note)
+
+    return '{' + ', '.join(parts) + '}'
+
+
+def dumps_notes(notes: Iterable[Dict]) -> str:
+    """Encodes a list of note documents exactly as "json_util.dumps" would."""
+    return '[' + ', '.join(dumps_note(note) for note in notes) + ']'
@@ -0,0 +1,30 @@
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator
+
+from j_notes_api.serializers.note import dumps_note
+
+DEFAULT_BATCH_SIZE: int = 100
+
+
+def stream_json_array(documents: Iterable[Dict],
+                      batch_size: int = DEFAULT_BATCH_SIZE,
+                      dumps: Callable[[Dict], str] = dumps_note) -> Iterator[bytes]:
+    """Lazily encodes "documents" as a JSON array, one element per document, suitable for "resp.stream".
+
+        Documents are pulled "batch_size" at a time (matching the pymongo cursor's batch size when one is given) and
+        each batch is written out as a single chunk, so memory use is bounded by the batch rather than the result.
+    """
+    if hasattr(documents, 'batch_size'):
+        documents = documents.batch_size(batch_size)
+
+    iterator = iter(documents)
+    separator = b'['
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+
+        yield separator + b','.join(dumps(document).encode() for document in batch)
+        separator = b','
+
+    yield b'[]' if separator == b'[' else b']'
@@ -1 +1,7 @@
+from .admission import AdmissionState, LocalAdmissionState, SharedAdmissionState
+from .certs import CertificateStore
+from .metrics import CommandMetrics, Metrics
+from .revocation import RevocationList
+from .user_cache import UserCache
 from .user import UserService
+from .write_behind import WriteBehindBuffer
@@ -0,0 +1,213 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class AdmissionState(ABC):
+    """Token buckets keyed on user id and a count of requests in flight, from which "AdmissionMiddleware" decides.
+
+        Buckets hold up to "burst" tokens and regain "rate" tokens per second; each admitted request takes one.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate:  float = rate
+        self.burst: float = burst
+
+    @abstractmethod
+    def take(self, key: str) -> float:
+        """Takes a token from "key"'s bucket. Returns 0 if one was available, otherwise the seconds until one is."""
+
+    @abstractmethod
+    def acquire(self, limit: int) -> bool:
+        """Counts a request as in flight, unless "limit" requests already are."""
+
+    @abstractmethod
+    def release(self):
+        """Counts a request "acquire" admitted as done."""
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def _wait(self, tokens: float) -> float:
+        return (1 - tokens) / self.rate
+
+
+class LocalAdmissionState(AdmissionState):
+    """Admission state for one process. At most "max_keys" buckets are kept, least recently used first to go (a
+        forgotten bucket comes back full, which only ever favours the user).
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        super().__init__(rate, burst)
+        self._max_keys:  int = max_keys
+        self._buckets:   OrderedDict = OrderedDict()
+        self._in_flight: int = 0
+        self._lock:      threading.Lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = self._refill(tokens, updated, now)
+            wait = 0.0 if tokens >= 1 else self._wait(tokens)
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def acquire(self, limit: int) -> bool:
+        with self._lock:
+            if self._in_flight >= limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+
+class SharedAdmissionState(AdmissionState):
+    """Admission state shared by every process on a host that opens the same "path" (e.g. under /dev/shm), so limits
+        hold across gunicorn workers.
+
+        The file is a memory mapped table of "slots" buckets (addressed by a hash of the key, the stalest bucket being
+        replaced when a few probes find neither the key nor a free slot) and of in-flight counts by worker. Each process
+        claims its own worker slot and clears those of processes that no longer exist, so the requests of a worker
+        that crashed stop counting once its replacement starts. Updates are serialized with a lock on the file.
+    """
+    WORKERS: int = 256
+    PROBES:  int = 4
+
+    _WORKER: struct.Struct = struct.Struct('=qq')  # pid, requests in flight
+    _BUCKET: struct.Struct = struct.Struct('=Qdd')  # key hash (0 if free), tokens, last update (time.monotonic)
+
+    def __init__(self, rate: float, burst: float, path: str, slots: int = 65536):
+        super().__init__(rate, burst)
+        self._path:        str = path
+        self._slots:       int = slots
+        self._size:        int = self._WORKER.size * self.WORKERS + self._BUCKET.size * slots
+        self._file:        Optional[int] = None
+        self._map:         Optional[mmap.mmap] = None
+        self._pid:         Optional[int] = None
+        self._worker_slot: int = 0
+        self._lock:        threading.Lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        first = key_hash % self._slots
+        now = time.monotonic()
+        with self._locked() as table:
+            offset = None
+            stalest = None
+            for probe in range(self.PROBES):
+                candidate = self._bucket_offset((first + probe) % self._slots)
+                slot_hash, _, updated = self._BUCKET.unpack_from(table, candidate)
+                if slot_hash in (key_hash, 0):
+                    offset = candidate
+                    break
+                if stalest is None or updated < stalest[1]:
+                    stalest = (candidate, updated)
+
+            tokens, updated = self.burst, now
+            if offset is None:
+                offset = stalest[0]
+            else:
+                slot_hash, slot_tokens, slot_updated = self._BUCKET.unpack_from(table, offset)
+                if slot_hash:
+                    tokens, updated = slot_tokens, slot_updated
+
+            tokens = self._refill(tokens, updated, now)
+            wait = 0.0 if tokens >= 1 else self._wait(tokens)
+            self._BUCKET.pack_into(table, offset, key_hash, tokens - 1 if not wait else tokens, now)
+            return wait
+
+    def acquire(self, limit: int) -> bool:
+        with self._locked() as table:
+            in_flight = sum(self._WORKER.unpack_from(table, index * self._WORKER.size)[1]
+                            for index in range(self.WORKERS))
+            if in_flight >= limit:
+                return False
+            self._add_in_flight(table, 1)
+            return True
+
+    def release(self):
+        with self._locked() as table:
+            self._add_in_flight(table, -1)
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                os.close(self._file)
+            self._map = self._file = self._pid = None
+
+    @contextmanager
+    def _locked(self) -> Iterator[mmap.mmap]:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    def _open(self):
+        # A forked child shares the parent's mapping, but needs its own descriptor (file locks belong to a process)
+        # and its own worker slot.
+        self._file = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._file).st_size < self._size:
+            os.ftruncate(self._file, self._size)
+        self._map = mmap.mmap(self._file, self._size)
+        self._pid = os.getpid()
+
+        fcntl.lockf(self._file, fcntl.LOCK_EX)
+        try:
+            self._worker_slot = self._claim_worker_slot()
+        finally:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    def _claim_worker_slot(self) -> int:
+        free = None
+        for index in range(self.WORKERS):
+            offset = index * self._WORKER.size
+            pid, _ = self._WORKER.unpack_from(self._map, offset)
+            # Slots of exited processes are cleared (a slot with this pid belonged to one that had the same id).
+            if pid and (pid == self._pid or not _is_running(pid)):
+                self._WORKER.pack_into(self._map, offset, 0, 0)
+                pid = 0
+            if free is None and not pid:
+                free = index
+        if free is None:
+            raise RuntimeError('More than {} processes share the admission state'.format(self.WORKERS))
+
+        self._WORKER.pack_into(self._map, free * self._WORKER.size, self._pid, 0)
+        return free
+
+    def _add_in_flight(self, table: mmap.mmap, delta: int):
+        offset = self._worker_slot * self._WORKER.size
+        pid, in_flight = self._WORKER.unpack_from(table, offset)
+        self._WORKER.pack_into(table, offset, pid, max(0, in_flight + delta))
+
+    def _bucket_offset(self, slot: int) -> int:
+        return self._WORKER.size * self.WORKERS + slot * self._BUCKET.size
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
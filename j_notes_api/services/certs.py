@@ -0,0 +1,100 @@
+import logging
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+    from google.auth import transport
+
+_MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class CertificateStore:
+    """A google-auth transport that keeps GET responses (i.e. Google's signing certificates) in memory.
+
+        Responses are kept for the "max-age" advertised in their "Cache-Control" header and are refreshed in the
+        background once they are within "refresh_margin" seconds of expiring. All requests share one pooled session.
+        Instances can be passed anywhere google-auth expects a request object (e.g. "id_token.verify_oauth2_token").
+
+        "requests" and google-auth's transport are only imported (and the session created) by the first request, as
+        they take longer to import than the rest of the API.
+    """
+
+    def __init__(self, session: 'requests.Session' = None, pool_size: int = 10, timeout: float = 5,
+                 refresh_margin: float = 60, default_max_age: float = 300):
+        self._session:         'requests.Session' = session
+        self._pool_size:       int = pool_size
+        self._request:         'transport.Request' = None
+        self._timeout:         float = timeout
+        self._refresh_margin:  float = refresh_margin
+        self._default_max_age: float = default_max_age
+        self._responses:       Dict[str, Tuple['transport.Response', float]] = {}
+        self._refreshing:      set = set()
+        self._lock:            threading.Lock = threading.Lock()
+        self._logger:          logging.Logger = logging.getLogger(__name__)
+
+    def __call__(self, url: str, method: str = 'GET', body=None, headers=None, timeout=None,
+                 **kwargs) -> 'transport.Response':
+        if method != 'GET' or body is not None:
+            return self._transport()(url, method=method, body=body, headers=headers,
+                                     timeout=timeout or self._timeout, **kwargs)
+
+        now = time.monotonic()
+        with self._lock:
+            response, expires = self._responses.get(url, (None, 0))
+            refresh = response is not None and expires - self._refresh_margin <= now < expires
+            if refresh and url not in self._refreshing:
+                self._refreshing.add(url)
+                threading.Thread(target=self._refresh, args=(url,), daemon=True).start()
+
+        if response is not None and now < expires:
+            return response
+
+        return self._fetch(url)
+
+    def _transport(self) -> 'transport.Request':
+        with self._lock:
+            if self._request is None:
+                import requests
+                from google.auth.transport.requests import Request
+                from requests.adapters import HTTPAdapter
+
+                session = self._session
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self._pool_size, pool_maxsize=self._pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                self._request = Request(session)
+
+            return self._request
+
+    def _fetch(self, url: str) -> 'transport.Response':
+        response = self._transport()(url, method='GET', timeout=self._timeout)
+        max_age = self._max_age(response)
+        if response.status == 200 and max_age > 0:
+            with self._lock:
+                self._responses[url] = (response, time.monotonic() + max_age)
+
+        return response
+
+    def _refresh(self, url: str):
+        try:
+            self._fetch(url)
+        except Exception as error:  # pylint: disable=broad-except
+            self._logger.debug('Failed to refresh the certificates at "%s": %s', url, error)
+        finally:
+            with self._lock:
+                self._refreshing.discard(url)
+
+    def _max_age(self, response: 'transport.Response') -> float:
+        cache_control: Optional[str] = response.headers.get('Cache-Control')
+        if cache_control is None:
+            return self._default_max_age
+        if 'no-store' in cache_control or 'no-cache' in cache_control:
+            return 0
+
+        match = _MAX_AGE_PATTERN.search(cache_control)
+        return int(match.group(1)) if match else self._default_max_age
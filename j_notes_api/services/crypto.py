@@ -1,5 +1,7 @@
+import datetime
 import hashlib
 import os
+import secrets
 from typing import Mapping
 
 import jwt
@@ -15,11 +17,23 @@ def generate_token():
 
 
 def generate_jwt(user: User, secret: str):
-    return jwt.encode({
+    """Signs a session token for "user". Besides the user's auth token it carries "exp" (the auth token's expiry), "iat"
+        and a unique "jti", so the token can also be verified without looking the user up (see "AuthMiddleware").
+    """
+    payload = {
         'sub': str(user.uuid),
-        'token': user.auth_token
-    }, secret, algorithm='HS256')
+        'token': user.auth_token,
+        'iat': int(datetime.datetime.now().timestamp()),
+        'jti': secrets.token_hex(16),
+    }
+    if user.auth_token_expiry is not None:
+        payload['exp'] = int(user.auth_token_expiry.timestamp())
+
+    return jwt.encode(payload, secret, algorithm='HS256')
 
 
 def decode_jwt(payload: str, secret: str) -> Mapping:
+    """Verifies the signature (and "exp", when present) of a session token. Raises a "jwt.InvalidTokenError" if either
+        check fails.
+    """
     return jwt.decode(payload, secret, algorithms=['HS256'])
@@ -0,0 +1,186 @@
+import bisect
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Request latency buckets in seconds, following the Prometheus client defaults.
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+class RequestTimings:
+    """Where the current request's time went: named phases (e.g. "auth") and the Mongo commands it sent."""
+    __slots__ = ('start', 'phases', 'mongo_commands', 'mongo_seconds')
+
+    def __init__(self):
+        self.start:          float = time.perf_counter()
+        self.phases:         Dict[str, float] = {}
+        self.mongo_commands: int = 0
+        self.mongo_seconds:  float = 0.0
+
+
+_CURRENT: ContextVar = ContextVar('request_timings', default=None)
+
+
+def begin_request() -> RequestTimings:
+    """Starts attributing phases and Mongo commands in this context (i.e. the handling thread) to a new request."""
+    timings = RequestTimings()
+    _CURRENT.set(timings)
+    return timings
+
+
+def end_request() -> Optional[RequestTimings]:
+    timings = _CURRENT.get()
+    _CURRENT.set(None)
+    return timings
+
+
+@contextlib.contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Adds the time spent in the block to the current request's "phase". Does nothing outside of a request."""
+    timings = _CURRENT.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[phase] = timings.phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+class Histogram:
+    """A Prometheus style histogram: cumulative bucket counts, a sum and a count."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self.counts:  List[int] = [0] * (len(self.buckets) + 1)
+        self.sum:     float = 0.0
+        self.count:   int = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> Iterator[Tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield ('+Inf' if bound == float('inf') else repr(bound)), total
+
+
+class Metrics:
+    """Collects request latency histograms by route and Mongo command counts and durations, and renders them in the
+        Prometheus text exposition format.
+
+        Metrics are kept per process, so with several gunicorn workers each scrape sees the worker that served it.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self._buckets:       Tuple[float, ...] = buckets
+        self._requests:      Dict[Tuple[str, str], Histogram] = {}
+        self._request_mongo: Dict[Tuple[str, str], Histogram] = {}
+        self._responses:     Dict[Tuple[str, str, str], int] = {}
+        # [succeeded, failed, total seconds] by command name.
+        self._commands:      Dict[str, List] = {}
+        self._lock:          threading.Lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: str, timings: RequestTimings, duration: float):
+        with self._lock:
+            key = (method, route)
+            if key not in self._requests:
+                self._requests[key] = Histogram(self._buckets)
+                self._request_mongo[key] = Histogram((0, 1, 2, 3, 5, 10, 25))
+            self._requests[key].observe(duration)
+            self._request_mongo[key].observe(timings.mongo_commands)
+            response_key = (method, route, status)
+            self._responses[response_key] = self._responses.get(response_key, 0) + 1
+
+    def observe_command(self, command: str, duration: float, succeeded: bool):
+        with self._lock:
+            totals = self._commands.setdefault(command, [0, 0, 0.0])
+            totals[0 if succeeded else 1] += 1
+            totals[2] += duration
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                '# HELP jnotes_request_duration_seconds Time spent handling requests, by route.',
+                '# TYPE jnotes_request_duration_seconds histogram',
+            ]
+            lines.extend(_histogram_lines('jnotes_request_duration_seconds', self._requests))
+            lines.extend([
+                '# HELP jnotes_request_mongo_commands Mongo commands sent per request, by route.',
+                '# TYPE jnotes_request_mongo_commands histogram',
+            ])
+            lines.extend(_histogram_lines('jnotes_request_mongo_commands', self._request_mongo))
+            lines.extend([
+                '# HELP jnotes_responses_total Responses sent, by route and status code.',
+                '# TYPE jnotes_responses_total counter',
+            ])
+            lines.extend('jnotes_responses_total{{{}}} {}'.format(
+                _labels(method=method, route=route, code=status.split(' ', 1)[0]), count)
+                         for (method, route, status), count in sorted(self._responses.items()))
+            lines.extend([
+                '# HELP jnotes_mongo_commands_total Mongo commands sent, by command and outcome.',
+                '# TYPE jnotes_mongo_commands_total counter',
+            ])
+            for command, (succeeded, failed, _) in sorted(self._commands.items()):
+                lines.append('jnotes_mongo_commands_total{{{}}} {}'.format(
+                    _labels(command=command, outcome='succeeded'), succeeded))
+                lines.append('jnotes_mongo_commands_total{{{}}} {}'.format(
+                    _labels(command=command, outcome='failed'), failed))
+            lines.extend([
+                '# HELP jnotes_mongo_command_duration_seconds_total Time spent waiting on Mongo commands, by command.',
+                '# TYPE jnotes_mongo_command_duration_seconds_total counter',
+            ])
+            lines.extend('jnotes_mongo_command_duration_seconds_total{{{}}} {!r}'.format(
+                _labels(command=command), totals[2]) for command, totals in sorted(self._commands.items()))
+
+        return '\n'.join(lines) + '\n'
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """A pymongo command listener that records each command in "metrics" and attributes it to the current request.
+
+        pymongo reports a command's events on the thread that ran it, so the request is found through the context the
+        instrumentation middleware set up for that thread.
+    """
+
+    def __init__(self, metrics: Metrics):
+        self._metrics: Metrics = metrics
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._record(event.command_name, event.duration_micros, True)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._record(event.command_name, event.duration_micros, False)
+
+    def _record(self, command: str, duration_micros: int, succeeded: bool):
+        duration = duration_micros / 1e6
+        timings = _CURRENT.get()
+        if timings is not None:
+            timings.mongo_commands += 1
+            timings.mongo_seconds += duration
+        self._metrics.observe_command(command, duration, succeeded)
+
+
+def _histogram_lines(name: str, histograms: Dict[Tuple[str, str], Histogram]) -> Iterator[str]:
+    for (method, route), histogram in sorted(histograms.items()):
+        for bound, count in histogram.cumulative_counts():
+            yield '{}_bucket{{{}}} {}'.format(name, _labels(method=method, route=route, le=bound), count)
+        yield '{}_sum{{{}}} {!r}'.format(name, _labels(method=method, route=route), float(histogram.sum))
+        yield '{}_count{{{}}} {}'.format(name, _labels(method=method, route=route), histogram.count)
+
+
+def _labels(**labels: str) -> str:
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+                    for name, value in labels.items())
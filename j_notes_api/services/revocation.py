@@ -0,0 +1,99 @@
+import datetime
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Iterable
+
+from pymongo.collection import Collection
+
+
+class BloomFilter:
+    """A fixed size Bloom filter over strings, sized for "capacity" items at the given false positive rate."""
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self._size:   int = max(int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2), 8)
+        self._hashes: int = max(int(round(self._size / capacity * math.log(2))), 1)
+        self._bits:   bytearray = bytearray((self._size + 7) // 8)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: two independent 64 bit halves of one digest stand in for "k" hash functions.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self._size for index in range(self._hashes))
+
+
+class RevocationList:
+    """Answers whether a token id has been revoked without a Mongo round trip for tokens that were not.
+
+        The ids of all unexpired entries in "revoked_tokens" are loaded into a Bloom filter, rebuilt in the background
+        every "refresh_interval" seconds. Only ids the filter reports as present (revoked ones and the occasional false
+        positive) are confirmed against the collection. A revocation made by another process is honoured from the next
+        refresh at the latest.
+    """
+
+    def __init__(self, revoked_tokens: Collection, refresh_interval: float = 30,
+                 false_positive_rate: float = 0.001):
+        self._revoked_tokens:      Collection = revoked_tokens
+        self._refresh_interval:    float = refresh_interval
+        self._false_positive_rate: float = false_positive_rate
+        self._filter:              BloomFilter = None
+        self._refreshed:           float = 0
+        self._refreshing:          bool = False
+        self._lock:                threading.Lock = threading.Lock()
+        self._logger:              logging.Logger = logging.getLogger(__name__)
+        self.confirmations:        int = 0
+
+    def is_revoked(self, token_id: str) -> bool:
+        if self._filter is None:
+            self.refresh()
+        elif time.monotonic() - self._refreshed >= self._refresh_interval:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+        if token_id not in self._filter:
+            return False
+
+        self.confirmations += 1
+        return self._revoked_tokens.find_one({'_id': token_id}, {'_id': True}) is not None
+
+    def revoke(self, token_id: str, expires_at: datetime.datetime):
+        """Records a revoked token id until "expires_at", after which the token would have been rejected anyway."""
+        self._revoked_tokens.update_one({'_id': token_id}, {'$set': {'expiresAt': expires_at}}, upsert=True)
+        if self._filter is not None:
+            self._filter.add(token_id)
+
+    def refresh(self):
+        token_ids = [document['_id'] for document in self._revoked_tokens.find(
+            {'expiresAt': {'$gt': datetime.datetime.now()}}, {'_id': True})]
+        # Headroom for revocations added locally before the next refresh.
+        bloom_filter = BloomFilter(max(len(token_ids) * 2, 1024), self._false_positive_rate)
+        for token_id in token_ids:
+            bloom_filter.add(token_id)
+
+        self._filter = bloom_filter
+        self._refreshed = time.monotonic()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as error:  # pylint: disable=broad-except
+            # The previous filter is kept, and the refresh retried after another interval.
+            self._logger.warning('Failed to refresh the token revocation list: %s', error)
+            self._refreshed = time.monotonic()
+        finally:
+            with self._lock:
+                self._refreshing = False
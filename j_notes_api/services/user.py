@@ -1,46 +1,97 @@
 import datetime
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
+from bson import ObjectId
+from pymongo import ReturnDocument
 from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
 
 from j_notes_api.models import IdInfo, User, AuthProvider
 from j_notes_api.services import crypto
+from j_notes_api.services.user_cache import UserCache
+
+AUTH_TOKEN_LIFETIME: datetime.timedelta = datetime.timedelta(hours=1)
 
 
 class UserService:
 
-    def __init__(self, users: Collection, auth_providers: Collection):
+    def __init__(self, users: Collection, auth_providers: Collection, user_cache: Optional[UserCache] = None):
         self._users: Collection = users
         self._auth_providers: Collection = auth_providers
+        self._user_cache: Optional[UserCache] = user_cache
+
+    def sign_in(self, id_info: IdInfo, info_source: str = 'google') -> Tuple[User, AuthProvider]:
+        """Finds (or creates) the user behind a valid id token, rotating their auth token if it has expired.
+
+            A returning user with a current auth token costs a single "$lookup" aggregation. Otherwise the token is
+            rotated or the user created with atomic updates, so concurrent sign-ins for one subject agree on the result.
+        """
+        pipeline = [
+            {'$match': {'type': info_source, 'userIdentifier': id_info.sub}},
+            {'$limit': 1},
+            {'$lookup': {'from': self._users.name, 'localField': 'user', 'foreignField': '_id', 'as': 'users'}},
+        ]
+        for auth_provider_data in self._auth_providers.aggregate(pipeline):
+            users = auth_provider_data.pop('users')
+            auth_provider = AuthProvider(auth_provider_data)
+            if not users:
+                # The provider outlived its user (e.g. an interrupted sign-up), so the user is recreated under its id.
+                return self._upsert_user(auth_provider.user), auth_provider
+
+            user = User(users[0])
+            if user.auth_token_expiry is None or user.auth_token_expiry <= datetime.datetime.now():
+                self.update_auth_token(user)
+
+            return user, auth_provider
+
+        return self.create_new_user(id_info, info_source)
 
     def create_new_user(self, id_info: IdInfo, info_source: str = 'google') -> Tuple[User, AuthProvider]:
-        """Creates a new user given a IdInfo model from a valid id token."""
+        """Creates a new user given a IdInfo model from a valid id token.
+
+            The auth provider is upserted on its unique ("type", "userIdentifier") index, and the user under the id the
+            provider references, so racing first sign-ins for the same subject end up sharing one user.
+        """
+        auth_provider_data = _upsert(self._auth_providers, {'type': info_source, 'userIdentifier': id_info.sub},
+                                     {'$setOnInsert': {'user': ObjectId(), 'dateCreated': datetime.datetime.now()}})
+        auth_provider = AuthProvider(auth_provider_data)
+
+        return self._upsert_user(auth_provider.user), auth_provider
+
+    def update_auth_token(self, user: User):
+        """Rotates the user's auth token. If another sign-in rotated it first, that token is adopted instead, so
+            concurrent sign-ins do not invalidate each other's session.
+        """
         now = datetime.datetime.now()
+        old_auth_token = user.auth_token
 
-        user_data = {
-            'authToken': crypto.generate_token(),
-            'authTokenExpiry': now + datetime.timedelta(hours=1),
-            'dateCreated': now
-        }
-        user_id = self._users.insert_one(user_data).inserted_id
+        user_data = self._users.find_one_and_update(
+            {'_id': user.uuid, 'authToken': old_auth_token},
+            {'$set': {'authToken': crypto.generate_token(), 'authTokenExpiry': now + AUTH_TOKEN_LIFETIME}},
+            return_document=ReturnDocument.AFTER)
+        if user_data is None:
+            user_data = self._users.find_one({'_id': user.uuid}) or {}
 
-        auth_provider_data = {
-            'type': info_source,
-            'userIdentifier': id_info.sub,
-            'user': user_id,
-            'dateCreated': now
-        }
-        auth_provider_id = self._auth_providers.insert_one(auth_provider_data).inserted_id
+        if self._user_cache is not None:
+            self._user_cache.evict(str(user.uuid), old_auth_token)
 
-        return User({'_id': user_id, **user_data}), AuthProvider({'_id': auth_provider_id, **auth_provider_data})
+        user.auth_token = user_data.get('authToken')
+        user.auth_token_expiry = user_data.get('authTokenExpiry')
 
-    def update_auth_token(self, user: User):
+    def _upsert_user(self, user_id: ObjectId) -> User:
         now = datetime.datetime.now()
-        auth_token = crypto.generate_token()
-        expiry = now + datetime.timedelta(hours=1)
+        return User(_upsert(self._users, {'_id': user_id}, {'$setOnInsert': {
+            'authToken': crypto.generate_token(),
+            'authTokenExpiry': now + AUTH_TOKEN_LIFETIME,
+            'dateCreated': now
+        }}))
 
-        self._users.update_one(filter={'_id': user.uuid},
-                               update={'authToken': auth_token, 'authTokenExpiry': expiry})
 
-        user.auth_token = auth_token
-        user.auth_token_expiry = expiry
+def _upsert(collection: Collection, query: Dict, update: Dict) -> Dict:
+    """Upserts a document and returns it. When a concurrent upsert inserts the same unique key first, the server
+        reports a duplicate key error and retrying finds that document instead.
+    """
+    try:
+        return collection.find_one_and_update(query, update, upsert=True, return_document=ReturnDocument.AFTER)
+    except DuplicateKeyError:
+        return collection.find_one_and_update(query, update, upsert=True, return_document=ReturnDocument.AFTER)
@@ -0,0 +1,67 @@
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from j_notes_api.models import User
+
+CacheKey = Tuple[str, str]
+
+
+class UserCache:
+    """A bounded, per-process LRU cache of authenticated users keyed on (user id, auth token).
+
+        Entries never outlive the cached user's "authTokenExpiry" (or the configured ttl, whichever comes first), so a
+        token rotated by another worker can at worst be honoured until the point it would have expired anyway.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: datetime.timedelta = datetime.timedelta(minutes=5)):
+        self._max_size: int = max_size
+        self._ttl:      datetime.timedelta = ttl
+        self._entries:  OrderedDict = OrderedDict()
+        self._lock:     threading.Lock = threading.Lock()
+        self.hits:      int = 0
+        self.misses:    int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str, auth_token: str) -> Optional[User]:
+        key = (user_id, auth_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            user, expires = entry
+            if expires <= datetime.datetime.now():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+
+    def put(self, user: User):
+        if self._max_size <= 0 or user.auth_token_expiry is None:
+            return
+
+        expires = min(datetime.datetime.now() + self._ttl, user.auth_token_expiry)
+        key = (str(user.uuid), user.auth_token)
+        with self._lock:
+            self._entries[key] = (user, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id: str, auth_token: str):
+        with self._lock:
+            self._entries.pop((user_id, auth_token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,305 @@
+import atexit
+import datetime
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError, WriteError
+
+from j_notes_api.db import NOT_DELETED, truncate_to_millis
+
+# The error code Mongo reports for a document that failed its collection's validator.
+DOCUMENT_VALIDATION_FAILURE: int = 121
+
+# A pending write is keyed on the note's owner and id.
+Key = Tuple[ObjectId, ObjectId]
+
+_BUFFERS: weakref.WeakSet = weakref.WeakSet()
+
+
+class PendingWrite:
+    """The latest text saved for a note that has yet to reach Mongo, when it was saved ("date_modified") and when it
+        must reach Mongo at the latest.
+    """
+    __slots__ = ('text', 'date_modified', 'deadline')
+
+    def __init__(self, text: str, date_modified: datetime.datetime, deadline: float):
+        self.text:          str = text
+        self.date_modified: datetime.datetime = date_modified
+        self.deadline:      float = deadline
+
+
+class WriteBehindBuffer:
+    """Coalesces note text updates so a note saved many times within "window" seconds is written to Mongo once.
+
+        An update is acknowledged as soon as it is buffered. A background thread writes each note's latest text with
+        one unordered "bulk_write" per "max_batch" notes, at most "window" seconds after the note's first buffered
+        update: that is how long an acknowledged update can be lost if the process dies without shutting down. Updates
+        are checked against the notes validator's "text" rules ("schema", a "$jsonSchema") before being buffered, so
+        invalid ones are still rejected with a WriteError; one that fails anyway when flushed is reported by the next
+        update of the same note.
+
+        Each buffered write only applies to a note that has not since been modified ("dateModified" is older than the
+        update, or is the one this buffer last stored) or deleted, so writes made directly (e.g. through the batch
+        resource) are never overwritten by an older buffered one. A note is stored with the "dateModified" of the
+        moment it is written rather than of the update: the list validator and delta syncs only ever see it move
+        forward, past the notes modified in the meantime. "stored_date_modified()" maps an update's date to the stored
+        one, for the "MAX_WRITTEN" notes last written. Pending writes live in this process only: "pending()" gives
+        requests it serves read-your-writes, while other workers see the update once flushed.
+
+        Text replaces a chunked body (see "UserNoteBodyResource"): with the "chunks" collection, the chunks of the
+        bodies a flush replaced are deleted after it.
+    """
+    MAX_WRITTEN: int = 10000
+
+    def __init__(self, notes: Collection, window: float, max_batch: int = 500, schema: Dict = None,
+                 chunks: Collection = None):
+        self._notes:      Collection = notes
+        self._chunks:     Optional[Collection] = chunks
+        self._window:     float = window
+        self._max_batch:  int = max_batch
+        self._text_rule:  Dict = ((schema or {}).get('properties') or {}).get('text') or {}
+        self._pending:    'OrderedDict[Key, PendingWrite]' = OrderedDict()
+        # Writes taken by a flush that Mongo has yet to acknowledge, still visible to "pending()".
+        self._flushing:   Dict[Key, PendingWrite] = {}
+        self._failures:   'OrderedDict[Key, WriteError]' = OrderedDict()
+        # The "dateModified" of the last update written of each note, and the one it was stored with.
+        self._written:    'OrderedDict[Key, Tuple[datetime.datetime, datetime.datetime]]' = OrderedDict()
+        self._condition:  threading.Condition = threading.Condition()
+        self._flush_lock: threading.Lock = threading.Lock()
+        self._thread:     Optional[threading.Thread] = None
+        self._pid:        Optional[int] = None
+        self._closed:     bool = False
+        self._logger:     logging.Logger = logging.getLogger(__name__)
+        self.updates:     int = 0
+        self.writes:      int = 0
+        self.batches:     int = 0
+        _BUFFERS.add(self)
+
+    def put(self, user: ObjectId, note_id: ObjectId, text: str, date_modified: datetime.datetime):
+        """Buffers a note's new text. Raises a WriteError if it fails validation, or if the note's previous buffered
+            update did when it was flushed.
+        """
+        self._validate(text)
+        key = (user, note_id)
+        with self._condition:
+            failure = self._failures.pop(key, None)
+            if failure is not None:
+                raise failure
+            if self._closed:
+                raise RuntimeError('The write-behind buffer has been closed')
+
+            self._start()
+            self.updates += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = PendingWrite(text, date_modified, time.monotonic() + self._window)
+                if len(self._pending) == 1 or len(self._pending) >= self._max_batch:
+                    self._condition.notify()
+            else:
+                # The deadline of the first update stands, so a note saved continuously is still written regularly.
+                entry.text, entry.date_modified = text, date_modified
+
+    def pending(self, user: ObjectId, note_id: ObjectId,
+                stored_date_modified: datetime.datetime = None) -> Optional[PendingWrite]:
+        """Returns the note's update that has not been written yet, if any. With the "dateModified" the note is stored
+            with, only an update that will still apply to it is returned.
+        """
+        key = (user, note_id)
+        with self._condition:
+            entry = self._pending.get(key) or self._flushing.get(key)
+            if entry is not None and stored_date_modified is not None and \
+                    not self._applies(key, entry, stored_date_modified):
+                return None
+            return entry
+
+    def stored_date_modified(self, user: ObjectId, note_id: ObjectId,
+                             date_modified: datetime.datetime) -> datetime.datetime:
+        """Returns the "dateModified" the note's update made at "date_modified" was stored with, once written (or
+            "date_modified" itself, e.g. for an update made in another process).
+        """
+        with self._condition:
+            written = self._written.get((user, note_id))
+        return written[1] if written is not None and written[0] == date_modified else date_modified
+
+    def discard(self, user: ObjectId, note_id: ObjectId):
+        """Drops the note's pending update, e.g. once the note has been deleted."""
+        with self._condition:
+            self._pending.pop((user, note_id), None)
+
+    def flush(self, keys: Iterable[Key] = None):
+        """Writes the pending updates of the notes in "keys" (of all notes by default) before returning, waiting for
+            those the background thread is already writing.
+        """
+        with self._condition:
+            if keys is None:
+                self._condition.wait_for(lambda: not self._flushing)
+                keys = list(self._pending)
+            else:
+                keys = list(keys)
+                self._condition.wait_for(lambda: not any(key in self._flushing for key in keys))
+                # A write that failed to reach Mongo is back in "_pending" by now, so it is retried below.
+                keys = [key for key in keys if key in self._pending]
+            batch = [(key, self._pending.pop(key)) for key in keys]
+            self._flushing.update(batch)
+        for start in range(0, len(batch), self._max_batch):
+            self._write(batch[start:start + self._max_batch])
+
+        if self._closed and self._pending:
+            self._logger.error('%d buffered note updates could not be written', len(self._pending))
+
+    def close(self):
+        """Stops the background thread and writes every pending update."""
+        with self._condition:
+            self._closed = True
+            thread, self._thread = self._thread, None
+            self._condition.notify()
+        if thread is not None and self._pid == os.getpid():
+            thread.join()
+        self.flush()
+
+    def _validate(self, text: str):
+        rule = self._text_rule
+        if not isinstance(text, str):
+            if rule.get('bsonType') == 'string':
+                raise WriteError('Document failed validation', DOCUMENT_VALIDATION_FAILURE)
+        elif len(text) > rule.get('maxLength', len(text)):
+            raise WriteError('Document failed validation', DOCUMENT_VALIDATION_FAILURE)
+
+    def _start(self):
+        # Started on first use, so that each forked worker runs its own thread.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and not self._due():
+                    timeout = self._pending[next(iter(self._pending))].deadline - time.monotonic() \
+                        if self._pending else None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+                batch = []
+                while self._pending and len(batch) < self._max_batch and self._due():
+                    batch.append(self._pending.popitem(last=False))
+                self._flushing.update(batch)
+
+            self._write(batch)
+
+    def _applies(self, key: Key, entry: PendingWrite, stored_date_modified: datetime.datetime) -> bool:
+        written = self._written.get(key)
+        return stored_date_modified < entry.date_modified or \
+            (written is not None and stored_date_modified == written[1])
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        # Entries are in the order they were first buffered, and so of their deadlines.
+        first = self._pending[next(iter(self._pending))]
+        return first.deadline <= time.monotonic() or len(self._pending) >= self._max_batch
+
+    def _write(self, batch: List[Tuple[Key, PendingWrite]]):
+        if not batch:
+            return
+
+        failed = {}
+        retry = []
+        bodies = {}
+        # Flushes are serialized, so two writes of the same note never race each other, and each sees the
+        # "dateModified" the previous one stored.
+        with self._flush_lock:
+            now = truncate_to_millis(datetime.datetime.now())
+            with self._condition:
+                requests = [UpdateOne(self._filter(key, entry),
+                                      {'$set': {'text': entry.text, 'dateModified': now}, '$unset': {'body': ''}})
+                            for key, entry in batch]
+            try:
+                bodies = self._find_bodies(batch)
+                self._notes.bulk_write(requests, ordered=False)
+            except BulkWriteError as error:
+                for write_error in error.details.get('writeErrors', []):
+                    failed[batch[write_error['index']][0]] = WriteError(
+                        write_error.get('errmsg'), write_error.get('code'), write_error)
+                self._logger.warning('%d buffered note updates failed to be written', len(failed))
+            except PyMongoError as error:
+                retry = batch
+                self._logger.warning('Failed to write %d buffered note updates, retrying: %s', len(batch), error)
+            if bodies and not retry:
+                self._delete_replaced_chunks(bodies)
+
+            with self._condition:
+                self.batches += 1
+                self.writes += len(batch) - len(retry)
+                for key, entry in batch:
+                    if self._flushing.get(key) is entry:
+                        del self._flushing[key]
+                    if not retry and key not in failed:
+                        self._written[key] = (entry.date_modified, now)
+                        self._written.move_to_end(key)
+                while len(self._written) > self.MAX_WRITTEN:
+                    self._written.popitem(last=False)
+                for key, error in failed.items():
+                    self._failures[key] = error
+                    if len(self._failures) > self._max_batch:
+                        self._failures.popitem(last=False)
+                for key, entry in reversed(retry):
+                    # A newer update of the note supersedes the one that failed to be written.
+                    if key not in self._pending:
+                        entry.deadline = time.monotonic() + self._window
+                        self._pending[key] = entry
+                        self._pending.move_to_end(key, last=False)
+                # Wakes flushes waiting on these notes (and the background thread, which goes back to waiting).
+                self._condition.notify_all()
+
+    def _find_bodies(self, batch: List[Tuple[Key, PendingWrite]]) -> Dict[ObjectId, ObjectId]:
+        """Maps the notes of "batch" that have a chunked body to its version."""
+        if self._chunks is None:
+            return {}
+
+        notes = self._notes.find({'_id': {'$in': [note_id for (_, note_id), _ in batch]}}, {'body': True})
+        return {note['_id']: note['body']['version'] for note in notes if note.get('body')}
+
+    def _delete_replaced_chunks(self, bodies: Dict[ObjectId, ObjectId]):
+        """Deletes the chunks of the "bodies" their notes no longer point to, i.e. the ones the flush replaced."""
+        try:
+            # Writes that did not apply (the note was modified in the meantime) left their note's body in place.
+            kept = {(note['_id'], note['body']['version'])
+                    for note in self._notes.find({'_id': {'$in': list(bodies)}}, {'body': True}) if note.get('body')}
+            replaced = [{'note': note_id, 'version': version} for note_id, version in bodies.items()
+                        if (note_id, version) not in kept]
+            if replaced:
+                self._chunks.delete_many({'$or': replaced} if len(replaced) > 1 else replaced[0])
+        except PyMongoError as error:
+            self._logger.warning('Failed to delete the chunks of %d replaced note bodies: %s', len(bodies), error)
+
+    def _filter(self, key: Key, entry: PendingWrite) -> Dict:
+        """Matches the note as long as nothing but this buffer modified it since "entry" was buffered."""
+        user, note_id = key
+        unmodified = {'dateModified': {'$lt': entry.date_modified}}
+        written = self._written.get(key)
+        if written is None:
+            return {'_id': note_id, 'user': user, **unmodified, **NOT_DELETED}
+
+        return {'_id': note_id, 'user': user, '$or': [unmodified, {'dateModified': written[1]}], **NOT_DELETED}
+
+
+def close_all():
+    """Closes every write-behind buffer of this process, e.g. as a gunicorn worker exits."""
+    for buffer in list(_BUFFERS):
+        try:
+            buffer.close()
+        except Exception as error:  # pylint: disable=broad-except
+            logging.getLogger(__name__).error('Failed to flush buffered note updates: %s', error)
+
+
+atexit.register(close_all)
@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+from typing import Tuple
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from bson.raw_bson import RawBSONDocument
+
+from j_notes_api import db
+
+
+@pytest.fixture(autouse=True)
+def reset_client_fixture():
+    db.reset_client()
+    yield
+    db.close_client()
+
+
+def _worker_client(parent_client_id: int) -> Tuple[int, int, bool, bool]:
+    client = db.get_client()
+    collection = db.LazyCollection('notes')
+    return (os.getpid(), id(client), id(client) != parent_client_id,
+            collection.database.client is client and db.get_client() is client)
+
+
+def test_get_client_is_created_lazily_and_reused():
+    assert db._CLIENT is None  # pylint: disable=protected-access
+
+    client = db.get_client()
+
+    assert db.get_client() is client
+    assert db.get_database().name == db.MONGO_DATABASE
+
+
+def test_get_client_reads_pool_settings_from_the_environment(monkeypatch: MonkeyPatch):
+    monkeypatch.setenv('MONGO_MAX_POOL_SIZE', '7')
+    monkeypatch.setenv('MONGO_MIN_POOL_SIZE', '2')
+    monkeypatch.setenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '250')
+    monkeypatch.setenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '1500')
+
+    assert db.client_options() == {
+        'maxPoolSize': 7, 'minPoolSize': 2, 'waitQueueTimeoutMS': 250, 'serverSelectionTimeoutMS': 1500}
+    pool_options = db.get_client()._MongoClient__options.pool_options  # pylint: disable=protected-access
+    assert pool_options.max_pool_size == 7
+    assert pool_options.min_pool_size == 2
+
+
+def test_lazy_collection_follows_client_resets():
+    collection = db.LazyCollection('notes')
+    first = collection.collection
+
+    assert collection.name == 'notes'
+    assert collection.database.client is db.get_client()
+
+    db.reset_client()
+
+    assert collection.collection is not first
+    assert collection.database.client is db.get_client()
+
+
+def test_raw_documents_of_a_lazy_collection():
+    collection = db.raw_documents(db.LazyCollection('notes'))
+
+    assert isinstance(collection, db.LazyCollection)
+    assert collection.name == 'notes'
+    assert collection.codec_options.document_class is RawBSONDocument
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_forked_workers_each_get_their_own_client():
+    parent_client = db.get_client()
+
+    with multiprocessing.get_context('fork').Pool(3) as pool:
+        results = pool.map(_worker_client, [id(parent_client)] * 12)
+
+    assert db.get_client() is parent_client
+    assert all(not_inherited and consistent for _, _, not_inherited, consistent in results)
+    clients = {}
+    for pid, client_id, _, _ in results:
+        assert clients.setdefault(pid, client_id) == client_id
@@ -0,0 +1,74 @@
+from typing import Dict
+from unittest.mock import MagicMock
+
+import pytest
+
+from j_notes_api.db import setup
+
+
+def _index_information(name: str) -> Dict:
+    information = {'_id_': {'key': [('_id', 1)], 'v': 2}}
+    for index in setup.INDEXES[name]:
+        document = index.document
+        # The server reports text fields as "_fts"/"_ftsx" key entries, with the field names under "weights".
+        key = setup._server_key(document['key'])  # pylint: disable=protected-access
+        weights = {field: 1 for field, direction in document['key'].items() if direction == 'text'}
+        information[document['name']] = {**document, 'key': key, 'v': 2, **({'weights': weights} if weights else {})}
+
+    return information
+
+
+@pytest.fixture(name='mock_database')
+def mock_database_fixture() -> MagicMock:
+    collections = {name: MagicMock() for name in setup.INDEXES}
+    mock = MagicMock()
+    mock.__getitem__.side_effect = collections.__getitem__
+
+    return mock
+
+
+def test_sync_indexes_when_no_indexes_exist(mock_database: MagicMock):
+    for name in setup.INDEXES:
+        mock_database[name].index_information.return_value = {'_id_': {'key': [('_id', 1)]}}
+
+    changes = setup.sync_indexes(mock_database)
+
+    assert mock_database['notes'].create_indexes.called
+    assert mock_database['authProviders'].create_indexes.called
+    assert not mock_database['users'].create_indexes.called
+    assert all(not dropped for _, dropped in changes.values())
+
+
+def test_sync_indexes_is_idempotent(mock_database: MagicMock):
+    for name in setup.INDEXES:
+        mock_database[name].index_information.return_value = _index_information(name)
+
+    changes = setup.sync_indexes(mock_database)
+
+    assert all(not created and not dropped for created, dropped in changes.values())
+
+
+def test_sync_indexes_drops_unknown_and_changed_indexes(mock_database: MagicMock):
+    for name in setup.INDEXES:
+        mock_database[name].index_information.return_value = _index_information(name)
+    mock_database['users'].index_information.return_value['authToken_1'] = {'key': [('authToken', 1)]}
+    mock_database['authProviders'].index_information.return_value['type_userIdentifier']['unique'] = False
+
+    changes = setup.sync_indexes(mock_database)
+
+    assert changes['users'] == ([], ['authToken_1'])
+    assert changes['authProviders'] == (['type_userIdentifier'], ['type_userIdentifier'])
+
+
+def test_verify_indexes_reports_collection_scans(mock_database: MagicMock):
+    index_scan = {'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}}
+    collection_scan = {'queryPlanner': {'winningPlan': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}}}
+    for name in setup.INDEXES:
+        mock_database[name].find.return_value.explain.return_value = index_scan
+        mock_database[name].find.return_value.sort.return_value.explain.return_value = index_scan
+    mock_database['authProviders'].find.return_value.explain.return_value = collection_scan
+
+    failures = setup.verify_indexes(mock_database)
+
+    assert len(failures) == 1
+    assert failures[0].startswith('authProviders')
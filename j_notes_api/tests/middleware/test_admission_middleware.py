@@ -0,0 +1,131 @@
+#  pylint: disable-msg=C0103
+import threading
+import time
+from typing import List, Tuple
+
+import falcon
+from bson import ObjectId
+from falcon import HTTP_OK, HTTP_SERVICE_UNAVAILABLE, HTTP_TOO_MANY_REQUESTS, testing
+
+from j_notes_api.middleware.admission import AdmissionMiddleware
+from j_notes_api.models import User
+from j_notes_api.services import LocalAdmissionState
+
+_USERS = {name: User({'_id': ObjectId()}) for name in ('flooding', 'first', 'second')}
+
+
+class _HeaderAuthMiddleware:
+
+    def process_resource(self, req: falcon.Request, *_):
+        req.user = _USERS.get(req.get_header('X-User'))
+
+
+class _PoolResource:
+    """Holds one of "size" connections for "latency" seconds per request, like a resource waiting on Mongo."""
+
+    def __init__(self, size: int = 1, latency: float = 0.0, entered: threading.Event = None,
+                 proceed: threading.Event = None):
+        self._pool:    threading.BoundedSemaphore = threading.BoundedSemaphore(size)
+        self._latency: float = latency
+        self._entered: threading.Event = entered
+        self._proceed: threading.Event = proceed
+
+    def on_get(self, _req: falcon.Request, _resp: falcon.Response):
+        if self._entered is not None:
+            self._entered.set()
+            self._proceed.wait(5)
+        with self._pool:
+            time.sleep(self._latency)
+
+
+def _client(middleware: AdmissionMiddleware, resource: _PoolResource) -> testing.TestClient:
+    api = falcon.API(middleware=[_HeaderAuthMiddleware(), middleware])
+    api.add_route('/', resource)
+
+    return testing.TestClient(api)
+
+
+def test_process_resource_limits_each_user():
+    client = _client(AdmissionMiddleware(LocalAdmissionState(rate=0.5, burst=2)), _PoolResource())
+
+    statuses = [client.simulate_get('/', headers={'X-User': 'first'}).status for _ in range(3)]
+    resp: testing.Result = client.simulate_get('/', headers={'X-User': 'first'})
+
+    assert statuses == [HTTP_OK, HTTP_OK, HTTP_TOO_MANY_REQUESTS]
+    assert resp.status == HTTP_TOO_MANY_REQUESTS
+    assert resp.headers['Retry-After'] == '2'
+    assert client.simulate_get('/', headers={'X-User': 'second'}).status == HTTP_OK
+    assert client.simulate_get('/').status == HTTP_OK
+
+
+def test_process_request_sheds_requests_over_the_in_flight_limit():
+    entered, proceed = threading.Event(), threading.Event()
+    state = LocalAdmissionState(rate=0, burst=0)
+    client = _client(AdmissionMiddleware(state, max_in_flight=1, retry_after=3), _PoolResource(entered=entered,
+                                                                                               proceed=proceed))
+    blocked = threading.Thread(target=client.simulate_get, args=('/',))
+    blocked.start()
+    entered.wait(5)
+
+    resp: testing.Result = client.simulate_get('/')
+    proceed.set()
+    blocked.join()
+
+    assert resp.status == HTTP_SERVICE_UNAVAILABLE
+    assert resp.headers['Retry-After'] == '3'
+    assert client.simulate_get('/').status == HTTP_OK
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * quantile))]
+
+
+def _flood(middleware: List) -> Tuple[List[float], List[str], List[str]]:
+    """Serves two well-behaved users sending under 10 requests/s each while twelve threads of another user retry
+        every 2ms. Returns the well-behaved users' latencies and statuses, and the flooding user's statuses.
+    """
+    api = falcon.API(middleware=[_HeaderAuthMiddleware()] + middleware)
+    # Two connections at 20ms a request serve 100 requests/s.
+    api.add_route('/', _PoolResource(size=2, latency=0.02))
+    client = testing.TestClient(api)
+    done = threading.Event()
+    latencies: List[float] = []
+    statuses: List[str] = []
+    flood_statuses: List[str] = []
+
+    def flood():
+        while not done.is_set():
+            flood_statuses.append(client.simulate_get('/', headers={'X-User': 'flooding'}).status)
+            time.sleep(0.002)
+
+    def behave(user: str):
+        for _ in range(10):
+            start = time.perf_counter()
+            statuses.append(client.simulate_get('/', headers={'X-User': user}).status)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.1)
+
+    flooders = [threading.Thread(target=flood) for _ in range(12)]
+    users = [threading.Thread(target=behave, args=(user,)) for user in ('first', 'second')]
+    for thread in flooders + users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    done.set()
+    for thread in flooders:
+        thread.join()
+
+    return latencies, statuses, flood_statuses
+
+
+def test_well_behaved_users_stay_fast_while_another_user_floods():
+    unlimited_latencies, _, _ = _flood([])
+    latencies, statuses, flood_statuses = _flood([AdmissionMiddleware(LocalAdmissionState(rate=10, burst=2), 64)])
+
+    # Admitted at 10 requests/s, the flooding user occupies a fifth of one connection instead of queueing the other
+    # users' requests behind a dozen of theirs.
+    assert set(statuses) == {HTTP_OK}
+    assert HTTP_TOO_MANY_REQUESTS in flood_statuses
+    assert _percentile(latencies, 0.99) < 0.1
+    assert _percentile(latencies, 0.99) < _percentile(unlimited_latencies, 0.99)
@@ -8,7 +8,8 @@ from falcon import API, testing, HTTP_UNAUTHORIZED, HTTP_OK
 from pymongo.collection import Collection
 
 from j_notes_api.middleware.auth import AuthMiddleware
-from j_notes_api.services import crypto
+from j_notes_api.models import User
+from j_notes_api.services import crypto, RevocationList, UserCache
 
 
 @pytest.fixture(name='auth_middleware')
@@ -57,3 +58,70 @@ def test_process_resource_when_auth_token_is_valid(client: testing.TestClient):
     with patch.object(crypto, 'decode_jwt') as _:
         resp: testing.Result = client.simulate_post('/', headers={'Authorization': 'expired-token'})
         assert resp.status == HTTP_OK
+
+
+def test_process_resource_when_user_is_cached(client_id: str, mock_users: MagicMock, user_data: Dict):
+    user_cache = UserCache()
+    api = API(middleware=AuthMiddleware(client_id, mock_users, user_cache=user_cache))
+    api.add_route('/', testing.SimpleTestResource())
+    client = testing.TestClient(api)
+
+    with patch.object(crypto, 'decode_jwt') as mock_decode_jwt:
+        mock_decode_jwt.return_value = {'sub': str(user_data['_id']), 'token': user_data['authToken']}
+        for _ in range(3):
+            resp: testing.Result = client.simulate_post('/', headers={'Authorization': 'cached-token'})
+            assert resp.status == HTTP_OK
+
+    assert mock_users.find_one.call_count == 1
+    assert user_cache.hits == 2
+    assert user_cache.misses == 1
+
+
+@pytest.fixture(name='stateless_client')
+def stateless_client_fixture(client_id: str, mock_users: MagicMock) -> testing.TestClient:
+    mock_revoked_tokens = MagicMock()
+    mock_revoked_tokens.find.return_value = []
+    api = API(middleware=AuthMiddleware(client_id, mock_users, revocation_list=RevocationList(mock_revoked_tokens)))
+    api.add_route('/', testing.SimpleTestResource())
+
+    return testing.TestClient(api)
+
+
+def test_process_resource_when_stateless_token_is_valid(stateless_client: testing.TestClient, client_id: str,
+                                                        mock_users: MagicMock, user: User):
+    token = crypto.generate_jwt(user, client_id).decode()
+
+    resp: testing.Result = stateless_client.simulate_post('/', headers={'Authorization': token})
+
+    assert resp.status == HTTP_OK
+    assert not mock_users.find_one.called
+
+
+def test_process_resource_when_stateless_token_is_expired(stateless_client: testing.TestClient, client_id: str,
+                                                          user: User):
+    user.auth_token_expiry = datetime.datetime.now() - datetime.timedelta(minutes=1)
+    token = crypto.generate_jwt(user, client_id).decode()
+
+    resp: testing.Result = stateless_client.simulate_post('/', headers={'Authorization': token})
+
+    assert resp.status == HTTP_UNAUTHORIZED
+
+
+def test_process_resource_when_stateless_token_is_revoked(client_id: str, mock_users: MagicMock, user: User):
+    token = crypto.generate_jwt(user, client_id).decode()
+    mock_revoked_tokens = MagicMock()
+    mock_revoked_tokens.find.return_value = [{'_id': crypto.decode_jwt(token, client_id)['jti']}]
+    api = API(middleware=AuthMiddleware(client_id, mock_users, revocation_list=RevocationList(mock_revoked_tokens)))
+    api.add_route('/', testing.SimpleTestResource())
+
+    resp: testing.Result = testing.TestClient(api).simulate_post('/', headers={'Authorization': token})
+
+    assert resp.status == HTTP_UNAUTHORIZED
+
+
+def test_process_resource_when_token_signature_is_invalid(stateless_client: testing.TestClient, user: User):
+    token = crypto.generate_jwt(user, 'another-secret').decode()
+
+    resp: testing.Result = stateless_client.simulate_post('/', headers={'Authorization': token})
+
+    assert resp.status == HTTP_UNAUTHORIZED
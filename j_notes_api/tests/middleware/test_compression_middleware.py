@@ -0,0 +1,110 @@
+#  pylint: disable-msg=C0103
+import gzip
+import io
+import zlib
+
+import falcon
+import pytest
+from falcon import testing
+
+from j_notes_api.middleware.compression import CompressionMiddleware, negotiate_encoding
+
+_PAYLOAD = b'{"text": "' + b'compressible note text ' * 200 + b'"}'
+
+
+class _PayloadResource:
+
+    def __init__(self, mode: str, payload: bytes = _PAYLOAD):
+        self._mode:    str = mode
+        self._payload: bytes = payload
+
+    def on_get(self, _req: falcon.Request, resp: falcon.Response):
+        if self._mode == 'body':
+            resp.etag = '"mock-etag"'
+            resp.body = self._payload.decode()
+        elif self._mode == 'ranges':
+            resp.accept_ranges = 'bytes'
+            resp.data = self._payload
+        elif self._mode == 'partial':
+            resp.status = falcon.HTTP_PARTIAL_CONTENT
+            resp.content_range = (0, len(self._payload) - 1, len(self._payload) * 2)
+            resp.data = self._payload
+        elif self._mode == 'stream':
+            resp.stream = (self._payload[index:index + 100] for index in range(0, len(self._payload), 100))
+        else:
+            resp.stream = io.BytesIO(self._payload)
+
+
+def _client(mode: str, payload: bytes = _PAYLOAD) -> testing.TestClient:
+    api = falcon.API(middleware=CompressionMiddleware(min_size=1024, level=6))
+    api.add_route('/', _PayloadResource(mode, payload))
+
+    return testing.TestClient(api)
+
+
+@pytest.mark.parametrize('mode', ['body', 'stream', 'file'])
+def test_process_response_using_gzip(mode: str):
+    resp: testing.Result = _client(mode).simulate_get('/', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert gzip.decompress(resp.content) == _PAYLOAD
+    assert len(resp.content) < len(_PAYLOAD)
+
+
+@pytest.mark.parametrize('mode', ['body', 'stream', 'file'])
+def test_process_response_using_deflate(mode: str):
+    resp: testing.Result = _client(mode).simulate_get('/', headers={'Accept-Encoding': 'deflate'})
+
+    assert resp.headers['Content-Encoding'] == 'deflate'
+    assert zlib.decompress(resp.content) == _PAYLOAD
+
+
+@pytest.mark.parametrize('mode', ['body', 'stream'])
+def test_process_response_below_the_size_threshold(mode: str):
+    resp: testing.Result = _client(mode, b'{}').simulate_get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.content == b'{}'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+
+
+def test_process_response_without_an_accepted_encoding():
+    resp: testing.Result = _client('body').simulate_get('/', headers={'Accept-Encoding': 'br'})
+
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.content == _PAYLOAD
+
+
+@pytest.mark.parametrize('accept_encoding, etag', [
+    ('gzip', '"mock-etag-gzip"'),
+    ('deflate', '"mock-etag-deflate"'),
+    ('identity', '"mock-etag"'),
+])
+def test_process_response_gives_each_content_coding_its_etag(accept_encoding: str, etag: str):
+    resp: testing.Result = _client('body').simulate_get('/', headers={'Accept-Encoding': accept_encoding})
+
+    assert resp.headers['ETag'] == etag
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    (None, None),
+    ('', None),
+    ('gzip', 'gzip'),
+    ('deflate, gzip', 'gzip'),
+    ('gzip;q=0.5, deflate', 'deflate'),
+    ('gzip;q=0, deflate;q=0', None),
+    ('*', 'gzip'),
+    ('*;q=0.1, gzip;q=0', 'deflate'),
+    ('identity', None),
+])
+def test_negotiate_encoding(accept_encoding: str, expected: str):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize('mode', ['partial', 'ranges'])
+def test_process_response_leaves_byte_ranges_alone(mode: str):
+    resp: testing.Result = _client(mode).simulate_get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.content == _PAYLOAD
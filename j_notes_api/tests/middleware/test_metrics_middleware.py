@@ -0,0 +1,70 @@
+#  pylint: disable-msg=C0103
+from unittest.mock import MagicMock
+
+import falcon
+import pytest
+from falcon import HTTP_NOT_FOUND, HTTP_OK, testing
+
+from j_notes_api.middleware.metrics import MetricsMiddleware
+from j_notes_api.resources import MetricsResource
+from j_notes_api.services import CommandMetrics, Metrics
+from j_notes_api.services.metrics import timed
+
+
+class _NotesResource:
+
+    def __init__(self, listener: CommandMetrics):
+        self._listener: CommandMetrics = listener
+
+    def on_get(self, _req: falcon.Request, resp: falcon.Response, note_id: str):
+        with timed('work'):
+            for duration in (1500, 500):
+                self._listener.succeeded(MagicMock(command_name='find', duration_micros=duration))
+        resp.body = note_id
+
+
+@pytest.fixture(name='metrics')
+def metrics_fixture() -> Metrics:
+    return Metrics()
+
+
+@pytest.fixture(name='client')
+def client_fixture(metrics: Metrics) -> testing.TestClient:
+    api = falcon.API(middleware=MetricsMiddleware(metrics, {_NotesResource: '/notes/{note_id}',
+                                                            MetricsResource: '/metrics'}))
+    api.add_route('/notes/{note_id}', _NotesResource(CommandMetrics(metrics)))
+    api.add_route('/metrics', MetricsResource(metrics))
+
+    return testing.TestClient(api)
+
+
+def test_process_response_sets_server_timing(client: testing.TestClient):
+    resp: testing.Result = client.simulate_get('/notes/1')
+
+    assert resp.status == HTTP_OK
+    entries = [entry.split(';') for entry in resp.headers['Server-Timing'].split(', ')]
+    assert [entry[0] for entry in entries] == ['work', 'db', 'total']
+    assert entries[1][1:] == ['dur=2.00', 'desc="2 commands"']
+
+
+def test_process_response_records_metrics_by_route(client: testing.TestClient):
+    client.simulate_get('/notes/1')
+    client.simulate_get('/notes/2')
+    resp: testing.Result = client.simulate_get('/unknown')
+
+    assert resp.status == HTTP_NOT_FOUND
+    text = client.simulate_get('/metrics').text
+    assert 'jnotes_request_duration_seconds_count{method="GET",route="/notes/{note_id}"} 2\n' in text
+    assert 'jnotes_request_mongo_commands_bucket{method="GET",route="/notes/{note_id}",le="1"} 0\n' in text
+    assert 'jnotes_request_mongo_commands_bucket{method="GET",route="/notes/{note_id}",le="2"} 2\n' in text
+    assert 'jnotes_responses_total{method="GET",route="unmatched",code="404"} 1\n' in text
+    assert 'jnotes_mongo_commands_total{command="find",outcome="succeeded"} 4\n' in text
+    assert 'jnotes_mongo_command_duration_seconds_total{command="find"} 0.004\n' in text
+
+
+def test_metrics_resource(client: testing.TestClient):
+    resp: testing.Result = client.simulate_get('/metrics')
+
+    assert resp.status == HTTP_OK
+    assert resp.headers['Content-Type'] == MetricsResource.CONTENT_TYPE
+    assert '# TYPE jnotes_request_duration_seconds histogram' in resp.text
@@ -0,0 +1,2 @@
+#  pylint: disable=W
+from j_notes_api.tests.models.fixtures import *
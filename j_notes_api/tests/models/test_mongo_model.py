@@ -1,7 +1,12 @@
-#  pylint: disable-msg=C0103
+#  pylint: disable-msg=C0103,W0104
+from typing import Dict
+from unittest.mock import patch
+
 import pytest
-from bson import ObjectId
+from bson import BSON, ObjectId, raw_bson
+from bson.raw_bson import RawBSONDocument
 
+from j_notes_api.models import AuthProvider, Note, User
 from j_notes_api.models.mongo_model import EmptyMongoModelException, MongoModel
 
 
@@ -30,3 +35,48 @@ def test_mongo_model_with_data_and_uuid_override(mock_uuid: ObjectId, mock_uuid_
 def test_mongo_model_with_no_data():
     with pytest.raises(EmptyMongoModelException):
         MongoModel(None)
+
+
+def test_mongo_model_with_empty_raw_bson_document():
+    with pytest.raises(EmptyMongoModelException):
+        MongoModel(RawBSONDocument(BSON.encode({})))
+
+
+def test_models_do_not_have_an_instance_dict(user: User, auth_provider: AuthProvider):
+    note = Note({'_id': ObjectId(), 'text': 'mock-text'})
+
+    for model in (user, auth_provider, note):
+        assert not hasattr(model, '__dict__')
+
+
+def test_model_fields_are_read_from_the_document(user_data: Dict):
+    user = User(user_data)
+
+    assert user.uuid == user_data['_id']
+    assert user.auth_token == user_data['authToken']
+    assert user.auth_token_expiry == user_data['authTokenExpiry']
+    assert user.date_created == user_data['dateCreated']
+
+
+def test_model_fields_can_be_assigned(user_data: Dict):
+    user = User(user_data)
+    user.auth_token = 'new-auth-token'
+
+    assert user.auth_token == 'new-auth-token'
+    assert user.uuid == user_data['_id']
+    assert user_data['authToken'] != 'new-auth-token'
+
+
+def test_model_fields_are_decoded_lazily_from_raw_bson(user_data: Dict):
+    raw = RawBSONDocument(BSON.encode(user_data))
+    with patch('bson.raw_bson._inflate_bson', wraps=raw_bson._inflate_bson) as mock_inflate:  # pylint: disable=W0212
+        user = User(raw)
+        assert not mock_inflate.called
+
+        user.auth_token_expiry
+        user.auth_token
+        assert mock_inflate.call_count == 1
+
+    assert user.auth_token_expiry == user_data['authTokenExpiry'].replace(
+        microsecond=user_data['authTokenExpiry'].microsecond // 1000 * 1000)
+    assert user.uuid == user_data['_id']
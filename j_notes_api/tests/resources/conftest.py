@@ -1,3 +1,4 @@
 #  pylint: disable=W
 from j_notes_api.tests.models.fixtures import *
 from j_notes_api.tests.db.fixtures import *
+from j_notes_api.tests.resources.fixtures import *
@@ -0,0 +1,26 @@
+from typing import Dict
+
+import falcon
+import pytest
+
+from j_notes_api.middleware.compression import CompressionMiddleware
+from j_notes_api.models import User
+
+
+class _MockAuthMiddleware:
+
+    def __init__(self, user: User):
+        self._user: User = user
+
+    def process_resource(self, req: falcon.Request, _resp: falcon.Response, _resource: object, _params: Dict):
+        req.user = self._user
+
+
+@pytest.fixture(name='authenticated_api')
+def authenticated_api_fixture(user: User) -> falcon.API:
+    return falcon.API(middleware=_MockAuthMiddleware(user))
+
+
+@pytest.fixture(name='compressed_api')
+def compressed_api_fixture(user: User) -> falcon.API:
+    return falcon.API(middleware=[_MockAuthMiddleware(user), CompressionMiddleware(min_size=1)])
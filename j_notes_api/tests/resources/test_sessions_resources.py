@@ -1,17 +1,15 @@
 #  pylint: disable-msg=C0103,R0913
-import datetime
 from typing import Dict, Union
 from unittest.mock import MagicMock, patch
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
-from falcon import API, HTTP_OK, HTTP_UNAUTHORIZED, HTTP_INTERNAL_SERVER_ERROR, testing
+from falcon import API, HTTP_OK, HTTP_UNAUTHORIZED, HTTP_METHOD_NOT_ALLOWED, HTTP_NO_CONTENT, testing
 
 from j_notes_api.app import RESOURCE_MAP
 from j_notes_api.models import User, IdInfo, AuthProvider
 from j_notes_api.resources import SessionsResource
-from j_notes_api.resources.sessions import AuthProviderMissingUserException
-from j_notes_api.services import UserService
+from j_notes_api.services import crypto, UserService
 
 
 @pytest.fixture(name='session_path')
@@ -22,16 +20,13 @@ def session_path_fixture() -> str:
 @pytest.fixture(name='mock_user_service')
 def mock_user_service_fixture(user: User, auth_provider: AuthProvider) -> Union[UserService, MagicMock]:
     mock = MagicMock()
-    mock.create_new_user.return_value = user, auth_provider
+    mock.sign_in.return_value = user, auth_provider
     return mock
 
 
 @pytest.fixture(name='sessions_resource')
-def sessions_resource_fixture(client_id: str,
-                              mock_auth_providers: MagicMock,
-                              mock_users: MagicMock,
-                              mock_user_service: Union[UserService, MagicMock]) -> SessionsResource:
-    return SessionsResource(client_id, mock_auth_providers, mock_users, mock_user_service)
+def sessions_resource_fixture(client_id: str, mock_user_service: Union[UserService, MagicMock]) -> SessionsResource:
+    return SessionsResource(client_id, mock_user_service)
 
 
 @pytest.fixture(name='client')
@@ -66,18 +61,6 @@ def test_on_post_using_invalid_id_token(client: testing.TestClient, session_path
     assert resp.status == HTTP_UNAUTHORIZED
 
 
-def test_on_post_when_auth_provider_missing_exception_is_raised(client: testing.TestClient,
-                                                                session_path: str,
-                                                                id_info_data: Dict,
-                                                                monkeypatch: MonkeyPatch):
-    with patch.object(SessionsResource, 'process_id_info') as mock_process_id_info:
-        mock_process_id_info.side_effect = AuthProviderMissingUserException('mock-uuid')
-        monkeypatch.setattr('google.oauth2.id_token.verify_oauth2_token', lambda *_: id_info_data)
-        resp: testing.Result = client.simulate_post(session_path)
-        assert mock_process_id_info.called
-        assert resp.status == HTTP_INTERNAL_SERVER_ERROR
-
-
 def test_on_post_when_an_unhandled_exception_is_raised(client: testing.TestClient,
                                                        session_path: str,
                                                        id_info_data: Dict,
@@ -90,48 +73,33 @@ def test_on_post_when_an_unhandled_exception_is_raised(client: testing.TestClien
         assert mock_process_id_info.called
 
 
-def test_process_id_info_when_auth_token_is_expired(sessions_resource: SessionsResource,
-                                                    id_info: IdInfo,
-                                                    mock_users: MagicMock,
-                                                    mock_auth_providers: MagicMock,
-                                                    mock_user_service: MagicMock,
-                                                    auth_provider_data: Dict,
-                                                    user_data: Dict):
-    with patch.object(mock_user_service, 'update_auth_token') as mock_update_auth_token:
-        user_data['authTokenExpiry'] = datetime.datetime.now() - datetime.timedelta(hours=1)
-        mock_auth_providers.find_one.return_value = auth_provider_data
-        mock_users.find_one.return_value = user_data
-        sessions_resource.process_id_info(id_info)
-        assert mock_update_auth_token.called
-
-
-def test_process_id_info_when_auth_token_is_valid(sessions_resource: SessionsResource,
-                                                  id_info: IdInfo,
-                                                  mock_users: MagicMock,
-                                                  mock_auth_providers: MagicMock,
-                                                  mock_user_service: MagicMock,
-                                                  auth_provider_data: Dict,
-                                                  user_data: Dict):
-    with patch.object(mock_user_service, 'update_auth_token') as mock_update_auth_token:
-        mock_auth_providers.find_one.return_value = auth_provider_data
-        mock_users.find_one.return_value = user_data
-        sessions_resource.process_id_info(id_info)
-        assert not mock_update_auth_token.called
-
-
-def test_process_id_info_when_auth_provider_does_not_exist(sessions_resource: SessionsResource,
-                                                           id_info: IdInfo,
-                                                           mock_auth_providers: MagicMock):
-    mock_auth_providers.find_one.return_value = None
-    user, auth_provider = sessions_resource.process_id_info(id_info)
-
-    assert isinstance(user, User)
-    assert isinstance(auth_provider, AuthProvider)
-
-
-def test_process_id_info_when_auth_provider_exists_but_user_does_not(sessions_resource: SessionsResource,
-                                                                     id_info: IdInfo,
-                                                                     mock_users: MagicMock):
-    mock_users.find_one.return_value = None
-    with pytest.raises(AuthProviderMissingUserException):
-        sessions_resource.process_id_info(id_info)
+def test_process_id_info_signs_the_user_in(sessions_resource: SessionsResource,
+                                           id_info: IdInfo,
+                                           mock_user_service: MagicMock,
+                                           user: User,
+                                           auth_provider: AuthProvider):
+    assert sessions_resource.process_id_info(id_info) == (user, auth_provider)
+    mock_user_service.sign_in.assert_called_with(id_info, 'google')
+
+
+def test_on_delete_without_stateless_auth(client: testing.TestClient, session_path: str):
+    resp: testing.Result = client.simulate_delete(session_path)
+
+    assert resp.status == HTTP_METHOD_NOT_ALLOWED
+
+
+def test_on_delete_revokes_the_session_token(client_id: str,
+                                             mock_user_service: Union[UserService, MagicMock],
+                                             session_path: str,
+                                             user: User):
+    mock_revocation_list = MagicMock()
+    api = API()
+    api.add_route(session_path, SessionsResource(client_id, mock_user_service, MagicMock(), mock_revocation_list))
+    token = crypto.generate_jwt(user, client_id).decode()
+
+    resp: testing.Result = testing.TestClient(api).simulate_delete(session_path, headers={'Authorization': token})
+
+    assert resp.status == HTTP_NO_CONTENT
+    token_id, expires_at = mock_revocation_list.revoke.call_args[0]
+    assert token_id == crypto.decode_jwt(token, client_id)['jti']
+    assert expires_at == user.auth_token_expiry.replace(microsecond=0)
@@ -0,0 +1,290 @@
+#  pylint: disable-msg=C0103
+import datetime
+import tracemalloc
+from typing import Dict, Iterator, List
+from unittest.mock import MagicMock
+
+import falcon
+import pytest
+from bson import ObjectId
+from falcon import HTTP_BAD_REQUEST, HTTP_NOT_FOUND, HTTP_OK, HTTP_PARTIAL_CONTENT, \
+    HTTP_REQUEST_ENTITY_TOO_LARGE, HTTP_REQUESTED_RANGE_NOT_SATISFIABLE, testing
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.db import NOT_DELETED
+from j_notes_api.models import User
+from j_notes_api.resources import UserNoteBodyResource
+from j_notes_api.resources.conditional import make_etag
+from j_notes_api.resources.user_note_body import CHUNK_SIZE
+
+LARGE_BODY_SIZE: int = 50 * 1024 * 1024
+# Generous for a couple of chunks in flight, yet far below the body size.
+MEMORY_BUDGET:   int = 4 * 1024 * 1024
+
+
+class _Chunks:
+    """Keeps chunk documents in a list, or with "keep_data" off only their size, so large bodies need no memory."""
+
+    def __init__(self, keep_data: bool = True):
+        self.documents:  List[Dict] = []
+        self.keep_data:  bool = keep_data
+        self.deleted:    List[Dict] = []
+        self.bytes_seen: int = 0
+
+    def insert_one(self, document: Dict):
+        self.bytes_seen += len(document['data'])
+        if not self.keep_data:
+            document = dict(document, data=len(document['data']))
+        self.documents.append(document)
+
+    def delete_many(self, query: Dict):
+        self.deleted.append(query)
+        self.documents = [document for document in self.documents
+                          if any(document[field] != value for field, value in query.items())]
+
+    def find(self, query: Dict, _projection: Dict):
+        chunks = [document for document in self.documents
+                  if document['note'] == query['note'] and document['version'] == query['version']
+                  and query['n']['$gte'] <= document['n'] <= query['n']['$lte']]
+        cursor = MagicMock()
+        cursor.sort.return_value.batch_size.return_value = sorted(chunks, key=lambda document: document['n'])
+        return cursor
+
+
+class _GeneratedChunks(_Chunks):
+    """Generates the chunks of a body of "size" bytes on demand."""
+
+    def __init__(self, size: int):
+        super().__init__()
+        self.size: int = size
+
+    def find(self, query: Dict, _projection: Dict):
+        def generate() -> Iterator[Dict]:
+            for index in range(query['n']['$gte'], query['n']['$lte'] + 1):
+                yield {'n': index, 'data': b'x' * min(CHUNK_SIZE, self.size - index * CHUNK_SIZE)}
+
+        cursor = MagicMock()
+        cursor.sort.return_value.batch_size.return_value = generate()
+        return cursor
+
+
+class _Input:
+    """A request body of "size" bytes, produced as it is read."""
+
+    def __init__(self, size: int):
+        self.remaining: int = size
+
+    def read(self, size: int = -1) -> bytes:
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        return b'x' * size
+
+
+@pytest.fixture(name='note_data')
+def note_data_fixture(user: User) -> Dict:
+    now = datetime.datetime.now().replace(microsecond=0)
+    return {'_id': ObjectId(), 'text': 'mock-text', 'dateModified': now}
+
+
+@pytest.fixture(name='body_path')
+def body_path_fixture(user: User, note_data: Dict) -> str:
+    return RESOURCE_MAP[UserNoteBodyResource].format(user_id=user.uuid, note_id=note_data['_id'])
+
+
+@pytest.fixture(name='mock_notes')
+def mock_notes_fixture(note_data: Dict) -> MagicMock:
+    mock = MagicMock()
+    mock.find_one.return_value = note_data
+    mock.find_one_and_update.return_value = {'_id': note_data['_id']}
+
+    return mock
+
+
+@pytest.fixture(name='chunks')
+def chunks_fixture() -> _Chunks:
+    return _Chunks()
+
+
+@pytest.fixture(name='client')
+def client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock, chunks: _Chunks) -> testing.TestClient:
+    resource = UserNoteBodyResource(mock_notes, chunks, inline_limit=8, chunk_size=4, max_size=64)
+    authenticated_api.add_route(RESOURCE_MAP[UserNoteBodyResource], resource)
+
+    return testing.TestClient(authenticated_api)
+
+
+def test_on_get_an_inline_body(client: testing.TestClient, body_path: str, mock_notes: MagicMock, note_data: Dict,
+                               user: User):
+    resp: testing.Result = client.simulate_get(body_path)
+
+    assert resp.status == HTTP_OK
+    assert resp.text == 'mock-text'
+    assert resp.headers['Content-Type'] == 'text/plain; charset=utf-8'
+    assert resp.headers['Accept-Ranges'] == 'bytes'
+    assert resp.headers['ETag'] == make_etag(note_data['dateModified'])
+    assert mock_notes.find_one.call_args[0][0] == {'_id': note_data['_id'], 'user': user.uuid, **NOT_DELETED}
+
+
+@pytest.mark.parametrize('byte_range,content,content_range', [
+    ('bytes=2-4', 'ck-', 'bytes 2-4/9'),
+    ('bytes=5-', 'text', 'bytes 5-8/9'),
+    ('bytes=-3', 'ext', 'bytes 6-8/9'),
+    ('bytes=7-100', 'xt', 'bytes 7-8/9'),
+])
+def test_on_get_a_range(client: testing.TestClient, body_path: str, byte_range: str, content: str,
+                        content_range: str):
+    resp: testing.Result = client.simulate_get(body_path, headers={'Range': byte_range})
+
+    assert resp.status == HTTP_PARTIAL_CONTENT
+    assert resp.text == content
+    assert resp.headers['Content-Range'] == content_range
+
+
+def test_on_get_an_unsatisfiable_range(client: testing.TestClient, body_path: str):
+    resp: testing.Result = client.simulate_get(body_path, headers={'Range': 'bytes=9-'})
+
+    assert resp.status == HTTP_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert resp.headers['Content-Range'] == 'bytes */9'
+
+
+def test_on_get_a_range_of_a_changed_body(client: testing.TestClient, body_path: str):
+    resp: testing.Result = client.simulate_get(body_path, headers={'Range': 'bytes=2-4', 'If-Range': '"1"'})
+
+    assert resp.status == HTTP_OK
+    assert resp.text == 'mock-text'
+
+
+def test_on_get_resumes_a_download_through_compression(compressed_api: falcon.API, body_path: str,
+                                                        mock_notes: MagicMock, note_data: Dict):
+    note_data['text'] = 'compressible ' * 300
+    compressed_api.add_route(RESOURCE_MAP[UserNoteBodyResource], UserNoteBodyResource(mock_notes, _Chunks()))
+    client = testing.TestClient(compressed_api)
+    full: testing.Result = client.simulate_get(body_path, headers={'Accept-Encoding': 'gzip'})
+    resumed: testing.Result = client.simulate_get(body_path, headers={
+        'Accept-Encoding': 'gzip', 'Range': 'bytes=50-', 'If-Range': full.headers['ETag']})
+
+    assert 'Content-Encoding' not in full.headers
+    assert resumed.status == HTTP_PARTIAL_CONTENT
+    assert 'Content-Encoding' not in resumed.headers
+    assert full.content[:50] + resumed.content == note_data['text'].encode()
+
+
+def test_on_get_a_missing_note(client: testing.TestClient, body_path: str, mock_notes: MagicMock):
+    mock_notes.find_one.return_value = None
+
+    assert client.simulate_get(body_path).status == HTTP_NOT_FOUND
+
+
+def test_on_get_a_chunked_body(client: testing.TestClient, body_path: str, note_data: Dict, chunks: _Chunks):
+    version = ObjectId()
+    for index, data in enumerate([b'0123', b'4567', b'89']):
+        chunks.insert_one({'note': note_data['_id'], 'version': version, 'n': index, 'data': data})
+    del note_data['text']
+    note_data['body'] = {'version': version, 'length': 10, 'chunkSize': 4}
+
+    assert client.simulate_get(body_path).text == '0123456789'
+    resp: testing.Result = client.simulate_get(body_path, headers={'Range': 'bytes=3-8'})
+    assert resp.status == HTTP_PARTIAL_CONTENT
+    assert resp.text == '345678'
+
+
+def test_on_put_a_small_body_inline(client: testing.TestClient, body_path: str, mock_notes: MagicMock,
+                                    chunks: _Chunks):
+    resp: testing.Result = client.simulate_put(body_path, body='short')
+    update = mock_notes.find_one_and_update.call_args[0][1]
+
+    assert resp.status == HTTP_OK
+    assert update['$set']['text'] == 'short'
+    assert update['$unset'] == {'body': ''}
+    assert resp.headers['ETag'] == make_etag(update['$set']['dateModified'])
+    assert not chunks.documents
+
+
+def test_on_put_a_large_body_in_chunks(client: testing.TestClient, body_path: str, mock_notes: MagicMock,
+                                       chunks: _Chunks, note_data: Dict):
+    previous_version = ObjectId()
+    mock_notes.find_one_and_update.return_value = {'body': {'version': previous_version}}
+    resp: testing.Result = client.simulate_put(body_path, body='0123456789')
+    update = mock_notes.find_one_and_update.call_args[0][1]
+
+    assert resp.status == HTTP_OK
+    assert update['$unset'] == {'text': ''}
+    assert update['$set']['body']['length'] == 10
+    assert [(chunk['n'], chunk['data']) for chunk in chunks.documents] == [(0, b'0123'), (1, b'4567'), (2, b'89')]
+    assert {chunk['version'] for chunk in chunks.documents} == {update['$set']['body']['version']}
+    assert chunks.deleted == [{'note': note_data['_id'], 'version': previous_version}]
+
+
+def test_on_put_a_body_that_is_not_utf8(client: testing.TestClient, body_path: str, mock_notes: MagicMock,
+                                        chunks: _Chunks):
+    resp: testing.Result = client.simulate_put(body_path, body=b'0123456\xc3')
+
+    assert resp.status == HTTP_BAD_REQUEST
+    assert not mock_notes.find_one_and_update.called
+    assert not chunks.documents
+
+
+def test_on_put_a_body_of_a_missing_note(client: testing.TestClient, body_path: str, mock_notes: MagicMock,
+                                         chunks: _Chunks):
+    mock_notes.find_one_and_update.return_value = None
+    resp: testing.Result = client.simulate_put(body_path, body='0123456789')
+
+    assert resp.status == HTTP_NOT_FOUND
+    assert not chunks.documents
+
+
+def test_on_put_a_body_that_is_too_large(client: testing.TestClient, body_path: str, chunks: _Chunks):
+    resp: testing.Result = client.simulate_put(body_path, body='x' * 65)
+
+    assert resp.status == HTTP_REQUEST_ENTITY_TOO_LARGE
+    assert not chunks.documents
+
+
+def _call(api: falcon.API, env: Dict) -> int:
+    """Calls the WSGI app, returning the number of bytes in the response without holding them."""
+    result = api(env, lambda status, headers: None)
+    try:
+        return sum(len(data) for data in result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+
+def test_on_put_a_50mb_body_within_a_memory_budget(authenticated_api: falcon.API, mock_notes: MagicMock,
+                                                   body_path: str):
+    chunks = _Chunks(keep_data=False)
+    authenticated_api.add_route(RESOURCE_MAP[UserNoteBodyResource],
+                                UserNoteBodyResource(mock_notes, chunks, max_size=LARGE_BODY_SIZE))
+    env = testing.create_environ(body_path, method='PUT')
+    env['CONTENT_LENGTH'] = str(LARGE_BODY_SIZE)
+    env['wsgi.input'] = _Input(LARGE_BODY_SIZE)
+
+    tracemalloc.start()
+    try:
+        _call(authenticated_api, env)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert chunks.bytes_seen == LARGE_BODY_SIZE
+    assert len(chunks.documents) == -(-LARGE_BODY_SIZE // CHUNK_SIZE)
+    assert peak < MEMORY_BUDGET
+
+
+def test_on_get_a_50mb_body_within_a_memory_budget(authenticated_api: falcon.API, mock_notes: MagicMock,
+                                                   note_data: Dict, body_path: str):
+    del note_data['text']
+    note_data['body'] = {'version': ObjectId(), 'length': LARGE_BODY_SIZE, 'chunkSize': CHUNK_SIZE}
+    authenticated_api.add_route(RESOURCE_MAP[UserNoteBodyResource],
+                                UserNoteBodyResource(mock_notes, _GeneratedChunks(LARGE_BODY_SIZE)))
+    env = testing.create_environ(body_path)
+
+    tracemalloc.start()
+    try:
+        size = _call(authenticated_api, env)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert size == LARGE_BODY_SIZE
+    assert peak < MEMORY_BUDGET
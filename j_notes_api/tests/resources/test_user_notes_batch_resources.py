@@ -0,0 +1,157 @@
+#  pylint: disable-msg=C0103
+from typing import List
+from unittest.mock import MagicMock
+
+import falcon
+import pytest
+from bson import ObjectId, json_util
+from falcon import HTTP_BAD_REQUEST, HTTP_OK, testing
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.models import User
+from j_notes_api.resources import UserNotesBatchResource, UserNotesResource
+
+
+@pytest.fixture(name='batch_path')
+def batch_path_fixture(user: User) -> str:
+    return RESOURCE_MAP[UserNotesBatchResource].format(user_id=user.uuid)
+
+
+@pytest.fixture(name='owned_ids')
+def owned_ids_fixture() -> List[ObjectId]:
+    return [ObjectId(), ObjectId()]
+
+
+@pytest.fixture(name='mock_notes')
+def mock_notes_fixture(owned_ids: List[ObjectId]) -> MagicMock:
+    mock = MagicMock()
+    mock.find.return_value = [{'_id': note_id} for note_id in owned_ids]
+
+    return mock
+
+
+@pytest.fixture(name='client')
+def client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock) -> testing.TestClient:
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesBatchResource], UserNotesBatchResource(mock_notes))
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesResource], UserNotesResource(mock_notes))
+
+    return testing.TestClient(authenticated_api)
+
+
+def test_on_post_runs_one_unordered_bulk_write(client: testing.TestClient,
+                                               batch_path: str,
+                                               mock_notes: MagicMock,
+                                               owned_ids: List[ObjectId]):
+    resp: testing.Result = client.simulate_post(batch_path, body=json_util.dumps([
+        {'op': 'create', 'text': 'new note'},
+        {'op': 'update', 'id': str(owned_ids[0]), 'text': 'updated note'},
+        {'op': 'delete', 'id': str(owned_ids[1])},
+    ]))
+    results = json_util.loads(resp.text)
+    requests, = mock_notes.bulk_write.call_args[0]
+
+    assert resp.status == HTTP_OK
+    assert mock_notes.bulk_write.call_count == 1
+    assert mock_notes.bulk_write.call_args[1] == {'ordered': False, 'session': None}
+    assert [type(request) for request in requests] == [InsertOne, UpdateOne, UpdateOne]
+    assert requests[2]._doc['$set']['deleted'] is True
+    assert [result['id'] for result in results[1:]] == owned_ids
+    assert not any('error' in result for result in results)
+
+
+def test_on_post_rejects_notes_owned_by_other_users(client: testing.TestClient,
+                                                    batch_path: str,
+                                                    mock_notes: MagicMock,
+                                                    owned_ids: List[ObjectId]):
+    resp: testing.Result = client.simulate_post(batch_path, body=json_util.dumps([
+        {'op': 'update', 'id': str(ObjectId()), 'text': 'not mine'},
+        {'op': 'update', 'id': str(owned_ids[0]), 'text': 'mine'},
+    ]))
+    results = json_util.loads(resp.text)
+
+    assert results[0]['error'] == 'Note not found'
+    assert 'error' not in results[1]
+    assert len(mock_notes.bulk_write.call_args[0][0]) == 1
+
+
+def test_on_post_reports_invalid_operations(client: testing.TestClient, batch_path: str, mock_notes: MagicMock):
+    resp: testing.Result = client.simulate_post(batch_path, body=json_util.dumps([
+        {'op': 'rename'},
+        {'op': 'delete', 'id': 'invalid-id'},
+        {'op': 'update'},
+        {'op': 'create', 'text': 5},
+    ]))
+
+    assert all('error' in result for result in json_util.loads(resp.text))
+    assert not mock_notes.bulk_write.called
+
+
+def test_on_post_maps_write_errors_to_operations(client: testing.TestClient,
+                                                 batch_path: str,
+                                                 mock_notes: MagicMock):
+    mock_notes.bulk_write.side_effect = BulkWriteError({'writeErrors': [{'index': 1, 'errmsg': 'invalid'}]})
+    resp: testing.Result = client.simulate_post(batch_path, body=json_util.dumps([
+        {'op': 'rename'},
+        {'op': 'create', 'text': 'valid'},
+        {'op': 'create', 'text': 'too long'},
+    ]))
+    results = json_util.loads(resp.text)
+
+    assert 'error' not in results[1]
+    assert results[2]['error'] == 'The provided payload failed to pass validation'
+
+
+@pytest.mark.parametrize('body', ['not json', '{}', '[]'])
+def test_on_post_using_an_invalid_payload(client: testing.TestClient, batch_path: str, body: str):
+    resp: testing.Result = client.simulate_post(batch_path, body=body)
+
+    assert resp.status == HTTP_BAD_REQUEST
+
+
+def test_on_post_removes_the_chunks_of_deleted_notes(authenticated_api: falcon.API,
+                                                     batch_path: str,
+                                                     mock_notes: MagicMock,
+                                                     owned_ids: List[ObjectId]):
+    chunks = MagicMock()
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesBatchResource], UserNotesBatchResource(mock_notes, None, chunks))
+    testing.TestClient(authenticated_api).simulate_post(batch_path, body=json_util.dumps([
+        {'op': 'update', 'id': str(owned_ids[0]), 'text': 'updated note'},
+        {'op': 'delete', 'id': str(owned_ids[1])},
+    ]))
+
+    assert mock_notes.bulk_write.call_args[0][0][0]._doc['$unset'] == {'body': ''}
+    chunks.delete_many.assert_called_once_with({'note': {'$in': [owned_ids[1]]}})
+
+
+def test_on_post_removes_the_chunks_of_the_bodies_updates_replace(authenticated_api: falcon.API,
+                                                                  batch_path: str,
+                                                                  mock_notes: MagicMock,
+                                                                  owned_ids: List[ObjectId]):
+    chunks = MagicMock()
+    version = ObjectId()
+    mock_notes.find.return_value = [{'_id': owned_ids[0], 'body': {'version': version}}, {'_id': owned_ids[1]}]
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesBatchResource], UserNotesBatchResource(mock_notes, None, chunks))
+    testing.TestClient(authenticated_api).simulate_post(batch_path, body=json_util.dumps([
+        {'op': 'update', 'id': str(owned_ids[0]), 'text': 'updated note'},
+        {'op': 'update', 'id': str(owned_ids[1]), 'text': 'updated note'},
+    ]))
+
+    assert mock_notes.find.call_args[1] == {'projection': {'body': True}}
+    chunks.delete_many.assert_called_once_with({'note': owned_ids[0], 'version': version})
+
+
+def test_on_post_keeps_the_chunks_of_a_body_whose_update_failed(authenticated_api: falcon.API,
+                                                                batch_path: str,
+                                                                mock_notes: MagicMock,
+                                                                owned_ids: List[ObjectId]):
+    chunks = MagicMock()
+    mock_notes.find.return_value = [{'_id': owned_ids[0], 'body': {'version': ObjectId()}}]
+    mock_notes.bulk_write.side_effect = BulkWriteError({'writeErrors': [{'index': 0, 'errmsg': 'invalid'}]})
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesBatchResource], UserNotesBatchResource(mock_notes, None, chunks))
+    testing.TestClient(authenticated_api).simulate_post(batch_path, body=json_util.dumps([
+        {'op': 'update', 'id': str(owned_ids[0]), 'text': 'x' * 5001},
+    ]))
+
+    assert not chunks.delete_many.called
@@ -0,0 +1,204 @@
+#  pylint: disable-msg=C0103
+import datetime
+import os
+from typing import Dict, List
+from unittest.mock import MagicMock
+
+import falcon
+import pytest
+from bson import ObjectId, json_util
+from falcon import HTTP_BAD_REQUEST, HTTP_NOT_MODIFIED, HTTP_OK, testing
+from pymongo import MongoClient, ReadPreference
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.db import NOT_DELETED
+from j_notes_api.models import User
+from j_notes_api.resources import CausalReads, UserNotesListResource
+from j_notes_api.resources.conditional import make_etag
+from j_notes_api.resources.consistency import OPERATION_TIME_HEADER, decode_operation_time
+from j_notes_api.resources.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture(name='notes_path')
+def notes_path_fixture(user: User) -> str:
+    return RESOURCE_MAP[UserNotesListResource].format(user_id=user.uuid)
+
+
+@pytest.fixture(name='notes_data')
+def notes_data_fixture(user: User) -> List[Dict]:
+    now = datetime.datetime.now().replace(microsecond=0)
+    return [{
+        '_id': ObjectId(),
+        'user': user.uuid,
+        'text': 'mock-text-{}'.format(index),
+        'dateCreated': now,
+        'dateModified': now - datetime.timedelta(minutes=index),
+    } for index in range(3)]
+
+
+@pytest.fixture(name='mock_notes')
+def mock_notes_fixture(notes_data: List[Dict]) -> MagicMock:
+    mock = MagicMock()
+    mock.find.return_value.sort.return_value.limit.side_effect = lambda limit: notes_data[:limit]
+
+    return mock
+
+
+@pytest.fixture(name='client')
+def client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock) -> testing.TestClient:
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesListResource], UserNotesListResource(mock_notes))
+
+    return testing.TestClient(authenticated_api)
+
+
+def test_on_get_when_all_notes_fit_in_one_page(client: testing.TestClient,
+                                               notes_path: str,
+                                               mock_notes: MagicMock,
+                                               user: User):
+    resp: testing.Result = client.simulate_get(notes_path)
+
+    assert resp.status == HTTP_OK
+    assert len(json_util.loads(resp.text)) == 3
+    assert 'Link' not in resp.headers
+    assert mock_notes.find.call_args[0][0] == {'user': user.uuid, **NOT_DELETED}
+    assert not mock_notes.find.return_value.count.called
+
+
+def test_on_get_when_more_notes_than_the_limit_exist(client: testing.TestClient,
+                                                     notes_path: str,
+                                                     mock_notes: MagicMock,
+                                                     notes_data: List[Dict]):
+    resp: testing.Result = client.simulate_get(notes_path, query_string='limit=2')
+
+    assert resp.status == HTTP_OK
+    assert [note['_id'] for note in json_util.loads(resp.text)] == [note['_id'] for note in notes_data[:2]]
+    assert 'rel=next' in resp.headers['Link']
+    assert encode_cursor(notes_data[1]) in resp.headers['Link']
+    mock_notes.find.return_value.sort.return_value.limit.assert_called_with(3)
+
+
+def test_on_get_using_an_after_token(client: testing.TestClient,
+                                     notes_path: str,
+                                     mock_notes: MagicMock,
+                                     notes_data: List[Dict]):
+    client.simulate_get(notes_path, query_string='after={}'.format(encode_cursor(notes_data[0])))
+
+    query = mock_notes.find.call_args[0][0]
+    assert query['$or'][0]['dateModified']['$lt'].replace(tzinfo=None) == notes_data[0]['dateModified']
+    assert query['$or'][1]['_id'] == {'$lt': notes_data[0]['_id']}
+
+
+def test_on_get_using_an_invalid_after_token(client: testing.TestClient, notes_path: str):
+    resp: testing.Result = client.simulate_get(notes_path, query_string='after=invalid')
+
+    assert resp.status == HTTP_BAD_REQUEST
+
+
+def test_on_get_using_an_invalid_limit(client: testing.TestClient, notes_path: str):
+    resp: testing.Result = client.simulate_get(notes_path, query_string='limit=0')
+
+    assert resp.status == HTTP_BAD_REQUEST
+
+
+def test_cursor_round_trip(notes_data: List[Dict]):
+    date_modified, note_id = decode_cursor(encode_cursor(notes_data[0]))
+
+    assert date_modified.replace(tzinfo=None) == notes_data[0]['dateModified']
+    assert note_id == notes_data[0]['_id']
+
+
+def test_on_get_using_a_fields_projection(client: testing.TestClient,
+                                          notes_path: str,
+                                          mock_notes: MagicMock,
+                                          notes_data: List[Dict]):
+    resp: testing.Result = client.simulate_get(notes_path, query_string='fields=text&limit=2')
+    projection = mock_notes.find.call_args[0][1]
+
+    assert projection == {'text': True, '_id': True, 'dateModified': True}
+    assert json_util.loads(resp.text) == [{'text': note['text']} for note in notes_data[:2]]
+    assert 'fields=text' in resp.headers['Link']
+
+
+def test_on_get_using_an_unknown_field(client: testing.TestClient, notes_path: str):
+    resp: testing.Result = client.simulate_get(notes_path, query_string='fields=text,password')
+
+    assert resp.status == HTTP_BAD_REQUEST
+
+
+def test_on_get_using_summary_mode(client: testing.TestClient,
+                                   notes_path: str,
+                                   mock_notes: MagicMock,
+                                   notes_data: List[Dict]):
+    mock_notes.aggregate.return_value = iter(notes_data)
+    resp: testing.Result = client.simulate_get(notes_path, query_string='summary=true')
+    pipeline = mock_notes.aggregate.call_args[0][0]
+
+    assert resp.status == HTTP_OK
+    assert not mock_notes.find.called
+    assert [list(stage)[0] for stage in pipeline] == ['$match', '$sort', '$limit', '$project']
+    assert '$substrCP' in pipeline[-1]['$project']['text']
+
+
+def test_on_get_sets_validators_from_the_newest_note(client: testing.TestClient,
+                                                     notes_path: str,
+                                                     mock_notes: MagicMock,
+                                                     notes_data: List[Dict]):
+    resp: testing.Result = client.simulate_get(notes_path)
+
+    assert resp.headers['ETag'] == make_etag(notes_data[0]['dateModified'], '')
+    assert 'Last-Modified' in resp.headers
+    # The validators come from the page itself, so an unconditional GET is a single query.
+    assert mock_notes.find.call_count == 1
+
+
+def test_on_get_of_a_later_page_has_no_validators(client: testing.TestClient,
+                                                  notes_path: str,
+                                                  mock_notes: MagicMock,
+                                                  notes_data: List[Dict]):
+    resp: testing.Result = client.simulate_get(notes_path, params={'after': encode_cursor(notes_data[0])})
+
+    assert resp.status == HTTP_OK
+    assert 'ETag' not in resp.headers
+    assert mock_notes.find.call_count == 1
+
+
+def test_on_get_when_the_list_is_not_modified(client: testing.TestClient,
+                                              notes_path: str,
+                                              mock_notes: MagicMock,
+                                              notes_data: List[Dict]):
+    etag = client.simulate_get(notes_path).headers['ETag']
+    mock_notes.find.reset_mock()
+    resp: testing.Result = client.simulate_get(notes_path, headers={'If-None-Match': etag})
+
+    assert resp.status == HTTP_NOT_MODIFIED
+    assert not resp.content
+    assert mock_notes.find.call_args[0] == ({'user': notes_data[0]['user']}, {'_id': False, 'dateModified': True})
+
+
+def test_on_get_when_the_list_was_modified(client: testing.TestClient, notes_path: str, mock_notes: MagicMock):
+    resp: testing.Result = client.simulate_get(notes_path, headers={'If-None-Match': '"1"'})
+
+    assert resp.status == HTTP_OK
+    assert mock_notes.find.call_count == 2
+
+
+@pytest.mark.skipif(not os.getenv('MONGO_REPLICA_SET_URI'),
+                    reason='set MONGO_REPLICA_SET_URI to a replica set (e.g. a single "mongod --replSet rs0" member)')
+def test_on_get_reads_its_own_writes_from_a_replica_set(authenticated_api: falcon.API, notes_path: str):
+    client = MongoClient(os.environ['MONGO_REPLICA_SET_URI'])
+    notes = client.jNotesTest.notes
+    try:
+        authenticated_api.add_route(RESOURCE_MAP[UserNotesListResource],
+                                    UserNotesListResource(notes, CausalReads(ReadPreference.SECONDARY_PREFERRED)))
+        test_client = testing.TestClient(authenticated_api)
+
+        created = test_client.simulate_post(notes_path, body=json_util.dumps({'text': 'mock-text'}))
+        operation_time = created.headers[OPERATION_TIME_HEADER]
+        resp = test_client.simulate_get(notes_path, headers={OPERATION_TIME_HEADER: operation_time})
+
+        assert resp.status == HTTP_OK
+        assert [str(note['_id']) for note in json_util.loads(resp.text)] == [created.text]
+        assert decode_operation_time(resp.headers[OPERATION_TIME_HEADER]) >= decode_operation_time(operation_time)
+    finally:
+        client.drop_database('jNotesTest')
+        client.close()
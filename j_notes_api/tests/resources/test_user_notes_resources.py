@@ -0,0 +1,316 @@
+#  pylint: disable-msg=C0103
+import datetime
+from typing import Dict
+from unittest.mock import MagicMock
+
+import falcon
+import pytest
+from bson import ObjectId, Timestamp, json_util
+from falcon import HTTP_ACCEPTED, HTTP_BAD_REQUEST, HTTP_NO_CONTENT, HTTP_NOT_FOUND, HTTP_NOT_MODIFIED, HTTP_OK, \
+    HTTP_PRECONDITION_FAILED, testing
+from pymongo import ReadPreference
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.db import NOT_DELETED
+from j_notes_api.db.setup import VALIDATORS
+from j_notes_api.models import User
+from j_notes_api.resources import CausalReads, UserNotesResource
+from j_notes_api.resources.conditional import make_etag
+from j_notes_api.resources.consistency import OPERATION_TIME_COOKIE, OPERATION_TIME_HEADER
+from j_notes_api.services import WriteBehindBuffer
+
+
+@pytest.fixture(name='note_data')
+def note_data_fixture(user: User) -> Dict:
+    now = datetime.datetime.now().replace(microsecond=0)
+    return {'_id': ObjectId(), 'user': user.uuid, 'text': 'mock-text', 'dateCreated': now, 'dateModified': now}
+
+
+@pytest.fixture(name='note_path')
+def note_path_fixture(user: User, note_data: Dict) -> str:
+    return RESOURCE_MAP[UserNotesResource].format(user_id=user.uuid, note_id=note_data['_id'])
+
+
+@pytest.fixture(name='mock_notes')
+def mock_notes_fixture(note_data: Dict) -> MagicMock:
+    mock = MagicMock()
+    mock.find.return_value = [note_data]
+
+    return mock
+
+
+@pytest.fixture(name='client')
+def client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock) -> testing.TestClient:
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesResource], UserNotesResource(mock_notes))
+
+    return testing.TestClient(authenticated_api)
+
+
+def test_on_get(client: testing.TestClient, note_path: str, mock_notes: MagicMock, note_data: Dict, user: User):
+    resp: testing.Result = client.simulate_get(note_path)
+
+    assert resp.status == HTTP_OK
+    assert [note['_id'] for note in json_util.loads(resp.text)] == [note_data['_id']]
+    assert mock_notes.find.call_args[0][0] == {'_id': note_data['_id'], 'user': user.uuid, **NOT_DELETED}
+
+
+def test_on_get_using_a_fields_projection(client: testing.TestClient, note_path: str, mock_notes: MagicMock):
+    client.simulate_get(note_path, query_string='fields=text,dateModified')
+
+    assert mock_notes.find.call_args[0][1] == {'text': True, 'dateModified': True, '_id': False}
+
+
+def test_on_get_sets_validators(client: testing.TestClient, note_path: str, note_data: Dict):
+    resp: testing.Result = client.simulate_get(note_path)
+
+    assert resp.headers['ETag'] == make_etag(note_data['dateModified'])
+    assert resp.headers['Last-Modified'] == falcon.dt_to_http(note_data['dateModified'])
+
+
+def test_on_get_when_the_etag_matches(client: testing.TestClient, note_path: str, note_data: Dict):
+    resp: testing.Result = client.simulate_get(note_path,
+                                               headers={'If-None-Match': make_etag(note_data['dateModified'])})
+
+    assert resp.status == HTTP_NOT_MODIFIED
+    assert not resp.content
+
+
+def test_on_get_and_put_using_the_etag_of_a_compressed_note(compressed_api: falcon.API, note_path: str,
+                                                           mock_notes: MagicMock, note_data: Dict):
+    compressed_api.add_route(RESOURCE_MAP[UserNotesResource], UserNotesResource(mock_notes))
+    client = testing.TestClient(compressed_api)
+    mock_notes.find_one_and_update.return_value = {'_id': note_data['_id']}
+    etag = client.simulate_get(note_path, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    cached: testing.Result = client.simulate_get(note_path, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    updated: testing.Result = client.simulate_put(note_path, body='{"text": "updated"}', headers={'If-Match': etag})
+
+    assert etag == make_etag(note_data['dateModified'])[:-1] + '-gzip"'
+    assert cached.status == HTTP_NOT_MODIFIED
+    assert updated.status == HTTP_OK
+    assert mock_notes.find_one_and_update.call_args[0][0]['dateModified'] == note_data['dateModified']
+
+
+def test_on_get_when_the_note_was_not_modified_since(client: testing.TestClient, note_path: str, note_data: Dict):
+    resp: testing.Result = client.simulate_get(
+        note_path, headers={'If-Modified-Since': falcon.dt_to_http(note_data['dateModified'])})
+
+    assert resp.status == HTTP_NOT_MODIFIED
+
+
+def test_on_get_when_the_note_was_modified_since(client: testing.TestClient, note_path: str, note_data: Dict):
+    since = note_data['dateModified'] - datetime.timedelta(minutes=1)
+    resp: testing.Result = client.simulate_get(note_path, headers={'If-Modified-Since': falcon.dt_to_http(since)})
+
+    assert resp.status == HTTP_OK
+    assert resp.content
+
+
+def test_on_put_using_a_matching_etag(client: testing.TestClient,
+                                      note_path: str,
+                                      mock_notes: MagicMock,
+                                      note_data: Dict):
+    mock_notes.find_one_and_update.return_value = {'_id': note_data['_id']}
+    resp: testing.Result = client.simulate_put(note_path, body='{"text": "updated"}',
+                                               headers={'If-Match': make_etag(note_data['dateModified'])})
+
+    assert resp.status == HTTP_OK
+    assert mock_notes.find_one_and_update.call_args[0][0]['dateModified'] == note_data['dateModified']
+    assert resp.headers['ETag'] == make_etag(mock_notes.find_one_and_update.call_args[0][1]['$set']['dateModified'])
+
+
+def test_on_put_using_a_stale_etag(client: testing.TestClient,
+                                   note_path: str,
+                                   mock_notes: MagicMock,
+                                   note_data: Dict):
+    mock_notes.find_one_and_update.return_value = None
+    resp: testing.Result = client.simulate_put(note_path, body='{"text": "updated"}',
+                                               headers={'If-Match': make_etag(note_data['dateCreated'])})
+
+    assert resp.status == HTTP_PRECONDITION_FAILED
+
+
+def test_on_put_using_an_invalid_etag(client: testing.TestClient, note_path: str, mock_notes: MagicMock):
+    resp: testing.Result = client.simulate_put(note_path, body='{"text": "updated"}', headers={'If-Match': 'W/"x"'})
+
+    assert resp.status == HTTP_PRECONDITION_FAILED
+    assert not mock_notes.find_one_and_update.called
+
+
+def test_on_get_using_an_unknown_field(client: testing.TestClient, note_path: str):
+    resp: testing.Result = client.simulate_get(note_path, query_string='fields=secret')
+
+    assert resp.status == HTTP_BAD_REQUEST
+
+
+def test_on_get_using_summary_mode(client: testing.TestClient, note_path: str, mock_notes: MagicMock, note_data: Dict):
+    mock_notes.aggregate.return_value = [note_data]
+    client.simulate_get(note_path, query_string='summary=true&fields=text')
+    match, project = mock_notes.aggregate.call_args[0][0]
+
+    assert match == {'$match': {'_id': note_data['_id'], 'user': note_data['user'], **NOT_DELETED}}
+    assert project['$project']['text']['$substrCP'][2] == 100
+    assert not mock_notes.find.called
+
+
+def test_on_delete_records_a_tombstone(client: testing.TestClient,
+                                       note_path: str,
+                                       mock_notes: MagicMock,
+                                       note_data: Dict):
+    mock_notes.update_one.return_value.matched_count = 1
+    resp: testing.Result = client.simulate_delete(note_path)
+    note_filter, update = mock_notes.update_one.call_args[0]
+
+    assert resp.status == HTTP_NO_CONTENT
+    assert note_filter == {'_id': note_data['_id'], 'user': note_data['user'], **NOT_DELETED}
+    assert update['$set']['deleted'] is True
+    assert update['$unset'] == {'text': '', 'body': ''}
+
+
+def test_on_delete_when_the_note_does_not_exist(client: testing.TestClient, note_path: str, mock_notes: MagicMock):
+    mock_notes.update_one.return_value.matched_count = 0
+    resp: testing.Result = client.simulate_delete(note_path)
+
+    assert resp.status == HTTP_NOT_FOUND
+
+
+@pytest.fixture(name='routed_client')
+def routed_client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock) -> testing.TestClient:
+    mock_notes.with_options.return_value = mock_notes
+    resource = UserNotesResource(mock_notes, CausalReads(ReadPreference.SECONDARY_PREFERRED))
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesResource], resource)
+
+    return testing.TestClient(authenticated_api)
+
+
+@pytest.fixture(name='mock_session')
+def mock_session_fixture(mock_notes: MagicMock) -> MagicMock:
+    session = mock_notes.database.client.start_session.return_value.__enter__.return_value
+    session.operation_time = Timestamp(1700000000, 7)
+
+    return session
+
+
+def test_on_get_routes_reads_using_a_causal_session(routed_client: testing.TestClient, note_path: str,
+                                                    mock_notes: MagicMock, mock_session: MagicMock):
+    resp = routed_client.simulate_get(note_path, headers={OPERATION_TIME_HEADER: '1700000000.5'})
+
+    assert resp.status == HTTP_OK
+    mock_notes.with_options.assert_called_with(read_preference=ReadPreference.SECONDARY_PREFERRED)
+    mock_notes.database.client.start_session.assert_called_with(causal_consistency=True)
+    mock_session.advance_operation_time.assert_called_with(Timestamp(1700000000, 5))
+    assert mock_notes.find.call_args[1] == {'session': mock_session}
+    assert resp.headers[OPERATION_TIME_HEADER] == '1700000000.7'
+
+
+def test_on_get_ignores_an_invalid_operation_time(routed_client: testing.TestClient, note_path: str,
+                                                  mock_session: MagicMock):
+    resp = routed_client.simulate_get(note_path, headers={OPERATION_TIME_HEADER: 'not-a-timestamp'})
+
+    assert resp.status == HTTP_OK
+    assert not mock_session.advance_operation_time.called
+
+
+def test_on_put_reports_the_operation_time(routed_client: testing.TestClient, note_path: str,
+                                          mock_notes: MagicMock, mock_session: MagicMock):
+    resp = routed_client.simulate_put(note_path, body=json_util.dumps({'text': 'mock-text-update'}))
+
+    assert mock_notes.find_one_and_update.call_args[1] == {'projection': {'body': True}, 'session': mock_session}
+    assert resp.headers[OPERATION_TIME_HEADER] == '1700000000.7'
+    assert resp.cookies[OPERATION_TIME_COOKIE].value == '1700000000.7'
+
+
+@pytest.fixture(name='write_behind')
+def write_behind_fixture(mock_notes: MagicMock) -> WriteBehindBuffer:
+    buffer = WriteBehindBuffer(mock_notes, 60, schema=VALIDATORS['notes']['$jsonSchema'])
+    yield buffer
+    buffer.close()
+
+
+@pytest.fixture(name='buffered_client')
+def buffered_client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock,
+                            write_behind: WriteBehindBuffer) -> testing.TestClient:
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesResource], UserNotesResource(mock_notes, None, write_behind))
+
+    return testing.TestClient(authenticated_api)
+
+
+def test_on_put_buffers_the_update(buffered_client: testing.TestClient, note_path: str, mock_notes: MagicMock,
+                                   write_behind: WriteBehindBuffer, note_data: Dict, user: User):
+    resp: testing.Result = buffered_client.simulate_put(note_path, body='{"text": "updated"}')
+    pending = write_behind.pending(user.uuid, note_data['_id'])
+
+    assert resp.status == HTTP_ACCEPTED
+    assert resp.headers['ETag'] == make_etag(pending.date_modified)
+    assert pending.text == 'updated'
+    assert not mock_notes.find_one_and_update.called
+
+
+def test_on_put_buffered_when_the_payload_fails_validation(buffered_client: testing.TestClient, note_path: str,
+                                                           write_behind: WriteBehindBuffer, note_data: Dict,
+                                                           user: User):
+    resp: testing.Result = buffered_client.simulate_put(note_path, body=json_util.dumps({'text': 'x' * 5001}))
+
+    assert resp.status == HTTP_BAD_REQUEST
+    assert write_behind.pending(user.uuid, note_data['_id']) is None
+
+
+def test_on_put_using_an_etag_writes_the_pending_update_first(buffered_client: testing.TestClient, note_path: str,
+                                                              mock_notes: MagicMock, note_data: Dict):
+    mock_notes.find_one_and_update.return_value = {'_id': note_data['_id']}
+    etag = buffered_client.simulate_put(note_path, body='{"text": "updated"}').headers['ETag']
+    resp: testing.Result = buffered_client.simulate_put(note_path, body='{"text": "updated again"}',
+                                                        headers={'If-Match': etag})
+
+    [[request]] = mock_notes.bulk_write.call_args[0]
+    assert resp.status == HTTP_OK
+    # pylint: disable=protected-access
+    assert mock_notes.find_one_and_update.call_args[0][0]['dateModified'] == request._doc['$set']['dateModified']
+
+
+def test_on_get_reads_the_pending_update(buffered_client: testing.TestClient, note_path: str, mock_notes: MagicMock,
+                                         note_data: Dict):
+    note_data['dateModified'] -= datetime.timedelta(minutes=1)
+    mock_notes.aggregate.return_value = [{'text': 'mock-text', 'dateModified': note_data['dateModified']}]
+    etag = buffered_client.simulate_put(note_path, body=json_util.dumps({'text': 'x' * 150})).headers['ETag']
+    resp: testing.Result = buffered_client.simulate_get(note_path)
+    summary: testing.Result = buffered_client.simulate_get(note_path, query_string='fields=text&summary=true')
+
+    assert json_util.loads(resp.text)[0]['text'] == 'x' * 150
+    assert resp.headers['ETag'] == etag
+    assert json_util.loads(summary.text) == [{'text': 'x' * 100}]
+
+
+def test_on_delete_discards_the_pending_update(buffered_client: testing.TestClient, note_path: str,
+                                               mock_notes: MagicMock, write_behind: WriteBehindBuffer,
+                                               note_data: Dict, user: User):
+    mock_notes.update_one.return_value.matched_count = 1
+    buffered_client.simulate_put(note_path, body='{"text": "updated"}')
+    buffered_client.simulate_delete(note_path)
+
+    assert write_behind.pending(user.uuid, note_data['_id']) is None
+
+
+def test_on_delete_removes_the_chunks_of_a_large_body(authenticated_api: falcon.API, note_path: str,
+                                                      mock_notes: MagicMock, note_data: Dict):
+    chunks = MagicMock()
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesResource], UserNotesResource(mock_notes, chunks=chunks))
+    mock_notes.update_one.return_value.matched_count = 1
+    testing.TestClient(authenticated_api).simulate_delete(note_path)
+
+    chunks.delete_many.assert_called_with({'note': note_data['_id']})
+
+
+@pytest.mark.parametrize('previous, deleted', [({'body': {'version': 'mock-version'}}, True), ({}, False)])
+def test_on_put_removes_the_chunks_of_the_replaced_body(authenticated_api: falcon.API, note_path: str,
+                                                       mock_notes: MagicMock, note_data: Dict, previous: Dict,
+                                                       deleted: bool):
+    chunks = MagicMock()
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesResource], UserNotesResource(mock_notes, chunks=chunks))
+    mock_notes.find_one_and_update.return_value = {'_id': note_data['_id'], **previous}
+    resp: testing.Result = testing.TestClient(authenticated_api).simulate_put(note_path, body='{"text": "updated"}')
+
+    assert resp.status == HTTP_OK
+    if deleted:
+        chunks.delete_many.assert_called_once_with({'note': note_data['_id'], 'version': 'mock-version'})
+    else:
+        assert not chunks.delete_many.called
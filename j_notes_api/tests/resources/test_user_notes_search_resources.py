@@ -0,0 +1,105 @@
+#  pylint: disable-msg=C0103
+import datetime
+from typing import Dict, List
+from unittest.mock import MagicMock
+
+import falcon
+import pytest
+from bson import ObjectId, json_util
+from falcon import HTTP_BAD_REQUEST, HTTP_OK, testing
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.db import NOT_DELETED
+from j_notes_api.models import User
+from j_notes_api.resources import UserNotesSearchResource
+from j_notes_api.resources.pagination import encode_search_cursor
+from j_notes_api.resources.snippets import make_snippet, search_terms
+
+
+@pytest.fixture(name='search_path')
+def search_path_fixture(user: User) -> str:
+    return RESOURCE_MAP[UserNotesSearchResource].format(user_id=user.uuid)
+
+
+@pytest.fixture(name='results')
+def results_fixture(user: User) -> List[Dict]:
+    now = datetime.datetime.now().replace(microsecond=0)
+    return [{
+        '_id': ObjectId(),
+        'text': 'Shopping list: apples, pears and {} more apples'.format(index),
+        'dateCreated': now,
+        'dateModified': now,
+        'score': 2.0 - index / 10,
+    } for index in range(3)]
+
+
+@pytest.fixture(name='mock_notes')
+def mock_notes_fixture(results: List[Dict]) -> MagicMock:
+    mock = MagicMock()
+    mock.aggregate.side_effect = lambda pipeline, **_: results[:pipeline[-2]['$limit']]
+
+    return mock
+
+
+@pytest.fixture(name='client')
+def client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock) -> testing.TestClient:
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesSearchResource], UserNotesSearchResource(mock_notes))
+
+    return testing.TestClient(authenticated_api)
+
+
+def test_on_get(client: testing.TestClient, search_path: str, mock_notes: MagicMock, results: List[Dict],
+                user: User):
+    resp: testing.Result = client.simulate_get(search_path, query_string='q=apples')
+
+    assert resp.status == HTTP_OK
+    match = mock_notes.aggregate.call_args[0][0][0]['$match']
+    assert match == {'user': user.uuid, '$text': {'$search': 'apples'}, **NOT_DELETED}
+    found = json_util.loads(resp.text)
+    assert [note['_id'] for note in found] == [note['_id'] for note in results]
+    assert set(found[0]) == {'_id', 'dateCreated', 'dateModified', 'score', 'snippet', 'highlights'}
+    assert [found[0]['snippet'][start:end] for start, end in found[0]['highlights']] == ['apples', 'apples']
+
+
+def test_on_get_using_a_fields_projection(client: testing.TestClient, search_path: str, mock_notes: MagicMock):
+    resp: testing.Result = client.simulate_get(search_path, query_string='q=apples&fields=_id,text')
+
+    assert resp.status == HTTP_OK
+    projection = mock_notes.aggregate.call_args[0][0][-1]['$project']
+    assert projection == {'_id': True, 'text': True, 'score': True}
+    assert set(json_util.loads(resp.text)[0]) == {'_id', 'text', 'score', 'snippet', 'highlights'}
+
+
+def test_on_get_links_the_next_page(client: testing.TestClient, search_path: str, mock_notes: MagicMock,
+                                    results: List[Dict]):
+    resp: testing.Result = client.simulate_get(search_path, query_string='q=apples&limit=2')
+
+    assert len(json_util.loads(resp.text)) == 2
+    assert 'after={}'.format(encode_search_cursor(results[1])) in resp.headers['Link']
+
+    client.simulate_get(search_path, query_string='q=apples&limit=2&after={}'.format(encode_search_cursor(results[1])))
+    keyset = mock_notes.aggregate.call_args[0][0][2]['$match']
+    assert keyset == {'$or': [{'score': {'$lt': results[1]['score']}},
+                              {'score': results[1]['score'], '_id': {'$lt': results[1]['_id']}}]}
+
+
+@pytest.mark.parametrize('query_string', ['', 'q=', 'q=' + 'a' * 257, 'q=apples&after=invalid-token',
+                                          'q=apples&fields=unknown'])
+def test_on_get_using_invalid_parameters(client: testing.TestClient, search_path: str, query_string: str):
+    resp: testing.Result = client.simulate_get(search_path, query_string=query_string)
+
+    assert resp.status == HTTP_BAD_REQUEST
+
+
+def test_search_terms():
+    assert search_terms('apples "green pears" -bananas') == ['apples', 'green pears']
+
+
+def test_make_snippet_around_the_first_match():
+    text = 'filler ' * 50 + 'the shopping notes mention apples' + ' filler' * 50
+
+    snippet, highlights = make_snippet(text, ['note', 'apple'], 60)
+
+    assert len(snippet) <= 62
+    assert snippet.startswith('…') and snippet.endswith('…')
+    assert [snippet[start:end] for start, end in highlights] == ['notes', 'apples']
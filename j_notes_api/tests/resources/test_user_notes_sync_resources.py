@@ -0,0 +1,104 @@
+#  pylint: disable-msg=C0103
+import datetime
+from typing import Dict, List
+from unittest.mock import MagicMock
+
+import falcon
+import pytest
+from bson import ObjectId, json_util
+from falcon import HTTP_BAD_REQUEST, HTTP_GONE, HTTP_OK, testing
+
+from j_notes_api.app import RESOURCE_MAP
+from j_notes_api.db import NOT_DELETED, SYNC_SORT
+from j_notes_api.models import User
+from j_notes_api.resources import UserNotesSyncResource
+from j_notes_api.resources.pagination import encode_cursor
+
+
+@pytest.fixture(name='sync_path')
+def sync_path_fixture(user: User) -> str:
+    return RESOURCE_MAP[UserNotesSyncResource].format(user_id=user.uuid)
+
+
+@pytest.fixture(name='changes')
+def changes_fixture(user: User) -> List[Dict]:
+    now = datetime.datetime.now().replace(microsecond=0)
+    return [
+        {'_id': ObjectId(), 'user': user.uuid, 'text': 'mock-text', 'dateCreated': now, 'dateModified': now},
+        {'_id': ObjectId(), 'user': user.uuid, 'deleted': True, 'dateCreated': now, 'dateModified': now,
+         'dateDeleted': now},
+    ]
+
+
+@pytest.fixture(name='mock_notes')
+def mock_notes_fixture(changes: List[Dict]) -> MagicMock:
+    mock = MagicMock()
+    mock.find.return_value.sort.return_value.limit.side_effect = lambda limit: changes[:limit]
+
+    return mock
+
+
+@pytest.fixture(name='client')
+def client_fixture(authenticated_api: falcon.API, mock_notes: MagicMock) -> testing.TestClient:
+    authenticated_api.add_route(RESOURCE_MAP[UserNotesSyncResource], UserNotesSyncResource(mock_notes))
+
+    return testing.TestClient(authenticated_api)
+
+
+def test_on_get_without_a_watermark_excludes_tombstones(client: testing.TestClient,
+                                                        sync_path: str,
+                                                        mock_notes: MagicMock,
+                                                        user: User):
+    resp: testing.Result = client.simulate_get(sync_path)
+
+    assert resp.status == HTTP_OK
+    assert mock_notes.find.call_args[0][0] == {'user': user.uuid, **NOT_DELETED}
+    mock_notes.find.return_value.sort.assert_called_with(SYNC_SORT)
+
+
+def test_on_get_using_a_watermark(client: testing.TestClient,
+                                  sync_path: str,
+                                  mock_notes: MagicMock,
+                                  changes: List[Dict]):
+    since = encode_cursor(changes[0])
+    resp: testing.Result = client.simulate_get(sync_path, query_string='since={}&limit=1'.format(since))
+    body = json_util.loads(resp.text)
+    query = mock_notes.find.call_args[0][0]
+
+    assert query['$or'][0]['dateModified']['$gt'].replace(tzinfo=None) == changes[0]['dateModified']
+    assert 'deleted' not in query
+    assert body['more'] is True
+    assert body['watermark'] == encode_cursor(changes[0])
+
+
+def test_on_get_returns_tombstones(client: testing.TestClient, sync_path: str, changes: List[Dict]):
+    resp: testing.Result = client.simulate_get(sync_path, query_string='since={}'.format(encode_cursor(changes[0])))
+    body = json_util.loads(resp.text)
+
+    assert [note.get('deleted', False) for note in body['notes']] == [False, True]
+    assert body['watermark'] == encode_cursor(changes[1])
+    assert body['more'] is False
+
+
+def test_on_get_when_there_are_no_changes(client: testing.TestClient,
+                                          sync_path: str,
+                                          mock_notes: MagicMock,
+                                          changes: List[Dict]):
+    mock_notes.find.return_value.sort.return_value.limit.side_effect = lambda _: []
+    since = encode_cursor(changes[1])
+    resp: testing.Result = client.simulate_get(sync_path, query_string='since={}'.format(since))
+
+    assert json_util.loads(resp.text) == {'notes': [], 'watermark': since, 'more': False}
+
+
+def test_on_get_using_an_expired_watermark(client: testing.TestClient, sync_path: str, changes: List[Dict]):
+    expired = {**changes[0], 'dateModified': changes[0]['dateModified'] - datetime.timedelta(days=365)}
+    resp: testing.Result = client.simulate_get(sync_path, query_string='since={}'.format(encode_cursor(expired)))
+
+    assert resp.status == HTTP_GONE
+
+
+def test_on_get_using_an_invalid_watermark(client: testing.TestClient, sync_path: str):
+    resp: testing.Result = client.simulate_get(sync_path, query_string='since=invalid')
+
+    assert resp.status == HTTP_BAD_REQUEST
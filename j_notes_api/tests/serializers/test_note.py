@@ -0,0 +1,54 @@
+import datetime
+from typing import Dict
+
+import pytest
+from bson import ObjectId, SON, json_util
+from bson.int64 import Int64
+from bson.tz_util import FixedOffset, utc
+
+from j_notes_api.serializers import dumps_note, dumps_notes
+
+_NOW = datetime.datetime(2018, 7, 4, 12, 30, 15, 123456)
+
+
+@pytest.fixture(name='note_data')
+def note_data_fixture() -> Dict:
+    return {'_id': ObjectId(), 'user': ObjectId(), 'text': 'mock-text', 'dateCreated': _NOW, 'dateModified': _NOW}
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'text': 'unicode é中\U0001f600, "quotes", \\ backslashes \n\t and \x00 controls'},
+    {'text': ''},
+    {'dateModified': datetime.datetime(1960, 1, 1)},
+    {'dateModified': datetime.datetime(2018, 7, 4, tzinfo=utc)},
+    {'dateModified': datetime.datetime(2018, 7, 4, tzinfo=FixedOffset(-300, 'EST'))},
+    {'deleted': True, 'dateDeleted': _NOW},
+    {'text': None},
+    {'tags': ['unexpected', 'field']},
+    {'text': Int64(5)},
+    {'user': SON([('nested', 1)])},
+])
+def test_dumps_note_matches_json_util(note_data: Dict, overrides: Dict):
+    note = {**note_data, **overrides}
+
+    assert dumps_note(note) == json_util.dumps(note)
+
+
+def test_dumps_note_preserves_field_order(note_data: Dict):
+    note = dict(reversed(list(note_data.items())))
+
+    assert dumps_note(note) == json_util.dumps(note)
+
+
+def test_dumps_note_with_a_projection(note_data: Dict):
+    note = {'text': note_data['text']}
+
+    assert dumps_note(note) == json_util.dumps(note)
+
+
+def test_dumps_notes_matches_json_util(note_data: Dict):
+    notes = [note_data, {**note_data, '_id': ObjectId()}]
+
+    assert dumps_notes(notes) == json_util.dumps(notes)
+    assert dumps_notes([]) == json_util.dumps([])
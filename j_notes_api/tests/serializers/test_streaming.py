@@ -0,0 +1,47 @@
+import datetime
+from typing import Dict, List
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId, json_util
+
+from j_notes_api.serializers import stream_json_array
+
+
+@pytest.fixture(name='documents')
+def documents_fixture() -> List[Dict]:
+    now = datetime.datetime.now().replace(microsecond=0)
+    return [{'_id': ObjectId(), 'text': 'mock-text-{}'.format(index), 'dateModified': now} for index in range(5)]
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 5, 10])
+def test_stream_json_array_matches_json_util(documents: List[Dict], batch_size: int):
+    chunks = list(stream_json_array(documents, batch_size))
+
+    assert json_util.loads(b''.join(chunks).decode()) == json_util.loads(json_util.dumps(documents))
+    assert len(chunks) == -(-len(documents) // batch_size) + 1
+
+
+def test_stream_json_array_when_there_are_no_documents():
+    assert b''.join(stream_json_array([])) == b'[]'
+
+
+def test_stream_json_array_is_lazy(documents: List[Dict]):
+    consumed = []
+
+    def cursor():
+        for document in documents:
+            consumed.append(document)
+            yield document
+
+    next(stream_json_array(cursor(), 2))
+
+    assert len(consumed) == 2
+
+
+def test_stream_json_array_sets_the_cursor_batch_size(documents: List[Dict]):
+    mock_cursor = MagicMock()
+    mock_cursor.batch_size.return_value = documents
+    list(stream_json_array(mock_cursor, 3))
+
+    mock_cursor.batch_size.assert_called_once_with(3)
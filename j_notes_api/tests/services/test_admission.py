@@ -0,0 +1,99 @@
+#  pylint: disable-msg=C0103
+import multiprocessing
+import os
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+from j_notes_api.services import admission, LocalAdmissionState, SharedAdmissionState
+
+
+class _Clock:
+
+    def __init__(self):
+        self.now: float = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name='clock')
+def clock_fixture(monkeypatch: MonkeyPatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(admission, 'time', clock)
+
+    return clock
+
+
+@pytest.fixture(name='state', params=['local', 'shared'])
+def state_fixture(request, tmpdir) -> admission.AdmissionState:
+    if request.param == 'local':
+        return LocalAdmissionState(rate=2, burst=3)
+
+    state = SharedAdmissionState(rate=2, burst=3, path=str(tmpdir.join('admission')), slots=64)
+    request.addfinalizer(state.close)
+    return state
+
+
+def test_take_allows_a_burst_then_the_rate(state: admission.AdmissionState, clock: _Clock):
+    assert [state.take('user') for _ in range(3)] == [0, 0, 0]
+    assert state.take('user') == pytest.approx(0.5)
+    assert state.take('other-user') == 0
+
+    clock.now += 0.5
+    assert state.take('user') == 0
+    assert state.take('user') == pytest.approx(0.5)
+
+    clock.now += 60
+    assert [state.take('user') for _ in range(4)][-1] > 0
+
+
+def test_acquire_limits_requests_in_flight(state: admission.AdmissionState):
+    assert state.acquire(2) and state.acquire(2)
+    assert not state.acquire(2)
+
+    state.release()
+    assert state.acquire(2)
+
+
+def test_local_state_forgets_the_least_recently_used_buckets(clock: _Clock):
+    state = LocalAdmissionState(rate=1, burst=1, max_keys=2)
+    for key in ('first', 'second', 'third'):
+        state.take(key)
+
+    assert state.take('first') == 0
+    assert state.take('third') == pytest.approx(1)
+
+
+def _take_and_hold(path: str, results):
+    state = SharedAdmissionState(rate=1, burst=2, path=path, slots=64)
+    results.put((state.take('user'), state.acquire(3)))
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_shared_state_holds_across_processes(tmpdir):
+    path = str(tmpdir.join('admission'))
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=_take_and_hold, args=(path, results)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    state = SharedAdmissionState(rate=1, burst=2, path=path, slots=64)
+    assert sorted(results.get() for _ in workers) == [(0, True), (0, True)]
+    assert state.take('user') > 0
+    # The exited workers' in-flight requests stop counting once their slots are reclaimed.
+    assert state.acquire(3) and state.acquire(3) and state.acquire(3)
+    state.close()
+
+
+def test_an_incomplete_state_can_not_be_created():
+    class _TakeOnlyState(admission.AdmissionState):
+
+        def take(self, key: str) -> float:
+            return 0
+
+    with pytest.raises(TypeError):
+        _TakeOnlyState(rate=1, burst=1)
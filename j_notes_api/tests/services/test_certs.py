@@ -0,0 +1,109 @@
+#  pylint: disable-msg=C0103
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Iterator
+
+import pytest
+import rsa
+from google.auth import crypt, jwt
+from google.oauth2 import id_token
+
+from j_notes_api.services import CertificateStore
+
+_KEY_ID = 'mock-key-id'
+
+
+class _StubCertsServer(HTTPServer):
+
+    def __init__(self, public_key: rsa.PublicKey):
+        super().__init__(('127.0.0.1', 0), _StubCertsHandler)
+        self.certs: bytes = json.dumps({_KEY_ID: public_key.save_pkcs1().decode()}).encode()
+        self.cache_control: str = 'public, max-age=3600'
+        self.hits: int = 0
+
+
+class _StubCertsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.hits += 1
+        self.send_response(200)
+        self.send_header('Cache-Control', self.server.cache_control)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.server.certs)))
+        self.end_headers()
+        self.wfile.write(self.server.certs)
+
+    def log_message(self, *_):
+        pass
+
+
+@pytest.fixture(name='key_pair', scope='module')
+def key_pair_fixture():
+    return rsa.newkeys(1024)
+
+
+@pytest.fixture(name='certs_server')
+def certs_server_fixture(key_pair) -> Iterator[_StubCertsServer]:
+    server = _StubCertsServer(key_pair[0])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(name='certs_url')
+def certs_url_fixture(certs_server: _StubCertsServer) -> str:
+    return 'http://127.0.0.1:{}/certs'.format(certs_server.server_port)
+
+
+@pytest.fixture(name='signed_id_token')
+def signed_id_token_fixture(key_pair, client_id: str) -> bytes:
+    now = int(time.time())
+    signer = crypt.RSASigner.from_string(key_pair[1].save_pkcs1().decode(), _KEY_ID)
+    return jwt.encode(signer, {
+        'iss': 'accounts.google.com',
+        'sub': 'mock-sub',
+        'aud': client_id,
+        'iat': now,
+        'exp': now + 300,
+    })
+
+
+def test_verify_token_using_cached_certs(certs_server: _StubCertsServer,
+                                         certs_url: str,
+                                         signed_id_token: bytes,
+                                         client_id: str):
+    cert_store = CertificateStore()
+    for _ in range(3):
+        id_info: Dict = id_token.verify_token(signed_id_token, cert_store, client_id, certs_url=certs_url)
+        assert id_info['sub'] == 'mock-sub'
+
+    assert certs_server.hits == 1
+
+
+def test_verify_token_when_certs_are_not_cacheable(certs_server: _StubCertsServer,
+                                                   certs_url: str,
+                                                   signed_id_token: bytes,
+                                                   client_id: str):
+    certs_server.cache_control = 'no-cache, no-store, max-age=0'
+    cert_store = CertificateStore()
+    for _ in range(2):
+        id_token.verify_token(signed_id_token, cert_store, client_id, certs_url=certs_url)
+
+    assert certs_server.hits == 2
+
+
+def test_certs_are_refreshed_in_the_background_before_expiry(certs_server: _StubCertsServer, certs_url: str):
+    certs_server.cache_control = 'max-age=30'
+    cert_store = CertificateStore(refresh_margin=60)
+    response = cert_store(certs_url)
+    assert cert_store(certs_url) is response
+
+    deadline = time.monotonic() + 5
+    while certs_server.hits < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert certs_server.hits == 2
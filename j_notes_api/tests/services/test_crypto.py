@@ -1,3 +1,6 @@
+import datetime
+
+import jwt
 import pytest
 
 from j_notes_api.models import User
@@ -24,3 +27,19 @@ def test_generate_token():
 
     assert isinstance(token, str)
     assert len(token) == 64
+
+
+def test_generate_jwt_embeds_expiry_and_token_id(user: User, secret: str):
+    first = crypto.decode_jwt(crypto.generate_jwt(user, secret), secret)
+    second = crypto.decode_jwt(crypto.generate_jwt(user, secret), secret)
+
+    assert first['exp'] == int(user.auth_token_expiry.timestamp())
+    assert first['iat'] <= first['exp']
+    assert first['jti'] != second['jti']
+
+
+def test_decode_jwt_when_the_token_has_expired(user: User, secret: str):
+    user.auth_token_expiry = datetime.datetime.now() - datetime.timedelta(minutes=1)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        crypto.decode_jwt(crypto.generate_jwt(user, secret), secret)
@@ -0,0 +1,31 @@
+#  pylint: disable-msg=C0103
+from unittest.mock import MagicMock
+
+from j_notes_api.services import CommandMetrics, Metrics
+from j_notes_api.services.metrics import begin_request, end_request, Histogram, timed
+
+
+def test_histogram_counts_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative_counts()) == [('0.1', 2), ('1.0', 3), ('+Inf', 4)]
+    assert histogram.sum == 2.65 and histogram.count == 4
+
+
+def test_command_metrics_attributes_commands_to_the_current_request():
+    metrics = Metrics()
+    listener = CommandMetrics(metrics)
+
+    listener.succeeded(MagicMock(command_name='find', duration_micros=1000))
+    timings = begin_request()
+    with timed('auth'):
+        listener.failed(MagicMock(command_name='insert', duration_micros=3000))
+    assert end_request() is timings
+
+    assert timings.mongo_commands == 1
+    assert timings.mongo_seconds == 0.003
+    assert set(timings.phases) == {'auth'}
+    assert 'jnotes_mongo_commands_total{command="find",outcome="succeeded"} 1\n' in metrics.render()
+    assert 'jnotes_mongo_commands_total{command="insert",outcome="failed"} 1\n' in metrics.render()
@@ -0,0 +1,63 @@
+import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from j_notes_api.services import RevocationList
+from j_notes_api.services.revocation import BloomFilter
+
+
+@pytest.fixture(name='mock_revoked_tokens')
+def mock_revoked_tokens_fixture() -> MagicMock:
+    mock = MagicMock()
+    mock.find.return_value = [{'_id': 'revoked-token-id'}]
+    mock.find_one.side_effect = lambda query, _projection: query if query['_id'] == 'revoked-token-id' else None
+
+    return mock
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter(1000)
+    items = ['token-{}'.format(index) for index in range(1000)]
+    for item in items:
+        bloom_filter.add(item)
+
+    assert all(item in bloom_filter for item in items)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom_filter = BloomFilter(1000, false_positive_rate=0.01)
+    for index in range(1000):
+        bloom_filter.add('token-{}'.format(index))
+
+    false_positives = sum('other-{}'.format(index) in bloom_filter for index in range(10000))
+    assert false_positives < 300
+
+
+def test_is_revoked_when_the_token_is_not_revoked(mock_revoked_tokens: MagicMock):
+    revocation_list = RevocationList(mock_revoked_tokens)
+
+    assert not revocation_list.is_revoked('valid-token-id')
+    assert not revocation_list.is_revoked('other-token-id')
+    assert mock_revoked_tokens.find.call_count == 1
+    assert not mock_revoked_tokens.find_one.called
+
+
+def test_is_revoked_when_the_token_is_revoked(mock_revoked_tokens: MagicMock):
+    revocation_list = RevocationList(mock_revoked_tokens)
+
+    assert revocation_list.is_revoked('revoked-token-id')
+    assert revocation_list.confirmations == 1
+
+
+def test_revoke_is_visible_before_the_next_refresh(mock_revoked_tokens: MagicMock):
+    revocation_list = RevocationList(mock_revoked_tokens, refresh_interval=3600)
+    revocation_list.refresh()
+    expires_at = datetime.datetime.now() + datetime.timedelta(hours=1)
+
+    revocation_list.revoke('new-token-id', expires_at)
+    mock_revoked_tokens.find_one.side_effect = lambda query, _projection: query
+
+    assert revocation_list.is_revoked('new-token-id')
+    mock_revoked_tokens.update_one.assert_called_with(
+        {'_id': 'new-token-id'}, {'$set': {'expiresAt': expires_at}}, upsert=True)
@@ -0,0 +1,64 @@
+import datetime
+from typing import Dict
+from unittest.mock import MagicMock
+
+import pytest
+
+from j_notes_api.models import User
+from j_notes_api.services import UserCache, UserService
+
+
+@pytest.fixture(name='user_cache')
+def user_cache_fixture() -> UserCache:
+    return UserCache(max_size=2)
+
+
+def test_get_when_user_is_not_cached(user_cache: UserCache, user: User):
+    assert user_cache.get(str(user.uuid), user.auth_token) is None
+    assert user_cache.misses == 1
+    assert user_cache.hits == 0
+
+
+def test_get_when_user_is_cached(user_cache: UserCache, user: User):
+    user_cache.put(user)
+
+    assert user_cache.get(str(user.uuid), user.auth_token) is user
+    assert user_cache.hits == 1
+
+
+def test_get_when_auth_token_does_not_match(user_cache: UserCache, user: User):
+    user_cache.put(user)
+
+    assert user_cache.get(str(user.uuid), 'another-auth-token') is None
+
+
+def test_get_when_auth_token_is_expired(user_cache: UserCache, user_data: Dict):
+    user_data['authTokenExpiry'] = datetime.datetime.now() - datetime.timedelta(seconds=1)
+    user = User(user_data)
+    user_cache.put(user)
+
+    assert user_cache.get(str(user.uuid), user.auth_token) is None
+    assert not user_cache
+
+
+def test_put_evicts_least_recently_used(user_cache: UserCache, user_data: Dict):
+    users = [User({**user_data, 'authToken': 'mock-auth-token-{}'.format(index)}) for index in range(3)]
+    user_cache.put(users[0])
+    user_cache.put(users[1])
+    user_cache.get(str(users[0].uuid), users[0].auth_token)
+    user_cache.put(users[2])
+
+    assert len(user_cache) == 2
+    assert user_cache.get(str(users[0].uuid), users[0].auth_token) is users[0]
+    assert user_cache.get(str(users[1].uuid), users[1].auth_token) is None
+
+
+def test_update_auth_token_evicts_cached_user(user_cache: UserCache,
+                                              user: User,
+                                              mock_users: MagicMock,
+                                              mock_auth_providers: MagicMock):
+    old_auth_token = user.auth_token
+    user_cache.put(user)
+    UserService(mock_users, mock_auth_providers, user_cache).update_auth_token(user)
+
+    assert user_cache.get(str(user.uuid), old_auth_token) is None
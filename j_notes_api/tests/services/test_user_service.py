@@ -1,27 +1,128 @@
 import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from unittest.mock import MagicMock
 
 import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from j_notes_api.models import IdInfo, User, AuthProvider
 from j_notes_api.services import UserService
 
 
+class _UniqueCollection:
+    """An in-memory stand-in for a collection with a unique index on "unique_key", where (as on a real server) racing
+        upserts can both miss the match and one of them then fails with a duplicate key error.
+    """
+
+    def __init__(self, name: str, unique_key: Tuple[str, ...], foreign: '_UniqueCollection' = None):
+        self.name:        str = name
+        self.documents:   List[Dict] = []
+        self._unique_key: Tuple[str, ...] = unique_key
+        self._foreign:    Optional[_UniqueCollection] = foreign
+        self._lock:       threading.Lock = threading.Lock()
+
+    def _match(self, query: Dict) -> Optional[Dict]:
+        return next((document for document in self.documents
+                     if all(document.get(field) == value for field, value in query.items())), None)
+
+    def aggregate(self, pipeline: List[Dict]) -> List[Dict]:
+        lookup = pipeline[2]['$lookup']
+        with self._lock:
+            document = self._match(pipeline[0]['$match'])
+        if document is None:
+            return []
+
+        return [{**document, lookup['as']: [foreign for foreign in self._foreign.documents
+                                            if foreign[lookup['foreignField']] == document[lookup['localField']]]}]
+
+    def find_one_and_update(self, query: Dict, update: Dict, upsert: bool = False, **_) -> Optional[Dict]:
+        with self._lock:
+            document = self._match(query)
+            if document is not None:
+                document.update(update.get('$set', {}))
+                return dict(document)
+        if not upsert:
+            return None
+
+        time.sleep(0.001)
+        with self._lock:
+            if self._match({field: query[field] for field in self._unique_key}) is not None:
+                raise DuplicateKeyError('E11000 duplicate key error')
+            document = {'_id': ObjectId(), **query, **update.get('$setOnInsert', {}), **update.get('$set', {})}
+            self.documents.append(document)
+            return dict(document)
+
+
 @pytest.fixture(name='user_service')
 def user_service_fixture(mock_users: MagicMock, mock_auth_providers: MagicMock) -> UserService:
     return UserService(mock_users, mock_auth_providers)
 
 
-def test_create_new_user(user_service: UserService, id_info: IdInfo):
-    user, auth_provider = user_service.create_new_user(id_info)
+def test_sign_in_when_the_auth_token_is_valid(user_service: UserService, id_info: IdInfo, mock_users: MagicMock,
+                                              mock_auth_providers: MagicMock, auth_provider_data: Dict,
+                                              user_data: Dict):
+    mock_auth_providers.aggregate.return_value = [{**auth_provider_data, 'users': [user_data]}]
+
+    user, auth_provider = user_service.sign_in(id_info)
+
+    assert user.uuid == user_data['_id']
+    assert auth_provider.uuid == auth_provider_data['_id']
+    assert mock_auth_providers.aggregate.call_count == 1
+    assert not mock_auth_providers.find_one_and_update.called
+    assert not mock_users.find_one_and_update.called
+
+
+def test_sign_in_when_the_auth_token_is_expired(user_service: UserService, id_info: IdInfo, mock_users: MagicMock,
+                                                mock_auth_providers: MagicMock, auth_provider_data: Dict,
+                                                user_data: Dict):
+    user_data['authTokenExpiry'] = datetime.datetime.now() - datetime.timedelta(hours=1)
+    mock_auth_providers.aggregate.return_value = [{**auth_provider_data, 'users': [dict(user_data)]}]
+    mock_users.find_one_and_update.side_effect = lambda query, update, **_: {**user_data, **update['$set']}
+
+    user, _ = user_service.sign_in(id_info)
+
+    assert user.auth_token != user_data['authToken']
+    assert user.auth_token_expiry > datetime.datetime.now()
+
+
+def test_sign_in_when_the_auth_provider_does_not_exist(user_service: UserService, id_info: IdInfo,
+                                                       mock_users: MagicMock, mock_auth_providers: MagicMock,
+                                                       auth_provider_data: Dict, user_data: Dict):
+    mock_auth_providers.aggregate.return_value = []
+    mock_auth_providers.find_one_and_update.return_value = auth_provider_data
+    mock_users.find_one_and_update.return_value = user_data
+
+    user, auth_provider = user_service.sign_in(id_info)
 
     assert isinstance(user, User)
     assert isinstance(auth_provider, AuthProvider)
+    query, update = mock_auth_providers.find_one_and_update.call_args[0]
+    assert query == {'type': 'google', 'userIdentifier': id_info.sub}
+    assert set(update['$setOnInsert']) == {'user', 'dateCreated'}
+    assert mock_users.find_one_and_update.call_args[0][0] == {'_id': auth_provider_data['user']}
+
+
+def test_sign_in_when_the_auth_provider_exists_but_the_user_does_not(user_service: UserService, id_info: IdInfo,
+                                                                     mock_users: MagicMock,
+                                                                     mock_auth_providers: MagicMock,
+                                                                     auth_provider_data: Dict, user_data: Dict):
+    mock_auth_providers.aggregate.return_value = [{**auth_provider_data, 'users': []}]
+    mock_users.find_one_and_update.return_value = {**user_data, '_id': auth_provider_data['user']}
+
+    user, _ = user_service.sign_in(id_info)
 
+    assert user.uuid == auth_provider_data['user']
+    assert mock_users.find_one_and_update.call_args[1]['upsert']
 
-def test_update_auth_token(user_service: UserService, user: User):
+
+def test_update_auth_token(user_service: UserService, mock_users: MagicMock, user: User):
     old_auth_token = user.auth_token
     old_auth_token_expiry = user.auth_token_expiry
+    mock_users.find_one_and_update.side_effect = lambda query, update, **_: update['$set']
     user_service.update_auth_token(user)
     new_auth_token = user.auth_token
     new_auth_token_expiry = user.auth_token_expiry
@@ -30,3 +131,35 @@ def test_update_auth_token(user_service: UserService, user: User):
     assert isinstance(new_auth_token_expiry, datetime.datetime)
     assert old_auth_token != new_auth_token
     assert old_auth_token_expiry < new_auth_token_expiry
+    assert mock_users.find_one_and_update.call_args[0][0] == {'_id': user.uuid, 'authToken': old_auth_token}
+
+
+def test_update_auth_token_when_another_sign_in_rotated_it_first(user_service: UserService, mock_users: MagicMock,
+                                                                 user: User, user_data: Dict):
+    rotated = {**user_data, 'authToken': 'rotated-auth-token'}
+    mock_users.find_one_and_update.return_value = None
+    mock_users.find_one.return_value = rotated
+
+    user_service.update_auth_token(user)
+
+    assert user.auth_token == 'rotated-auth-token'
+
+
+def test_concurrent_first_sign_ins_create_one_user(id_info: IdInfo):
+    users = _UniqueCollection('users', ('_id',))
+    auth_providers = _UniqueCollection('authProviders', ('type', 'userIdentifier'), foreign=users)
+    user_service = UserService(users, auth_providers)
+    barrier = threading.Barrier(8)
+
+    def sign_in(_) -> Tuple[User, AuthProvider]:
+        barrier.wait()
+        return user_service.sign_in(id_info)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(sign_in, range(8)))
+
+    assert len(auth_providers.documents) == 1
+    assert len(users.documents) == 1
+    assert {user.uuid for user, _ in results} == {users.documents[0]['_id']}
+    assert {user.auth_token for user, _ in results} == {users.documents[0]['authToken']}
+    assert {auth_provider.uuid for _, auth_provider in results} == {auth_providers.documents[0]['_id']}
@@ -0,0 +1,215 @@
+import datetime
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError, WriteError
+
+from j_notes_api.db import NOT_DELETED, truncate_to_millis
+from j_notes_api.db.setup import VALIDATORS
+from j_notes_api.services import WriteBehindBuffer
+
+USER = ObjectId()
+NOTE_ID = ObjectId()
+NOW = datetime.datetime(2018, 8, 1, 12, 0, 0)
+
+
+@pytest.fixture(name='mock_notes')
+def mock_notes_fixture() -> MagicMock:
+    return MagicMock()
+
+
+@pytest.fixture(name='buffer')
+def buffer_fixture(mock_notes: MagicMock) -> WriteBehindBuffer:
+    buffer = WriteBehindBuffer(mock_notes, 60, schema=VALIDATORS['notes']['$jsonSchema'])
+    yield buffer
+    buffer.close()
+
+
+def _requests(mock_notes: MagicMock):
+    return [call[0][0] for call in mock_notes.bulk_write.call_args_list]
+
+
+def test_put_coalesces_updates_of_a_note(buffer: WriteBehindBuffer, mock_notes: MagicMock):
+    for second in range(3):
+        buffer.put(USER, NOTE_ID, 'text-{}'.format(second), NOW + datetime.timedelta(seconds=second))
+    buffer.flush()
+
+    [[request]] = _requests(mock_notes)
+    latest = NOW + datetime.timedelta(seconds=2)
+    # pylint: disable=protected-access
+    assert request._filter == {'_id': NOTE_ID, 'user': USER, 'dateModified': {'$lt': latest}, **NOT_DELETED}
+    assert request._doc == {'$set': {'text': 'text-2', 'dateModified': request._doc['$set']['dateModified']},
+                            '$unset': {'body': ''}}
+    assert mock_notes.bulk_write.call_args[1] == {'ordered': False}
+    assert (buffer.updates, buffer.writes) == (3, 1)
+
+
+def test_a_write_is_stored_with_the_time_it_is_written_at(buffer: WriteBehindBuffer, mock_notes: MagicMock):
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    # Another note changing between the update and its write must not end up newer than it in Mongo.
+    other = truncate_to_millis(datetime.datetime.now())
+    buffer.flush()
+
+    [[request]] = _requests(mock_notes)
+    # pylint: disable=protected-access
+    stored = request._doc['$set']['dateModified']
+    assert stored >= other
+    assert buffer.stored_date_modified(USER, NOTE_ID, NOW) == stored
+    assert buffer.stored_date_modified(USER, NOTE_ID, NOW - datetime.timedelta(seconds=1)) == NOW - \
+        datetime.timedelta(seconds=1)
+
+
+def test_the_next_write_of_a_note_replaces_its_stored_update(buffer: WriteBehindBuffer, mock_notes: MagicMock):
+    buffer.put(USER, NOTE_ID, 'text-1', NOW)
+    buffer.flush()
+    buffer.put(USER, NOTE_ID, 'text-2', NOW + datetime.timedelta(seconds=1))
+    buffer.flush()
+
+    [[first], [second]] = _requests(mock_notes)
+    # pylint: disable=protected-access
+    stored = first._doc['$set']['dateModified']
+    unmodified = {'dateModified': {'$lt': NOW + datetime.timedelta(seconds=1)}}
+    assert second._filter == {'_id': NOTE_ID, 'user': USER, '$or': [unmodified, {'dateModified': stored}],
+                              **NOT_DELETED}
+
+
+def test_pending_only_when_newer_than_the_stored_note(buffer: WriteBehindBuffer):
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+
+    assert buffer.pending(USER, NOTE_ID, NOW - datetime.timedelta(seconds=1)).text == 'text'
+    assert buffer.pending(USER, NOTE_ID, NOW + datetime.timedelta(seconds=1)) is None
+
+
+def test_a_flush_removes_the_chunks_of_the_bodies_it_replaced(mock_notes: MagicMock):
+    chunks = MagicMock()
+    replaced, kept, other = ObjectId(), ObjectId(), ObjectId()
+    buffer = WriteBehindBuffer(mock_notes, 60, chunks=chunks)
+    # "kept" still points to its body after the flush: its write did not apply.
+    mock_notes.find.side_effect = [
+        [{'_id': replaced, 'body': {'version': 'version-1'}}, {'_id': kept, 'body': {'version': 'version-2'}},
+         {'_id': other}],
+        [{'_id': kept, 'body': {'version': 'version-2'}}],
+    ]
+    for note_id in (replaced, kept, other):
+        buffer.put(USER, note_id, 'text', NOW)
+    buffer.close()
+
+    assert mock_notes.find.call_args_list[0][0] == ({'_id': {'$in': [replaced, kept, other]}}, {'body': True})
+    chunks.delete_many.assert_called_once_with({'note': replaced, 'version': 'version-1'})
+
+
+def test_a_failed_flush_keeps_the_chunks(mock_notes: MagicMock):
+    chunks = MagicMock()
+    buffer = WriteBehindBuffer(mock_notes, 60, chunks=chunks)
+    body = {'_id': NOTE_ID, 'body': {'version': 'version-1'}}
+    # Each flush looks the body up before writing; only the retry checks it was replaced afterwards.
+    mock_notes.find.side_effect = [[body], [body], []]
+    mock_notes.bulk_write.side_effect = [AutoReconnect('mock-error'), None]
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    buffer.flush()
+
+    assert not chunks.delete_many.called
+    buffer.close()
+    chunks.delete_many.assert_called_once_with({'note': NOTE_ID, 'version': 'version-1'})
+
+
+def test_flush_writes_notes_in_batches(mock_notes: MagicMock):
+    buffer = WriteBehindBuffer(mock_notes, 60, max_batch=2)
+    for _ in range(3):
+        buffer.put(USER, ObjectId(), 'text', NOW)
+    buffer.close()
+
+    assert sorted(len(requests) for requests in _requests(mock_notes)) == [1, 2]
+
+
+def test_pending_until_flushed(buffer: WriteBehindBuffer):
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+
+    assert buffer.pending(USER, NOTE_ID).text == 'text'
+    assert buffer.pending(USER, ObjectId()) is None
+    buffer.flush()
+    assert buffer.pending(USER, NOTE_ID) is None
+
+
+def test_discard(buffer: WriteBehindBuffer, mock_notes: MagicMock):
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    buffer.discard(USER, NOTE_ID)
+    buffer.flush()
+
+    assert buffer.pending(USER, NOTE_ID) is None
+    assert not mock_notes.bulk_write.called
+
+
+@pytest.mark.parametrize('text', ['x' * 5001, 42])
+def test_put_rejects_text_failing_validation(buffer: WriteBehindBuffer, text):
+    with pytest.raises(WriteError):
+        buffer.put(USER, NOTE_ID, text, NOW)
+
+    assert buffer.pending(USER, NOTE_ID) is None
+
+
+def test_writes_in_the_background_after_the_window(mock_notes: MagicMock):
+    buffer = WriteBehindBuffer(mock_notes, 0.05)
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    deadline = time.monotonic() + 5
+    while not mock_notes.bulk_write.called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    buffer.close()
+
+    assert len(_requests(mock_notes)) == 1
+    assert buffer.pending(USER, NOTE_ID) is None
+
+
+def test_a_write_error_is_reported_by_the_next_update(buffer: WriteBehindBuffer, mock_notes: MagicMock):
+    mock_notes.bulk_write.side_effect = BulkWriteError({'writeErrors': [
+        {'index': 0, 'code': 121, 'errmsg': 'Document failed validation'}]})
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    buffer.flush()
+
+    with pytest.raises(WriteError):
+        buffer.put(USER, NOTE_ID, 'text', NOW)
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    assert buffer.pending(USER, NOTE_ID) is not None
+
+
+def test_a_failed_flush_is_retried(buffer: WriteBehindBuffer, mock_notes: MagicMock):
+    mock_notes.bulk_write.side_effect = AutoReconnect('mock-error')
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    buffer.flush()
+
+    assert buffer.pending(USER, NOTE_ID).text == 'text'
+    mock_notes.bulk_write.side_effect = None
+    buffer.flush()
+    assert buffer.pending(USER, NOTE_ID) is None
+    assert buffer.writes == 1
+
+
+def test_close_writes_pending_updates(buffer: WriteBehindBuffer, mock_notes: MagicMock):
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    buffer.close()
+
+    assert len(_requests(mock_notes)) == 1
+    with pytest.raises(RuntimeError):
+        buffer.put(USER, NOTE_ID, 'text', NOW)
+
+
+def test_flush_waits_for_a_write_the_background_thread_has_started(mock_notes: MagicMock):
+    started, release = threading.Event(), threading.Event()
+    mock_notes.bulk_write.side_effect = lambda *_, **__: started.set() or release.wait(5)
+    buffer = WriteBehindBuffer(mock_notes, 0.01)
+    buffer.put(USER, NOTE_ID, 'text', NOW)
+    assert started.wait(5)
+
+    flush = threading.Thread(target=buffer.flush, args=([(USER, NOTE_ID)],))
+    flush.start()
+    flush.join(0.2)
+    assert flush.is_alive()
+
+    release.set()
+    flush.join(5)
+    buffer.close()
+    assert not flush.is_alive()
+    assert len(_requests(mock_notes)) == 1
@@ -0,0 +1,85 @@
+#  pylint: disable-msg=C0103
+import subprocess
+import sys
+
+import pytest
+
+from j_notes_api import app, db
+from j_notes_api.config import Config
+
+IMPORTED_MODULES = 'import sys, {}; print(" ".join(sorted(sys.modules)))'
+
+
+def _imported_modules(module: str, **env: str) -> set:
+    """The modules importing "module" adds to a new interpreter (some namespace packages are set up by "site")."""
+    return _modules_after_import(module, **env) - _modules_after_import('sys')
+
+
+def _modules_after_import(module: str, **env: str) -> set:
+    output = subprocess.check_output([sys.executable, '-c', IMPORTED_MODULES.format(module)], env=env,
+                                     universal_newlines=True)
+    return set(output.split())
+
+
+def test_from_env_defaults():
+    config = Config.from_env({})
+
+    assert config.client_id is None
+    assert config.auth_cache_ttl == 300
+    assert not config.stateless_auth
+    assert config.admission_user_rate == 0
+    assert config.admission_max_in_flight == 0
+    assert (config.mongo_host, config.mongo_port, config.mongo_database) == ('localhost', 27017, 'jNotesDB')
+    assert config.mongo_options == {}
+
+
+def test_from_env():
+    config = Config.from_env({
+        'CLIENT_ID': 'mock-client-id',
+        'STATELESS_AUTH': 'True',
+        'ADMISSION_USER_RATE': '2.5',
+        'WRITE_BEHIND_WINDOW': '0.5',
+        'MONGO_PORT': '27018',
+        'MONGO_MAX_POOL_SIZE': '7',
+        'LOG_LEVEL': 'INFO',
+    })
+
+    assert config.client_id == 'mock-client-id'
+    assert config.stateless_auth
+    assert config.admission_user_rate == 2.5
+    assert config.write_behind_window == 0.5
+    assert config.mongo_port == 27018
+    assert config.mongo_options == {'maxPoolSize': 7}
+    assert config.log_level == 'INFO'
+
+
+def test_create_app_requires_a_client_id():
+    with pytest.raises(ValueError):
+        app.create_app(Config())
+
+
+def test_create_app_points_the_client_at_the_configured_database():
+    previous = db.MONGO_HOST, db.MONGO_PORT, db.MONGO_DATABASE
+    try:
+        app.create_app(Config('mock-client-id', mongo_database='jNotesConfigTest', mongo_options={'maxPoolSize': 3}))
+
+        assert db.get_database().name == 'jNotesConfigTest'
+        assert db.get_client().options.pool_options.max_pool_size == 3
+    finally:
+        db.configure(*previous)
+        db.close_client()
+
+
+def test_importing_the_package_has_no_side_effects():
+    modules = _imported_modules('j_notes_api')
+
+    assert 'j_notes_api.app' not in modules
+    assert 'logging' not in modules
+    assert 'pymongo' not in modules
+
+
+def test_google_auth_is_imported_on_first_use():
+    modules = _imported_modules('j_notes_api.wsgi', CLIENT_ID='mock-client-id')
+
+    assert 'j_notes_api.app' in modules
+    assert not [module for module in modules if module.split('.')[0] in ('google', 'requests')]
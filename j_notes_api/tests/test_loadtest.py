@@ -0,0 +1,55 @@
+#  pylint: disable-msg=C0103
+import asyncio
+
+import pytest
+
+from j_notes_api.loadtest import parse_mix, read_response, regressions, Response, Sample, summarize
+
+
+def _read(data: bytes) -> Response:
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_response(reader)
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(read())
+    finally:
+        loop.close()
+
+
+def test_parse_mix():
+    assert parse_mix('list=3,get=1') == {'list': 0.75, 'get': 0.25}
+
+    with pytest.raises(ValueError):
+        parse_mix('list=1,search=1')
+
+
+def test_read_response_with_a_chunked_body():
+    response = _read(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                     b'5\r\n[1, 2\r\n3;ext=1\r\n, 3\r\n1\r\n]\r\n0\r\n\r\n')
+
+    assert response == Response(200, b'[1, 2, 3]', True)
+
+
+def test_read_response_when_the_server_closes_the_connection():
+    response = _read(b'HTTP/1.1 401 Unauthorized\r\nConnection: close\r\nContent-Length: 2\r\n\r\n{}')
+
+    assert response == Response(401, b'{}', False)
+
+
+def test_summarize_and_regressions():
+    samples = [Sample('get', index / 100, index / 100 + 0.01, False) for index in range(100)]
+    samples.append(Sample('create', 0.5, 1.0, True))
+
+    results = summarize(samples)
+
+    assert results['get']['requests'] == 100 and results['get']['p50_ms'] == 10.0
+    assert results['create']['error_rate'] == 1.0 and results['create']['throughput'] == 0
+    assert results['all']['throughput'] == 100.0
+    assert not regressions(results, results, 0.2)
+
+    slower = {**results, 'get': {**results['get'], 'p99_ms': 20.0}}
+    assert regressions(slower, results, 0.2) == ['get: p99_ms 20.0 > 10.0']
@@ -0,0 +1,9 @@
+import logging
+
+from j_notes_api.app import create_app
+from j_notes_api.config import Config
+
+config = Config.from_env()
+logging.basicConfig(level=config.log_level)
+
+application = create_app(config)